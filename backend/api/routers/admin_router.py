@@ -10,8 +10,12 @@ from src.database import (
     get_db_manager,
     DatabaseManager,
     KnowledgeBases,
+    query_embedding_cache,
+    answer_cache,
+    get_contextual_rag,
 )
 from src.constants import UserRole
+from src.telemetry import telemetry
 from src.utils import get_formatted_logger
 from .user_router import (
     get_current_user,
@@ -299,3 +303,44 @@ async def delete_token(
     db_session.commit()
 
     return {"message": "Token deleted successfully!"}
+
+
+@admin_router.get("/cache_stats", response_model=dict[str, dict])
+async def get_cache_stats(
+    current_user: Annotated[Users, Depends(get_current_user)],
+):
+    logger.info("Getting cache statistics ...")
+
+    if current_user.role != UserRole.ADMIN:
+        logger.error("Unauthorized access to get cache statistics!")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to access this resource!",
+        )
+
+    stats = {
+        "query_embedding": query_embedding_cache.stats(),
+        "answer": answer_cache.stats(),
+    }
+
+    reranker = get_contextual_rag().reranker
+    if hasattr(reranker, "cache_stats"):
+        stats["reranker_scores"] = reranker.cache_stats()
+
+    return stats
+
+
+@admin_router.get("/telemetry_stats", response_model=dict)
+async def get_telemetry_stats(
+    current_user: Annotated[Users, Depends(get_current_user)],
+):
+    logger.info("Getting telemetry statistics ...")
+
+    if current_user.role != UserRole.ADMIN:
+        logger.error("Unauthorized access to get telemetry statistics!")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to access this resource!",
+        )
+
+    return telemetry.stats()
@@ -42,7 +42,7 @@ from src.database import (
     get_db_manager,
 )
 from src.utils import get_formatted_logger
-from api.services import AssistantService
+from api.services import AssistantService, assistant_runtime_cache
 from api.deps import SessionDeps
 from src.constants import DOWNLOAD_FOLDER, ApiResponse
 from fastapi.responses import JSONResponse, FileResponse
@@ -179,6 +179,8 @@ async def update_assistant(
     db_session.commit()
     db_session.refresh(assistant)
 
+    assistant_runtime_cache.invalidate(assistant.id)
+
     return assistant
 
 
@@ -216,6 +218,8 @@ async def update_assistant_tool(
     db_session.commit()
     db_session.refresh(assistant)
 
+    assistant_runtime_cache.invalidate(assistant.id)
+
     return assistant
 
 
@@ -555,6 +559,7 @@ async def delete_assistant(
         )
 
     db_manager.delete_assistant(assistant_id)
+    assistant_runtime_cache.invalidate(assistant_id)
 
     return JSONResponse(
         status_code=status.HTTP_200_OK,
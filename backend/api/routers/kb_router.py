@@ -1,12 +1,11 @@
 import os
-import copy
 import uuid
 
 from pathlib import Path
 from typing import Annotated, Type
 from celery.result import AsyncResult
 from fastapi.responses import JSONResponse, FileResponse
-from sqlmodel import select, not_, col, or_, and_, desc
+from sqlmodel import select, not_, desc
 from fastapi import (
     Body,
     File,
@@ -43,6 +42,7 @@ from src.database import (
     DatabaseManager,
     load_storage_service,
     BaseStorageClient,
+    kb_hierarchy,
 )
 from src.celery import celery_app
 from src.tasks import parse_document
@@ -470,7 +470,11 @@ async def get_knowledge_base(
             detail="You are not allowed to access this Knowledge Base",
         )
 
-    if kb.parents:
+    parents = kb_hierarchy.get_ancestor_ids(db_session, kb.id)
+    children = kb_hierarchy.get_children_ids(db_session, kb.id)
+
+    # Only a knowledge base outside of any inheritance can inherit another one
+    if parents or children:
         mergeable_kb = []
     else:
         mergeable_kb = db_session.exec(
@@ -478,14 +482,7 @@ async def get_knowledge_base(
             .join(Users, KnowledgeBases.user_id == Users.id)
             .where(
                 Users.organization == current_user.organization,
-                not_(
-                    or_(
-                        col(KnowledgeBases.parents).contains([kb.id]),
-                        col(KnowledgeBases.children).contains([kb.id]),
-                    ),
-                ),
                 not_(KnowledgeBases.id == kb.id),
-                and_(kb.children == []),
             )
         ).all()
 
@@ -500,8 +497,8 @@ async def get_knowledge_base(
         updated_at=kb.updated_at,
         document_count=len(documents),
         last_updated=kb.last_updated,
-        parents=kb.parents,
-        children=kb.children,
+        parents=parents,
+        children=children,
         documents=[
             DocumentInKnowledgeBase(
                 id=doc.id,
@@ -593,6 +590,7 @@ async def delete_document(
         object_name=document.file_path_in_storage_service,
         delete_to_retry=delete_document_request_body.delete_to_retry,
         document_id=document.id,
+        knowledge_base_id=document.knowledge_base_id,
     )
 
     document_chunks = db_session.exec(
@@ -634,9 +632,9 @@ async def inherit_knowledge_base(
             is_contextual_rag=True,
         )
 
+        # Committed along with the inheritance
         db_session.add(target_kb)
-        db_session.commit()
-        db_session.refresh(target_kb)
+        db_session.flush()
         target_kb_id = target_kb.id
 
     else:
@@ -653,7 +651,7 @@ async def inherit_knowledge_base(
                 detail="Target Knowledge Base not found !",
             )
 
-    if len(target_kb.children) >= 1:
+    if kb_hierarchy.get_children_ids(db_session, target_kb_id):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Target Knowledge Base is already inheriting another Knowledge Base",
@@ -669,23 +667,16 @@ async def inherit_knowledge_base(
             detail="Source Knowledge Base not found !",
         )
 
-    if target_kb_id in source_kb.parents:
+    if target_kb_id in [
+        source_kb.id,
+        *kb_hierarchy.get_ancestor_ids(db_session, source_kb.id),
+    ]:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Target Knowledge Base is already inheriting the Source Knowledge Base",
         )
 
-    target_kb_parent = copy.deepcopy(source_kb.parents)
-    target_kb_parent.append(source_kb_id)
-    target_kb.parents = list(set(target_kb_parent))
-
-    source_kb_children = copy.deepcopy(source_kb.children)
-    source_kb_children.append(target_kb_id)
-    source_kb.children = list(set(source_kb_children))
-
-    db_session.add(target_kb)
-    db_session.commit()
-    db_session.add(source_kb)
+    kb_hierarchy.add_inheritance(db_session, source_kb.id, target_kb_id)
     db_session.commit()
 
     db_session.close()
@@ -731,6 +722,7 @@ async def delete_knowledge_base(
             object_name=doc.file_path_in_storage_service,
             document_id=doc.id,
             delete_to_retry=False,
+            knowledge_base_id=knowledge_base_id,
         )
 
     db_manager.delete_knowledge_base(knowledge_base_id)
@@ -1,3 +1,4 @@
 from .assistant import AssistantService
+from .assistant_runtime import AssistantRuntimeCache, assistant_runtime_cache
 
-__all__ = ["AssistantService"]
+__all__ = ["AssistantService", "AssistantRuntimeCache", "assistant_runtime_cache"]
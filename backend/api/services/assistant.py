@@ -1,21 +1,30 @@
 import time
 import uuid
-import copy
+import asyncio
 
 from uuid import UUID
 from sqlmodel import select
-from langfuse.decorators import langfuse_context
 from fastapi import Depends, HTTPException, status
-from typing import List, Generator, Dict, Any, Union
+from typing import Generator, Dict, Any, Union
 
 from .chat_assistant_agent import ChatAssistant
+from .assistant_runtime import assistant_runtime_cache
 from .output_parser import OutputParser, get_default_output_parser
-from src.utils import get_cost_from_session_id
+from src.tasks import reconcile_message_cost
+from src.utils import (
+    collect_product_rows,
+    track_usage,
+    UsageTracker,
+    current_usage_tracker,
+    TokenStream,
+    current_token_stream,
+)
 from src.database import (
     Messages,
     Conversations,
     Assistants,
-    KnowledgeBases,
+    kb_hierarchy,
+    history_manager,
     get_db_manager,
     DatabaseManager,
 )
@@ -25,7 +34,8 @@ from api.models import (
 )
 from api.deps import SessionDeps
 from src.settings import default_settings
-from src.constants import SenderType, ChatAssistantConfig, MesssageHistory
+from src.telemetry import telemetry, current_trace_sampled
+from src.constants import SenderType, ChatAssistantConfig
 
 
 class AssistantService:
@@ -62,19 +72,15 @@ class AssistantService:
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
-        kb = self.db_session.exec(
-            select(KnowledgeBases).where(
-                KnowledgeBases.id == assistant.knowledge_base_id
-            )
-        ).first()
-
-        kb_ids = copy.deepcopy(kb.parents)
-        kb_ids.append(kb.id)
+        # The knowledge base of the assistant and the ones it inherits
+        kb_ids = kb_hierarchy.get_kb_ids(self.db_session, assistant.knowledge_base_id)
 
-        message_history = self._get_message_history(conversation_id)
+        message_history = history_manager.get_message_history(
+            self.db_session, conversation
+        )
 
         file_product_path = self.db_manager.get_product_file_path(
-            knowledge_base_id=kb.id
+            knowledge_base_id=assistant.knowledge_base_id
         )
 
         user_message = Messages(
@@ -96,7 +102,6 @@ class AssistantService:
             embedding_model_name="text-embedding-3-small",
             collection_name=default_settings.global_vector_db_collection_name,
             kb_ids=kb_ids,
-            session_id=session_id,
             tools=assistant.tools,
             agent_backstory=assistant.agent_backstory,
             is_contextual_rag=is_contextual_rag,
@@ -105,30 +110,38 @@ class AssistantService:
             agent_type=configuration["agent_type"],
         )
 
-        assistant_instance = ChatAssistant(configuration=assistant_config)
-
-        answer = assistant_instance.on_message(
-            message.content, message_history, session_id=session_id
+        assistant_instance = assistant_runtime_cache.get_assistant(
+            assistant.id, assistant_config
         )
 
+        with track_usage() as usage_tracker, telemetry.trace_sampling("chat"):
+            answer = assistant_instance.on_message(
+                message.content, message_history, session_id=session_id
+            )
+
         response = {
             "result": answer,
             "is_chat_false": False,
         }
 
-        langfuse_context.flush()
+        telemetry.flush()
 
+        # Not streamed, the answer comes at once
+        response_time = time.time() - start_time
         assistant_message = Messages(
             id=session_id,
             conversation_id=conversation_id,
             sender_type=SenderType.ASSISTANT,
             content=answer,
-            response_time=time.time() - start_time,
+            response_time=response_time,
+            total_time=response_time,
             is_chat_false=response["is_chat_false"],
-            cost=get_cost_from_session_id(session_id),
+            cost=usage_tracker.cost,
         )
         self.db_session.add(assistant_message)
         self.db_session.commit()
+        history_manager.add_messages(conversation_id, [user_message, assistant_message])
+        self._schedule_cost_reconciliation(session_id)
 
         return ChatResponse(
             assistant_message=answer,
@@ -176,19 +189,15 @@ class AssistantService:
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
-        kb = self.db_session.exec(
-            select(KnowledgeBases).where(
-                KnowledgeBases.id == assistant.knowledge_base_id
-            )
-        ).first()
-
-        kb_ids = copy.deepcopy(kb.parents)
-        kb_ids.append(kb.id)
+        # The knowledge base of the assistant and the ones it inherits
+        kb_ids = kb_hierarchy.get_kb_ids(self.db_session, assistant.knowledge_base_id)
 
-        message_history = self._get_message_history(conversation_id)
+        message_history = history_manager.get_message_history(
+            self.db_session, conversation
+        )
 
         file_product_path = self.db_manager.get_product_file_path(
-            knowledge_base_id=kb.id
+            knowledge_base_id=assistant.knowledge_base_id
         )
 
         user_message = Messages(
@@ -210,7 +219,6 @@ class AssistantService:
             embedding_model_name="text-embedding-3-small",
             collection_name=default_settings.global_vector_db_collection_name,
             kb_ids=kb_ids,
-            session_id=session_id,
             tools=assistant.tools,
             agent_backstory=assistant.agent_backstory,
             is_contextual_rag=is_contextual_rag,
@@ -219,33 +227,50 @@ class AssistantService:
             agent_type=configuration["agent_type"],
         )
 
-        assistant_instance = ChatAssistant(configuration=assistant_config)
-
-        answer = await assistant_instance.aon_message(
-            message.content, message_history, session_id=session_id
+        assistant_instance = assistant_runtime_cache.get_assistant(
+            assistant.id, assistant_config
         )
 
+        with (
+            track_usage() as usage_tracker,
+            collect_product_rows() as product_rows,
+            telemetry.trace_sampling("chat"),
+        ):
+            answer = await assistant_instance.aon_message(
+                message.content,
+                message_history,
+                session_id=session_id,
+                structured=use_parser,
+            )
+
         response = {
             "result": answer,
             "is_chat_false": False,
         }
 
-        langfuse_context.flush()
+        # Parsed locally, the answer already holds the json or the tool rows
+        result = self.output_parser.parse(answer, product_rows) if use_parser else None
+
+        telemetry.flush()
 
+        # Not streamed, the answer comes at once
+        response_time = time.time() - start_time
         assistant_message = Messages(
             id=session_id,
             conversation_id=conversation_id,
             sender_type=SenderType.ASSISTANT,
-            content=answer,
-            response_time=time.time() - start_time,
+            content=result["text"] if use_parser else answer,
+            response_time=response_time,
+            total_time=response_time,
             is_chat_false=response["is_chat_false"],
-            cost=get_cost_from_session_id(session_id),
+            cost=usage_tracker.cost,
         )
         self.db_session.add(assistant_message)
         self.db_session.commit()
+        history_manager.add_messages(conversation_id, [user_message, assistant_message])
+        self._schedule_cost_reconciliation(session_id)
 
         if use_parser:
-            result = self.output_parser._parse_output(answer)
             return result
 
         return ChatResponse(
@@ -267,7 +292,9 @@ class AssistantService:
                 detail="Conversation not found",
             )
 
-        message_history = self._get_message_history(self.db_session, conversation_id)
+        message_history = history_manager.get_message_history(
+            self.db_session, conversation
+        )
 
         user_message = Messages(
             conversation_id=conversation_id,
@@ -327,19 +354,15 @@ class AssistantService:
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
-        kb = self.db_session.exec(
-            select(KnowledgeBases).where(
-                KnowledgeBases.id == assistant.knowledge_base_id
-            )
-        ).first()
+        # The knowledge base of the assistant and the ones it inherits
+        kb_ids = kb_hierarchy.get_kb_ids(self.db_session, assistant.knowledge_base_id)
 
-        kb_ids = copy.deepcopy(kb.parents)
-        kb_ids.append(kb.id)
-
-        message_history = self._get_message_history(conversation_id)
+        message_history = history_manager.get_message_history(
+            self.db_session, conversation
+        )
 
         file_product_path = self.db_manager.get_product_file_path(
-            knowledge_base_id=kb.id
+            knowledge_base_id=assistant.knowledge_base_id
         )
 
         user_message = Messages(
@@ -361,7 +384,6 @@ class AssistantService:
             embedding_model_name="text-embedding-3-small",
             collection_name=default_settings.global_vector_db_collection_name,
             kb_ids=kb_ids,
-            session_id=session_id,
             tools=assistant.tools,
             agent_backstory=assistant.agent_backstory,
             is_contextual_rag=is_contextual_rag,
@@ -370,57 +392,71 @@ class AssistantService:
             agent_type=configuration["agent_type"],
         )
 
-        assistant_instance = ChatAssistant(configuration=assistant_config)
-
-        response_time = None
-        full_response = ""
-
-        answer = assistant_instance.on_message(
-            message.content, message_history, session_id=session_id
+        assistant_instance = assistant_runtime_cache.get_assistant(
+            assistant.id, assistant_config
         )
 
-        response = {
-            "result": answer,
-            "is_chat_false": False,
-        }
-
-        # response = repair_json(response, return_objects=True)
-
-        if not response:
-            response["result"] = "Something went wrong. Please try again."
-            response["is_chat_false"] = False
-
-        for chunk in response["result"].strip().split(" "):
-            if response_time is None:
-                response_time = time.time() - start_time
-
-            full_response += chunk + " "
-            yield chunk + " "
-
-        langfuse_context.flush()
+        token_stream = TokenStream()
+        usage_tracker = UsageTracker()
+
+        async def answer_message() -> str:
+            # The tools find the stream and the usage tracker through the context of this task
+            current_token_stream.set(token_stream)
+            current_usage_tracker.set(usage_tracker)
+            current_trace_sampled.set(telemetry.sample("chat_stream"))
+            try:
+                return await assistant_instance.astream_message(
+                    message.content,
+                    message_history,
+                    session_id=session_id,
+                    token_stream=token_stream,
+                )
+            finally:
+                token_stream.close()
+
+        answer_task = asyncio.create_task(answer_message())
+
+        try:
+            async for delta in token_stream:
+                yield delta
+        finally:
+            # No-op once answered, stops the agent if the client left
+            answer_task.cancel()
+
+        # Raises the errors of the agent
+        answer = await answer_task
+        if not token_stream.has_tokens:
+            answer = "Something went wrong. Please try again."
+            yield answer
+
+        end_time = time.time()
+        response_time = (token_stream.first_token_time or end_time) - start_time
+
+        telemetry.flush()
 
         assistant_message = Messages(
             id=session_id,
             conversation_id=conversation_id,
             sender_type=SenderType.ASSISTANT,
-            content=full_response,
+            content=token_stream.text or answer,
             response_time=response_time,
-            is_chat_false=response["is_chat_false"],
-            cost=get_cost_from_session_id(session_id),
+            total_time=end_time - start_time,
+            is_chat_false=False,
+            cost=usage_tracker.cost,
         )
         self.db_session.add(assistant_message)
         self.db_session.commit()
+        history_manager.add_messages(conversation_id, [user_message, assistant_message])
+        self._schedule_cost_reconciliation(session_id)
 
-    def _get_message_history(self, conversation_id: UUID) -> List[MesssageHistory]:
-        query = (
-            select(Messages)
-            .where(Messages.conversation_id == conversation_id)
-            .order_by(Messages.created_at)
-        )
-
-        messages = self.db_session.exec(query).all()
+    @staticmethod
+    def _schedule_cost_reconciliation(session_id: str):
+        """
+        Replace the local cost of the message with its Langfuse cost later, if enabled
+        """
+        if not default_settings.cost_config.langfuse_reconcile:
+            return
 
-        return [
-            MesssageHistory(content=msg.content, role=msg.sender_type)
-            for msg in messages
-        ]
+        reconcile_message_cost.apply_async(
+            args=[session_id], countdown=default_settings.cost_config.reconcile_delay
+        )
@@ -0,0 +1,100 @@
+import hashlib
+from uuid import UUID
+
+from .chat_assistant_agent import ChatAssistant
+from src.settings import default_settings
+from src.utils import get_formatted_logger, LRUTTLCache
+from src.constants import ChatAssistantConfig, ExistAgentType
+
+logger = get_formatted_logger(__file__)
+
+
+class AssistantRuntimeCache:
+    """
+    LRU cache of the prepared `ChatAssistant` of the assistants, so that the LLM clients, tools and
+    agents are not rebuilt for every message.
+
+    An entry is keyed by the assistant ID and holds the version of the configuration it was built
+    from: a message whose configuration differs (assistant, tools, inherited knowledge bases or
+    product file updated in another process) rebuilds it. The assistant endpoints of this process
+    invalidate it right away.
+    """
+
+    def __init__(self, max_size: int = 128):
+        """
+        Args:
+            max_size (int): Maximum number of cached assistants. Default to `128`.
+        """
+        self.runtimes = LRUTTLCache(max_size=max_size)
+
+    def _get_key(
+        self, assistant_id: str | UUID, configuration: ChatAssistantConfig
+    ) -> tuple[str, str | None]:
+        # The CrewAI memory is stored per conversation
+        conversation_id = (
+            str(configuration.conversation_id)
+            if configuration.agent_type == ExistAgentType.CREWAI_AGENT
+            and default_settings.agent_config.use_agent_memory
+            else None
+        )
+
+        return str(assistant_id), conversation_id
+
+    @staticmethod
+    def get_version(configuration: ChatAssistantConfig) -> str:
+        """
+        Get the version of an assistant configuration, ignoring the per-message fields
+
+        Args:
+            configuration (ChatAssistantConfig): Assistant configuration
+
+        Returns:
+            str: Configuration version
+        """
+        return hashlib.sha256(
+            configuration.model_dump_json(
+                exclude={"session_id", "conversation_id"}
+            ).encode()
+        ).hexdigest()
+
+    def get_assistant(
+        self, assistant_id: str | UUID, configuration: ChatAssistantConfig
+    ) -> ChatAssistant:
+        """
+        Get the prepared assistant of a configuration, built on a miss
+
+        Args:
+            assistant_id (str | UUID): Assistant ID
+            configuration (ChatAssistantConfig): Assistant configuration, without session ID
+
+        Returns:
+            ChatAssistant: Assistant, answering with the session ID given per message
+        """
+        key = self._get_key(assistant_id, configuration)
+        version = self.get_version(configuration)
+
+        cached = self.runtimes.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        logger.info("assistant_id: %s - preparing the assistant runtime", assistant_id)
+        assistant = ChatAssistant(configuration=configuration)
+        self.runtimes.set(key, (version, assistant))
+
+        return assistant
+
+    def invalidate(self, assistant_id: str | UUID):
+        """
+        Remove the cached runtimes of an assistant
+
+        Args:
+            assistant_id (str | UUID): Assistant ID
+        """
+        for key, _ in self.runtimes.items():
+            if key[0] == str(assistant_id):
+                self.runtimes.pop(key)
+
+
+assistant_runtime_cache = AssistantRuntimeCache(
+    max_size=default_settings.agent_config.runtime_cache_size,
+)
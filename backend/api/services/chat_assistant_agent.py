@@ -6,18 +6,25 @@ from llama_index.llms.openai import OpenAI
 from llama_index.core.tools import FunctionTool
 from llama_index.agent.openai import OpenAIAgent
 from llama_index.core.callbacks import CallbackManager
+from llama_index.core.instrumentation import get_dispatcher
 from llama_index.core.base.llms.types import ChatMessage as LLamaIndexChatMessage
 
 from langfuse.decorators import observe
 from langchain_openai import ChatOpenAI
-from langfuse.llama_index import LlamaIndexCallbackHandler
 
 from src.agents import CrewAIAgent
 from src.settings import default_settings
-from src.utils import get_formatted_logger
+from src.telemetry import telemetry
+from src.utils import (
+    get_formatted_logger,
+    TokenStream,
+    session_id_context,
+    UsageEventHandler,
+)
 from src.tools import load_llama_index_kb_tool, load_product_search_tool, LlamaIndexTool
 from src.constants import (
     ASSISTANT_SYSTEM_PROMPT,
+    STRUCTURED_ANSWER_PROMPT,
     ChatAssistantConfig,
     MesssageHistory,
     ExistTools,
@@ -27,13 +34,18 @@ from src.constants import (
 logger = get_formatted_logger(__file__, file_path="logs/chat_assistant/log.log")
 load_dotenv()
 
-langfuse_callback_handler = LlamaIndexCallbackHandler()
+langfuse_callback_handler = telemetry.llama_index_callback_handler
 Settings.callback_manager = CallbackManager([langfuse_callback_handler])
+# Token usage of the llama-index calls, for the cost of the messages
+get_dispatcher().add_event_handler(UsageEventHandler())
 
 
 class ChatAssistant:
     """
     Main ChatAssistant class to handle the chat with user.
+
+    The LLM clients, tools and agents are built once and reused by the messages of the assistant
+    (see `AssistantRuntimeCache`): the session ID and history of a message are given at call time.
     """
 
     def __init__(self, configuration: ChatAssistantConfig):
@@ -51,7 +63,9 @@ class ChatAssistant:
         if agent_type == ExistAgentType.CREWAI_AGENT:
             self.agent = self._init_crewai_agent()
         elif agent_type == ExistAgentType.OPENAI_AGENT:
-            self.agent = self._init_openai_agent()
+            # OpenAIAgent keeps the chat in its memory, each message gets its own agent
+            self._init_openai_agent()
+            self.agent = None
 
     def _init_crewai_agent(self):
         model_name = self.configuration.model
@@ -87,6 +101,8 @@ class ChatAssistant:
                         is_contextual_rag=self.configuration.is_contextual_rag,
                         system_prompt=system_prompt,
                         description=description,
+                        # Only streams the answer, CrewAI reads `result_as_answer`
+                        return_direct=return_as_answer,
                     )
                 )
             elif tool_name == ExistTools.PRODUCT_SEARCH:
@@ -116,7 +132,7 @@ class ChatAssistant:
         )
 
         kb_task = Task(
-            description="Phản hồi tin nhắn của người dùng: {query}.",
+            description="Lịch sử hội thoại:\n{history}\n\nPhản hồi tin nhắn của người dùng: {query}.",
             expected_output="Một câu trả lời phù hợp nhất với câu hỏi được đưa ra.",
             agent=kb_agent,
             tools=[
@@ -140,7 +156,11 @@ class ChatAssistant:
         model = self.configuration.model
         service = self.configuration.service
 
-        llm = self._init_llama_index_model(service, model)
+        self.llm = self._init_llama_index_model(service, model)
+        # Same model in JSON mode, for the structured answers of the production API
+        self.structured_llm = self._init_llama_index_model(
+            service, model, json_mode=True
+        )
 
         tools = []
 
@@ -193,9 +213,16 @@ class ChatAssistant:
 
         self.tools = tools
 
+    def _get_openai_agent(self, structured: bool = False) -> OpenAIAgent:
+        """
+        Get an OpenAIAgent with an empty memory over the shared LLM and tools, cheap to build.
+
+        Args:
+            structured (bool): Answer in JSON mode. Default to `False`.
+        """
         return OpenAIAgent.from_tools(
-            tools=tools,
-            llm=llm,
+            tools=self.tools,
+            llm=self.structured_llm if structured else self.llm,
             verbose=True,
             # We use agent_backstory from crewai agent configuration to set system_prompt here
             system_prompt=self.configuration.agent_backstory,
@@ -227,7 +254,9 @@ class ChatAssistant:
                 "The implementation for other types of LLMs are not ready yet!"
             )
 
-    def _init_llama_index_model(self, service: str, model_id: str):
+    def _init_llama_index_model(
+        self, service: str, model_id: str, json_mode: bool = False
+    ):
         logger.info(f"Loading llama-index model: {model_id}")
 
         if service == "openai":
@@ -236,6 +265,15 @@ class ChatAssistant:
             return OpenAI(
                 model_id,
                 temperature=self.configuration.temperature,
+                additional_kwargs={
+                    # Usage of the streamed answers, in their last chunk
+                    "stream_options": {"include_usage": True},
+                    **(
+                        {"response_format": {"type": "json_object"}}
+                        if json_mode
+                        else {}
+                    ),
+                },
             )
         else:
             raise NotImplementedError(
@@ -253,10 +291,22 @@ class ChatAssistant:
             session_id=str(session_id),
         )
 
-        inputs = {
-            "query": message,
-        }
-        response = self.agent.chat(inputs, message_history)
+        with session_id_context(session_id):
+            if self.configuration.agent_type == ExistAgentType.OPENAI_AGENT:
+                return (
+                    self._get_openai_agent()
+                    .chat(
+                        self._get_openai_agent_prompt(message),
+                        chat_history=self._get_chat_history(message_history),
+                    )
+                    .response
+                )
+
+            inputs = {
+                "query": message,
+                "history": self._format_history(message_history),
+            }
+            response = self.agent.chat(inputs, message_history)
 
         return response
 
@@ -266,73 +316,157 @@ class ChatAssistant:
         message: str,
         message_history: list[MesssageHistory],
         session_id: str | uuid.UUID,
+        structured: bool = False,
     ) -> str:
+        """
+        Answer a message
+
+        Args:
+            message (str): User message
+            message_history (list[MesssageHistory]): Previous messages of the conversation
+            session_id (str | uuid.UUID): Session ID of the message
+            structured (bool): Ask the agent for the JSON of `STRUCTURED_ANSWER_PROMPT` in its answer,
+                the tools returning their output as the answer still return text. Default to `False`.
+
+        Returns:
+            str: Answer
+        """
+        if structured:
+            message = f"{message}\n\n{STRUCTURED_ANSWER_PROMPT}"
+
         langfuse_callback_handler.set_trace_params(
             name="aon_message",
             session_id=str(session_id),
         )
 
-        if self.configuration.agent_type == ExistAgentType.CREWAI_AGENT:
-            inputs = {
-                "query": message,
-            }
-            response = await self.agent.chat_async(inputs, message_history)
-
-            logger.debug("Use CrewAIAgent")
-            logger.debug(f"message: {message}")
-            logger.debug(f"response: {response}")
-            logger.debug(f"\n{"=" * 100}\n")
-
-            return response
-
-        elif self.configuration.agent_type == ExistAgentType.OPENAI_AGENT:
-            logger.debug("Use OpenAIAgent")
-            logger.debug(f"message: {message}")
-
-            # Since OpenAIAgent does not support tool with long description yet
-            # Use workaround method: https://docs.llamaindex.ai/en/stable/examples/agentopenai_agent_lengthy_tools/#moving-tool-descriptions-to-the-prompt
-            tools_description = "\n\n".join(
-                [
-                    f"Tool Name: {tool.metadata.name}\n"
-                    + f"Tool Description: {description} "
-                    for tool, description in zip(self.tools, self.descriptions)
-                ]
-            )
+        with session_id_context(session_id):
+            if self.configuration.agent_type == ExistAgentType.CREWAI_AGENT:
+                inputs = {
+                    "query": message,
+                    "history": self._format_history(message_history),
+                }
+                response = await self.agent.chat_async(inputs, message_history)
 
-            prompt = f"{tools_description}\n\nMessage: {message}"
+                logger.debug("Use CrewAIAgent")
+                logger.debug(f"message: {message}")
+                logger.debug(f"response: {response}")
+                logger.debug(f"\n{"=" * 100}\n")
 
-            result = await self.agent.achat(prompt)
+                return response
 
-            response = result.response
+            elif self.configuration.agent_type == ExistAgentType.OPENAI_AGENT:
+                logger.debug("Use OpenAIAgent")
+                logger.debug(f"message: {message}")
 
-            logger.debug(f"response: {response}")
-            logger.debug(f"\n{"=" * 100}\n")
+                result = await self._get_openai_agent(structured).achat(
+                    self._get_openai_agent_prompt(message),
+                    chat_history=self._get_chat_history(message_history),
+                )
+
+                response = result.response
 
-            return response
+                logger.debug(f"response: {response}")
+                logger.debug(f"\n{"=" * 100}\n")
+
+                return response
 
     def stream_chat(self, message: str, message_history: list[MesssageHistory]):
         message_history = [
             LLamaIndexChatMessage(content=msg["content"], role=msg["role"])
             for msg in message_history
         ]
-        return self.agent.stream_chat(message, message_history).response_gen
+        return (
+            self._get_openai_agent().stream_chat(message, message_history).response_gen
+        )
 
     @observe()
-    async def astream_chat(
+    async def astream_message(
         self,
         message: str,
         message_history: list[MesssageHistory],
         session_id: str | uuid.UUID,
-    ):
+        token_stream: TokenStream,
+    ) -> str:
+        """
+        Answer a message, pushing the deltas of the answer to a token stream as the LLM generates them.
+
+        The tools returning their output as the answer stream it themselves: the answer of the agent
+        is then only pushed if nothing was streamed yet. CrewAI does not stream its LLM calls, so its
+        answer is pushed at once unless a `result_as_answer` tool streamed it.
+
+        Args:
+            message (str): User message
+            message_history (list[MesssageHistory]): Previous messages of the conversation
+            session_id (str | uuid.UUID): Session ID of the message
+            token_stream (TokenStream): Stream of the answer, also the current token stream of the tools
+
+        Returns:
+            str: Answer
+        """
         langfuse_callback_handler.set_trace_params(
-            name="astream_chat",
+            name="astream_message",
             session_id=str(session_id),
         )
 
-        message_history = [
+        with session_id_context(session_id):
+            if self.configuration.agent_type == ExistAgentType.CREWAI_AGENT:
+                inputs = {
+                    "query": message,
+                    "history": self._format_history(message_history),
+                }
+                response = await self.agent.chat_async(inputs, message_history)
+
+                if not token_stream.has_tokens:
+                    token_stream.push(response)
+
+                return response
+
+            elif self.configuration.agent_type == ExistAgentType.OPENAI_AGENT:
+                result = await self._get_openai_agent().astream_chat(
+                    self._get_openai_agent_prompt(message),
+                    chat_history=self._get_chat_history(message_history),
+                )
+
+                response = ""
+                # The tools run before the first delta of the agent answer
+                push_deltas = None
+                async for delta in result.async_response_gen():
+                    if push_deltas is None:
+                        push_deltas = not token_stream.has_tokens
+                    if push_deltas:
+                        token_stream.push(delta)
+                    response += delta
+
+                logger.debug(f"response: {response}")
+
+                return response
+
+    @staticmethod
+    def _get_chat_history(
+        message_history: list[MesssageHistory],
+    ) -> list[LLamaIndexChatMessage]:
+        return [
             LLamaIndexChatMessage(content=msg.content, role=msg.role)
             for msg in message_history
         ]
-        response = await self.agent.astream_chat(message, message_history)
 
-        return response
+    @staticmethod
+    def _format_history(message_history: list[MesssageHistory]) -> str:
+        # CrewAI tasks take text inputs
+        if not message_history:
+            return "Không có"
+
+        return "\n".join(f"{msg.role}: {msg.content}" for msg in message_history)
+
+    def _get_openai_agent_prompt(self, message: str) -> str:
+        # Since OpenAIAgent does not support tool with long description yet
+        # Use workaround method: https://docs.llamaindex.ai/en/stable/examples/agentopenai_agent_lengthy_tools/#moving-tool-descriptions-to-the-prompt
+        tools_description = "\n\n".join(
+            [
+                f"Tool Name: {tool.metadata.name}\n"
+                + f"Tool Description: {description} "
+                for tool, description in zip(self.tools, self.descriptions)
+            ]
+        )
+
+        return f"{tools_description}\n\nMessage: {message}"
@@ -1,81 +1,119 @@
+import re
 import json_repair
-from llama_index.llms.openai import OpenAI
-from llama_index.core.llms import ChatMessage
-from llama_index.core import ChatPromptTemplate
 
-from src.utils import get_formatted_logger
-from src.constants import CHAT_AGENT_RESPONSE_PROMPT
-from src.settings import default_settings, GlobalSettings
+from typing import Any, Optional
+
+from src.utils import get_formatted_logger, parse_price
 
 logger = get_formatted_logger(__file__)
 
+PRODUCT_FIELDS = ("url", "name", "code", "price", "image_urls", "description")
+
 
 def get_default_output_parser():
-    return OutputParser(default_settings)
+    return output_parser
 
 
 class OutputParser:
     """
     Output parser for the chat assistant. Responsible for parsing the output into json format.
+
+    The assistant is asked for the json in its answer (see `STRUCTURED_ANSWER_PROMPT`), so parsing
+    is local: no second LLM call. Answers which are not json, e.g. returned directly by a tool, are
+    split into text and the product rows returned by the product search tool.
     """
 
-    def __init__(self, settings: GlobalSettings):
-        self.settings = settings
-        self.llm_output_parser = self._init_llm_output_parser(
-            service=self.settings.llm_config.service,
-            model_id=self.settings.llm_config.name,
-        )
-
-    def _parse_output(self, response: str):
-        prompt = ChatPromptTemplate(
-            message_templates=[
-                ChatMessage(role="system", content=CHAT_AGENT_RESPONSE_PROMPT),
-                ChatMessage(
-                    role="user",
-                    content=(
-                        "Here is the content you need to extract info: \n"
-                        "------\n"
-                        "{content}\n"
-                        "------"
-                    ),
-                ),
-            ]
-        )
-
-        messages = prompt.format_messages(content=response)
-
-        output = self.llm_output_parser.chat(
-            messages, response_format={"type": "json_object"}
-        ).message.content
+    def parse(
+        self, answer: str, product_rows: Optional[list[dict]] = None
+    ) -> dict[str, Any]:
+        """
+        Parse an answer of the assistant
+
+        Args:
+            answer (str): Answer of the assistant
+            product_rows (Optional[list[dict]]): Product rows returned by the product search tool while answering
+
+        Returns:
+            dict[str, Any]: `text` of the answer without the product information, and its `products`
+        """
+        result = self._parse_json(answer)
+
+        if result is None:
+            result = self._parse_text(answer, product_rows or [])
+
+        return result
+
+    def _parse_json(self, answer: str) -> Optional[dict[str, Any]]:
+        content = answer.strip()
+
+        # Markdown code block
+        if content.startswith("```"):
+            content = re.sub(r"^```(?:json)?|```$", "", content).strip()
+
+        if not content.startswith("{"):
+            return None
 
         try:
-            result = json_repair.loads(output)
-            assert "text" in result, "Missing 'text' key in the output!"
-            assert "products" in result, "Missing 'products' key in the output!"
+            result = json_repair.loads(content)
         except Exception as e:
-            logger.error(f"Error parsing output: {e}")
-            result = {
-                "text": "Parsing error!",
-                "products": [],
-            }
+            logger.warning(f"Error parsing output: {e}")
+            return None
 
-        return result
+        if not isinstance(result, dict) or "text" not in result:
+            return None
 
-    def _init_llm_output_parser(self, service, model_id):
-        """
-        Initialize the LLM output parser for the chat assistant.
+        products = result.get("products") or []
 
-        Args:
-            service (str): Service name indicating the type of model to load.
-            model_id (str): Identifier of the model to load from HuggingFace's model hub.
-        """
-        logger.info(f"Loading LLM Output Parser: {model_id}")
-
-        if service == "openai":
-            return OpenAI(
-                model=model_id,
-            )
-        else:
-            raise NotImplementedError(
-                "The implementation for other types of LLM output parsers are not ready yet!"
-            )
+        return {
+            "text": str(result["text"]),
+            "products": [
+                self._format_product(product)
+                for product in products
+                if isinstance(product, dict)
+            ],
+        }
+
+    def _parse_text(self, answer: str, product_rows: list[dict]) -> dict[str, Any]:
+        # Products mentioned in the answer, once, in the order of the tool results
+        products: dict[str, dict] = {}
+        for row in product_rows:
+            keys = [str(row[field]) for field in ("name", "url") if row.get(field)]
+            if any(key in answer for key in keys):
+                products.setdefault(keys[0], row)
+
+        mention_keys = {
+            str(row[field])
+            for row in products.values()
+            for field in ("name", "url")
+            if row.get(field)
+        }
+        text = "\n".join(
+            line
+            for line in answer.splitlines()
+            if not any(key in line for key in mention_keys)
+        ).strip()
+
+        return {
+            "text": text if products else answer,
+            "products": [self._format_product(row) for row in products.values()],
+        }
+
+    @staticmethod
+    def _parse_image_urls(image_urls: Any) -> list[str]:
+        if isinstance(image_urls, list):
+            return [str(url) for url in image_urls]
+
+        return [url for url in re.split(r"[\s,;]+", str(image_urls or "")) if url]
+
+    def _format_product(self, product: dict) -> dict[str, Any]:
+        formatted = {
+            field: (str(product[field]) if product.get(field) is not None else "")
+            for field in PRODUCT_FIELDS
+        }
+        formatted["price"] = parse_price(product.get("price"))
+        formatted["image_urls"] = self._parse_image_urls(product.get("image_urls"))
+
+        return formatted
+
+
+output_parser = OutputParser()
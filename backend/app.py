@@ -21,7 +21,8 @@ from api.routers import (
     admin_router,
     agent_router,
 )
-from src.database import init_db
+from src.settings import default_settings
+from src.database import init_db, init_runtime
 
 logger = get_formatted_logger(__file__)
 
@@ -81,6 +82,8 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application ...")
     logger.info("Initializing database ...")
     init_db()
+    logger.info("Initializing RAG runtime ...")
+    init_runtime(default_settings)
     logger.debug(f"Cleaning up download folder every {CLEAN_INTERVAL} minutes ...")
     asyncio.create_task(
         delete_old_files(
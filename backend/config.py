@@ -8,8 +8,85 @@ embeddings_config = dict(
     service="openai", model="text-embedding-3-large", chunk_size=1024
 )
 
+reader_config = dict(
+    html_reader="lxml",
+    strip_html_boilerplate=True,
+    json_records_per_document=20,
+    json_record_template=None,
+    # Documents chunked and indexed at once while a file is streamed
+    ingest_batch_size=50,
+)
+
+embedding_cache_config = dict(enabled=True, max_size=10000, ttl=24 * 60 * 60)
+
+# Set ANSWER_CACHE_REDIS_URL so that documents processed by Celery invalidate the API workers
+answer_cache_config = dict(
+    enabled=False, max_size=5000, ttl=60 * 60, similarity_threshold=0.95
+)
+
+# Inherited knowledge bases of the assistants, other processes see inheritance changes after ttl seconds
+kb_hierarchy_config = dict(max_size=10000, ttl=60)
+
+# Product files are indexed once per upload, on local disk and in memory
+# The products are embedded once by the document worker, keeping the first embedding_dim dimensions
+product_catalog_config = dict(
+    path="data/product_catalog",
+    max_size=64,
+    query_cache_size=1024,
+    embed_products=True,
+    embedding_dim=512,
+    fuzzy_weight=0.5,
+    semantic_weight=0.5,
+)
+
 global_vector_db_collection_name = "qdrant_collection"
 
+# Thresholds are in kilobytes of vectors, apply changes to existing collections with scripts/apply_qdrant_index_settings.py
+qdrant_config = dict(
+    hnsw_m=16,
+    hnsw_ef_construct=100,
+    full_scan_threshold=10000,
+    indexing_threshold=20000,
+    search_hnsw_ef=None,
+    # Move existing points to a partitioned collection with scripts/migrate_qdrant_collection.py
+    tenant_partitioning=True,
+    # Compare the profiles on real data with scripts/benchmark_quantization.py
+    quantization=dict(
+        default_profile="binary",
+        collection_profiles={},
+        profiles=dict(
+            none=dict(type="none", always_ram=False, oversampling=1.0, rescore=False),
+            binary=dict(type="binary", always_ram=True, oversampling=2.0, rescore=True),
+            scalar_int8=dict(
+                type="scalar",
+                always_ram=True,
+                oversampling=1.5,
+                rescore=True,
+                quantile=0.99,
+            ),
+            product_x16=dict(
+                type="product",
+                always_ram=True,
+                oversampling=3.0,
+                rescore=True,
+                compression="x16",
+            ),
+        ),
+    ),
+    # Two-stage search of text-embedding-3 embeddings: truncated to 512 dims first, then rescored at full dims.
+    # Only applies to new collections, migrate the existing ones with scripts/migrate_qdrant_collection.py
+    matryoshka_dim=512,
+    matryoshka_prefetch_factor=4.0,
+)
+
+# Embedded alternative to Qdrant for tests, benchmarks and single node installs (vector_database_service="numpy")
+numpy_vector_database_config = dict(
+    path="data/numpy_vector_database",
+    dtype="float32",
+    ivf_threshold=200000,
+    ivf_nprobe=16,
+)
+
 llm_config = dict(service="openai", model="gpt-4o-mini")
 
 contextual_rag_config = dict(
@@ -19,6 +96,63 @@ contextual_rag_config = dict(
     reranker_service="rankgpt_reranker",
     top_k=150,
     top_n=3,
+    hybrid_search=False,
+    fusion_top_n=20,
+    rrf_k=60,
+    rerank=False,
 )
 
-agent_config = dict(type="openai", use_agent_memory=False)
+llm_rerank_config = dict(
+    choice_batch_size=5,
+    window_size=20,
+    max_concurrency=8,
+    timeout=10.0,
+)
+
+cross_encoder_config = dict(
+    path="models/cross_encoder",
+    batch_size=32,
+    num_threads=4,
+    max_length=512,
+    cache_size=10000,
+)
+
+context_config = dict(
+    enabled=True,
+    token_budgets={"default": 4000, "gpt-4o-mini": 6000, "gpt-4o": 6000},
+    dedup_threshold=0.95,
+    mmr_lambda=0.7,
+    ordering="lost_in_the_middle",
+)
+
+agent_config = dict(type="openai", use_agent_memory=False, runtime_cache_size=128)
+
+# One Qdrant collection per memory type shared by the conversations, see src/agents/memory_storage
+agent_memory_config = dict(
+    collection_prefix="agent_",
+    ttl=7 * 24 * 3600,
+    prune_interval=3600,
+    batch_size=32,
+    flush_interval=1.0,
+)
+
+history_config = dict(
+    max_turns=10,
+    token_budget=3000,
+    summary_model="gpt-4o-mini",
+    summary_max_words=300,
+    fold_batch_size=20,
+    cache_size=10000,
+)
+
+cost_config = dict(langfuse_reconcile=False, reconcile_delay=300)
+
+telemetry_config = dict(
+    enabled=True,
+    sample_rates={"default": 1.0, "chat": 1.0, "chat_stream": 1.0},
+    max_queue_size=10000,
+    flush_at=50,
+    flush_interval=1.0,
+    flush_timeout=0.0,
+    threads=1,
+)
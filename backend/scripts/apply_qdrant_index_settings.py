@@ -0,0 +1,63 @@
+"""
+Apply the HNSW parameters, the indexing threshold, the quantization profile and the
+`kb_id` / `document_id` payload indexes of `qdrant_config` to existing Qdrant collections.
+
+Usage:
+    python scripts/apply_qdrant_index_settings.py
+    python scripts/apply_qdrant_index_settings.py --collection qdrant_collection --wait
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from qdrant_client.http import models
+
+from src.settings import default_settings
+from src.database.core import QdrantVectorDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--collection",
+        type=str,
+        nargs="+",
+        default=[default_settings.global_vector_db_collection_name],
+        help="Collections to update. Default to the global collection.",
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Wait until Qdrant has built the indexes.",
+    )
+    args = parser.parse_args()
+
+    qdrant_client = QdrantVectorDatabase.from_setting(default_settings)
+
+    for collection_name in args.collection:
+        qdrant_client.apply_index_settings(collection_name)
+
+        while args.wait:
+            info = qdrant_client.client.get_collection(collection_name)
+            print(
+                f"{collection_name}: status={info.status} - "
+                f"points={info.points_count} - indexed={info.indexed_vectors_count}"
+            )
+            if info.status == models.CollectionStatus.GREEN:
+                break
+            time.sleep(5)
+
+        info = qdrant_client.client.get_collection(collection_name)
+        print(
+            f"{collection_name}: hnsw={info.config.hnsw_config} - "
+            f"indexing_threshold={info.config.optimizer_config.indexing_threshold} - "
+            f"quantization={info.config.quantization_config} - "
+            f"payload_indexes={sorted(info.payload_schema)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Fill the `knowledge_base_closure` table from the legacy `knowledge_bases.children` arrays,
+then optionally drop the legacy `parents` / `children` columns.
+
+Usage:
+    python scripts/backfill_kb_closure.py
+    python scripts/backfill_kb_closure.py --drop-legacy-columns
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from sqlmodel import Session
+from sqlalchemy import inspect, text
+
+from src.database.core import sql_model, init_db
+from src.database import kb_hierarchy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--drop-legacy-columns",
+        action="store_true",
+        help="Drop the parents and children columns once the closure is filled.",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    engine = sql_model.engine
+
+    columns = {
+        column["name"] for column in inspect(engine).get_columns("knowledge_bases")
+    }
+    if "children" not in columns:
+        print("No legacy inheritance columns, nothing to backfill")
+        return
+
+    with Session(engine) as session:
+        edges = session.exec(
+            text(
+                "SELECT id, unnest(children) FROM knowledge_bases "
+                "WHERE children IS NOT NULL"
+            )
+        ).all()
+
+        # Existing knowledge bases only: deletions did not always clean the arrays
+        kb_ids = set(session.exec(text("SELECT id FROM knowledge_bases")).scalars())
+        edges = [
+            (parent_id, child_id)
+            for parent_id, child_id in edges
+            if parent_id in kb_ids and child_id in kb_ids
+        ]
+
+        # The closure is the same whatever the order of the edges
+        for parent_id, child_id in edges:
+            kb_hierarchy.add_inheritance(session, parent_id, child_id)
+
+        if args.drop_legacy_columns:
+            session.exec(
+                text(
+                    "ALTER TABLE knowledge_bases DROP COLUMN parents, DROP COLUMN children"
+                )
+            )
+
+        session.commit()
+
+    print(f"Backfilled {len(edges)} inheritances")
+
+
+if __name__ == "__main__":
+    main()
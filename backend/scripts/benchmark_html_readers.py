@@ -0,0 +1,106 @@
+"""
+Throughput benchmark of the HTML readers used by `get_extractor`.
+
+Usage:
+    python scripts/benchmark_html_readers.py --folder path/to/html_dump
+    python scripts/benchmark_html_readers.py --num-files 200 --readers lxml html2text
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.constants import HTMLReaderService
+from src.readers.utils import get_html_extractor
+
+SAMPLE_FILE = Path(__file__).parent.parent / "sample" / "test.html"
+
+
+def generate_files(folder: Path, num_files: int, repeat: int) -> list[Path]:
+    """
+    Generate synthetic help-center pages by repeating the article of the sample page.
+
+    Args:
+        folder (Path): Folder to write the files to
+        num_files (int): Number of files to generate
+        repeat (int): Number of times the article is repeated inside one page
+
+    Returns:
+        list[Path]: Generated files
+    """
+    html = SAMPLE_FILE.read_text(encoding="utf-8")
+    head, _, rest = html.partition("<main>")
+    article, _, tail = rest.partition("</main>")
+
+    files = []
+    for i in range(num_files):
+        file_path = folder / f"page_{i}.html"
+        file_path.write_text(
+            head + "<main>" + article * repeat + "</main>" + tail, encoding="utf-8"
+        )
+        files.append(file_path)
+
+    return files
+
+
+def benchmark(reader_name: str, files: list[Path]) -> dict:
+    reader = get_html_extractor(HTMLReaderService(reader_name))[".html"]
+
+    total_bytes = sum(file.stat().st_size for file in files)
+    total_chars = 0
+
+    start_time = time.perf_counter()
+    for file in files:
+        documents = reader.load_data(file)
+        total_chars += sum(len(doc.text) for doc in documents)
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "reader": reader_name,
+        "files": len(files),
+        "seconds": elapsed,
+        "files_per_second": len(files) / elapsed,
+        "mb_per_second": total_bytes / 1024 / 1024 / elapsed,
+        "extracted_chars": total_chars,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--folder", type=str, default=None, help="Folder of .html files"
+    )
+    parser.add_argument("--num-files", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--readers",
+        nargs="+",
+        default=[e.value for e in HTMLReaderService],
+        choices=[e.value for e in HTMLReaderService],
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.folder:
+            files = sorted(Path(args.folder).rglob("*.html"))
+        else:
+            files = generate_files(Path(temp_dir), args.num_files, args.repeat)
+
+        print(
+            f"{'reader':<14}{'files':>8}{'seconds':>10}{'files/s':>10}{'MB/s':>8}{'chars':>12}"
+        )
+        for reader_name in args.readers:
+            result = benchmark(reader_name, files)
+            print(
+                f"{result['reader']:<14}{result['files']:>8}{result['seconds']:>10.2f}"
+                f"{result['files_per_second']:>10.1f}{result['mb_per_second']:>8.2f}"
+                f"{result['extracted_chars']:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark the latency of the knowledge base filtered search against the collection size,
+with the index settings of `qdrant_config` and without any index (previous behaviour).
+
+Random vectors are inserted in temporary collections which are deleted at the end.
+
+Usage:
+    python scripts/benchmark_qdrant_search.py --sizes 10000 50000 100000 --num-kbs 200
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+from qdrant_client.http import models
+
+from src.settings import default_settings
+from src.constants import QdrantPayload
+from src.database.core import QdrantVectorDatabase
+
+
+def create_unindexed_collection(
+    qdrant_client: QdrantVectorDatabase, collection_name: str, dim: int
+):
+    """
+    Create a collection like before the index management: no HNSW index nor payload index
+    """
+    qdrant_client.client.create_collection(
+        collection_name,
+        vectors_config=models.VectorParams(
+            size=dim, distance=qdrant_client.distance, on_disk=True
+        ),
+        optimizers_config=models.OptimizersConfigDiff(
+            default_segment_number=5, indexing_threshold=0
+        ),
+        quantization_config=models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True),
+        ),
+    )
+
+
+def insert_random_points(
+    qdrant_client: QdrantVectorDatabase,
+    collection_name: str,
+    num_points: int,
+    kb_ids: list[str],
+    dim: int,
+    rng: np.random.Generator,
+    batch_size: int = 1000,
+):
+    for start in range(0, num_points, batch_size):
+        size = min(batch_size, num_points - start)
+        vectors = rng.standard_normal((size, dim), dtype=np.float32)
+        vector_ids = [str(uuid.uuid4()) for _ in range(size)]
+
+        qdrant_client.add_vectors(
+            collection_name=collection_name,
+            vector_ids=vector_ids,
+            vectors=vectors.tolist(),
+            payloads=[
+                QdrantPayload(
+                    document_id=str(uuid.uuid4()),
+                    text="",
+                    vector_id=vector_id,
+                    kb_id=kb_ids[rng.integers(len(kb_ids))],
+                )
+                for vector_id in vector_ids
+            ],
+        )
+
+
+def wait_until_indexed(qdrant_client: QdrantVectorDatabase, collection_name: str):
+    while (
+        qdrant_client.client.get_collection(collection_name).status
+        != models.CollectionStatus.GREEN
+    ):
+        time.sleep(1)
+
+
+def measure_latencies(
+    qdrant_client: QdrantVectorDatabase,
+    collection_name: str,
+    kb_ids: list[str],
+    dim: int,
+    num_queries: int,
+    top_k: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    latencies = []
+
+    for _ in range(num_queries):
+        query_kb_ids = list(rng.choice(kb_ids, size=min(3, len(kb_ids)), replace=False))
+
+        start = time.perf_counter()
+        qdrant_client.search_vector(
+            collection_name=collection_name,
+            vector=rng.standard_normal(dim, dtype=np.float32).tolist(),
+            search_params=qdrant_client.get_search_params(
+                collection_name,
+                hnsw_ef=default_settings.qdrant_config.search_hnsw_ef,
+            ),
+            query_filter=models.Filter(
+                should=[
+                    models.FieldCondition(
+                        key="kb_id", match=models.MatchAny(any=query_kb_ids)
+                    )
+                ]
+            ),
+            limit=top_k,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", type=str, default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--num-kbs", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setting = default_settings.model_copy(deep=True)
+    setting.qdrant_config.url = args.url
+    qdrant_client = QdrantVectorDatabase.from_setting(setting)
+
+    kb_ids = [str(uuid.uuid4()) for _ in range(args.num_kbs)]
+    collections = {
+        "indexed": f"benchmark_indexed_{uuid.uuid4().hex[:8]}",
+        "unindexed": f"benchmark_unindexed_{uuid.uuid4().hex[:8]}",
+    }
+
+    qdrant_client.create_collection(collections["indexed"], args.dim)
+    create_unindexed_collection(qdrant_client, collections["unindexed"], args.dim)
+
+    print("| points | collection | p50 (ms) | p95 (ms) | mean (ms) |")
+    print("|---|---|---|---|---|")
+
+    try:
+        num_points = 0
+        for size in sorted(args.sizes):
+            for name, collection_name in collections.items():
+                insert_random_points(
+                    qdrant_client,
+                    collection_name,
+                    size - num_points,
+                    kb_ids,
+                    args.dim,
+                    np.random.default_rng(args.seed + size),
+                )
+                wait_until_indexed(qdrant_client, collection_name)
+
+                latencies = measure_latencies(
+                    qdrant_client,
+                    collection_name,
+                    kb_ids,
+                    args.dim,
+                    args.queries,
+                    args.top_k,
+                    np.random.default_rng(args.seed),
+                )
+                print(
+                    f"| {size} | {name} | {np.percentile(latencies, 50):.1f} | "
+                    f"{np.percentile(latencies, 95):.1f} | {latencies.mean():.1f} |"
+                )
+
+            num_points = size
+    finally:
+        for collection_name in collections.values():
+            qdrant_client.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
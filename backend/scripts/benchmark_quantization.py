@@ -0,0 +1,212 @@
+"""
+Benchmark the quantization profiles of `qdrant_config.quantization`: recall@k against the exact search,
+search latency and memory of the quantized vectors.
+
+With `--matryoshka-dim`, the collections are searched in two stages: truncated embeddings first, then the
+shortlist is rescored with the full embeddings. The exact search always uses the full embeddings.
+
+Use real embeddings with `--source-collection`: random vectors are the worst case for quantization.
+The points are copied to temporary collections, one per profile, which are deleted at the end.
+
+Usage:
+    python scripts/benchmark_quantization.py --source-collection qdrant_collection --num-points 20000
+    python scripts/benchmark_quantization.py --profiles binary scalar_int8 --dim 3072 --top-k 10
+    python scripts/benchmark_quantization.py --source-collection qdrant_collection --matryoshka-dim 256
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+from qdrant_client.http import models
+
+from src.settings import default_settings
+from src.constants import QuantizationType
+from src.database.core import QdrantVectorDatabase
+from src.database.core.vector_database import FULL_VECTOR_NAME
+
+
+def get_quantized_bytes(profile_type: QuantizationType, dim: int, compression: str):
+    """
+    Estimate the size of one quantized vector in bytes
+    """
+    if profile_type == QuantizationType.BINARY:
+        return dim / 8
+    elif profile_type == QuantizationType.SCALAR:
+        return dim
+    elif profile_type == QuantizationType.PRODUCT:
+        return dim * 4 / int((compression or "x16")[1:])
+
+    return dim * 4
+
+
+def load_vectors(
+    qdrant_client: QdrantVectorDatabase,
+    source_collection: str | None,
+    num_vectors: int,
+    dim: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Load vectors from an existing collection, or draw random ones
+    """
+    if source_collection is None:
+        return rng.standard_normal((num_vectors, dim), dtype=np.float32)
+
+    vectors, offset = [], None
+    while len(vectors) < num_vectors:
+        points, offset = qdrant_client.client.scroll(
+            collection_name=source_collection,
+            limit=min(1000, num_vectors - len(vectors)),
+            offset=offset,
+            with_vectors=True,
+        )
+        vectors.extend(
+            point.vector[FULL_VECTOR_NAME]
+            if isinstance(point.vector, dict)
+            else point.vector
+            for point in points
+        )
+
+        if offset is None:
+            break
+
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", type=str, default=os.getenv("QDRANT_URL"))
+    parser.add_argument("--source-collection", type=str, default=None)
+    parser.add_argument(
+        "--profiles",
+        type=str,
+        nargs="+",
+        default=list(default_settings.qdrant_config.quantization.profiles),
+    )
+    parser.add_argument("--num-points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--matryoshka-dim",
+        type=int,
+        default=None,
+        help="Dimension of the first pass embeddings. Default to a single pass on the full embeddings.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setting = default_settings.model_copy(deep=True)
+    setting.qdrant_config.url = args.url
+    qdrant_client = QdrantVectorDatabase.from_setting(setting)
+    qdrant_client.small_vector_dim = args.matryoshka_dim
+
+    rng = np.random.default_rng(args.seed)
+    vectors = load_vectors(
+        qdrant_client,
+        args.source_collection,
+        args.num_points + args.queries,
+        args.dim,
+        rng,
+    )
+    # Held out vectors are the queries
+    queries, vectors = vectors[: args.queries], vectors[args.queries :]
+    vector_ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+
+    print(
+        f"points: {len(vectors)} - dim: {vectors.shape[1]} - queries: {len(queries)} - "
+        f"matryoshka dim: {args.matryoshka_dim} - prefetch factor: {qdrant_client.prefetch_factor}\n"
+    )
+    print(
+        "| profile | oversampling | rescore | recall@k | p50 (ms) | p95 (ms) | quantized (MB) |"
+    )
+    print("|---|---|---|---|---|---|---|")
+
+    for profile_name in args.profiles:
+        collection_name = f"benchmark_{profile_name}_{uuid.uuid4().hex[:8]}"
+        qdrant_client.quantization.collection_profiles[collection_name] = profile_name
+        profile = qdrant_client.get_quantization_profile(collection_name)
+
+        try:
+            qdrant_client.create_collection(collection_name, vectors.shape[1])
+            for start in range(0, len(vectors), 1000):
+                qdrant_client.client.upsert(
+                    collection_name,
+                    points=[
+                        models.PointStruct(
+                            id=vector_id,
+                            vector=qdrant_client.get_point_vector(
+                                collection_name, vector
+                            ),
+                        )
+                        for vector_id, vector in zip(
+                            vector_ids[start : start + 1000],
+                            vectors[start : start + 1000].tolist(),
+                        )
+                    ],
+                )
+
+            while (
+                qdrant_client.client.get_collection(collection_name).status
+                != models.CollectionStatus.GREEN
+            ):
+                time.sleep(1)
+
+            exact_params = qdrant_client.get_search_params(collection_name, exact=True)
+            search_params = qdrant_client.get_search_params(
+                collection_name, hnsw_ef=setting.qdrant_config.search_hnsw_ef
+            )
+
+            using = (
+                FULL_VECTOR_NAME
+                if qdrant_client.get_small_vector_dim(collection_name)
+                else None
+            )
+
+            recalls, latencies = [], []
+            for query in queries.tolist():
+                exact = qdrant_client.client.query_points(
+                    collection_name,
+                    query=query,
+                    using=using,
+                    search_params=exact_params,
+                    limit=args.top_k,
+                )
+
+                start = time.perf_counter()
+                approximate = qdrant_client.search_vector(
+                    collection_name,
+                    vector=query,
+                    search_params=search_params,
+                    limit=args.top_k,
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+
+                exact_ids = {point.id for point in exact.points}
+                recalls.append(
+                    len(exact_ids & {point.id for point in approximate.points})
+                    / max(len(exact_ids), 1)
+                )
+
+            quantized_mb = (
+                get_quantized_bytes(profile.type, vectors.shape[1], profile.compression)
+                * len(vectors)
+                / 2**20
+            )
+            print(
+                f"| {profile_name} | {profile.oversampling} | {profile.rescore} | "
+                f"{np.mean(recalls):.3f} | {np.percentile(latencies, 50):.1f} | "
+                f"{np.percentile(latencies, 95):.1f} | {quantized_mb:.1f} |"
+            )
+        finally:
+            qdrant_client.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Export a HuggingFace cross-encoder to ONNX for the `cross_encoder_reranker` reranker.
+
+Requires the optional dependencies: `pip install -r requirements-cross-encoder.txt`
+
+Usage:
+    python scripts/export_cross_encoder_onnx.py --model cross-encoder/ms-marco-MiniLM-L-6-v2 --output models/cross_encoder
+"""
+
+import argparse
+from pathlib import Path
+
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+try:
+    import onnx  # noqa: F401, required by `torch.onnx.export`
+except ImportError:
+    raise ImportError(
+        "Cannot import onnx package, please `pip install -r requirements-cross-encoder.txt`"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--model", type=str, default="cross-encoder/ms-marco-MiniLM-L-6-v2"
+    )
+    parser.add_argument("--output", type=str, default="models/cross_encoder")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForSequenceClassification.from_pretrained(args.model).eval()
+
+    inputs = tokenizer(
+        ["query", "query"],
+        ["a passage", "another passage"],
+        padding=True,
+        return_tensors="pt",
+    )
+    input_names = [
+        name
+        for name in ["input_ids", "attention_mask", "token_type_ids"]
+        if name in inputs
+    ]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(inputs[name] for name in input_names),
+            str(output / "model.onnx"),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=args.opset,
+        )
+
+    tokenizer.save_pretrained(output)
+
+    print(f"Exported {args.model} to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Migrate the points of a Qdrant collection to a collection created with the current `qdrant_config`,
+e.g. to partition the existing global collection by knowledge base.
+
+Stop the Celery workers during the migration: points written to the source meanwhile may be lost.
+
+Usage:
+    # Recreate the global collection in place (copies the points twice)
+    python scripts/migrate_qdrant_collection.py --in-place
+
+    # Move the points to a new collection, then set `global_vector_db_collection_name` to it
+    python scripts/migrate_qdrant_collection.py --source qdrant_collection --target qdrant_collection_v2
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.settings import default_settings
+from src.database.core import QdrantVectorDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--source",
+        type=str,
+        default=default_settings.global_vector_db_collection_name,
+        help="Collection to migrate. Default to the global collection.",
+    )
+    parser.add_argument("--target", type=str, default=None)
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Recreate the source collection through a temporary collection.",
+    )
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    assert (args.target is None) == args.in_place, "Use either --target or --in-place"
+
+    qdrant_client = QdrantVectorDatabase.from_setting(default_settings)
+
+    if args.in_place:
+        temp_collection = f"{args.source}_migration"
+        qdrant_client.migrate_collection(
+            args.source, temp_collection, batch_size=args.batch_size
+        )
+        qdrant_client.migrate_collection(
+            temp_collection, args.source, batch_size=args.batch_size
+        )
+        target = args.source
+    else:
+        qdrant_client.migrate_collection(
+            args.source, args.target, batch_size=args.batch_size
+        )
+        target = args.target
+
+    info = qdrant_client.client.get_collection(target)
+    print(
+        f"{target}: points={info.points_count} - hnsw={info.config.hnsw_config} - "
+        f"payload_indexes={ {name: index.params for name, index in info.payload_schema.items()} }"
+    )
+
+
+if __name__ == "__main__":
+    main()
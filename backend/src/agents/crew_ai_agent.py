@@ -9,14 +9,15 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from typing import Any, Type
 from crewai import Agent, Crew, Task
+from crewai.crews.crew_output import CrewOutput
 from crewai.memory.entity.entity_memory import EntityMemory
 from langchain_core.language_models.chat_models import BaseChatModel
 from crewai.memory.short_term.short_term_memory import ShortTermMemory
 
 from .memory_storage import QdrantStorage, EmbedderConfig
 from src.settings import default_settings
-from src.constants import embedding_dim
-from src.utils import get_formatted_logger
+from src.constants import embedding_dim, AgentMemoryType
+from src.utils import get_formatted_logger, record_usage
 
 logger = get_formatted_logger(__file__)
 
@@ -109,7 +110,8 @@ class CrewAIAgent:
                 verbose=self.verbose,
                 entity_memory=EntityMemory(
                     storage=QdrantStorage(
-                        type=f"entity_memory_{self.conversation_id}",
+                        type=AgentMemoryType.ENTITY.value,
+                        conversation_id=self.conversation_id,
                         url=default_settings.qdrant_config.url,
                         vector_size=self.vector_size,
                         quantize=self.quantize,
@@ -123,7 +125,8 @@ class CrewAIAgent:
                 ),
                 short_term_memory=ShortTermMemory(
                     storage=QdrantStorage(
-                        type=f"short_term_memory_{self.conversation_id}",
+                        type=AgentMemoryType.SHORT_TERM.value,
+                        conversation_id=self.conversation_id,
                         url=default_settings.qdrant_config.url,
                         vector_size=self.vector_size,
                         quantize=self.quantize,
@@ -144,9 +147,21 @@ class CrewAIAgent:
             verbose=self.verbose,
         )
 
+    def _record_usage(self, output: CrewOutput):
+        # The LLM calls of the agents, the tools record their own calls
+        record_usage(
+            self.manager_llm.model_name,
+            output.token_usage.prompt_tokens,
+            output.token_usage.completion_tokens,
+        )
+
     def chat(self, inputs: Any, *args, **kwargs) -> Any:
-        return self.crew.kickoff(inputs=inputs).raw
+        # A kickoff interpolates the inputs in the tasks: concurrent messages run on their own copy
+        output = self.crew.copy().kickoff(inputs=inputs)
+        self._record_usage(output)
+        return output.raw
 
     async def chat_async(self, inputs: Any, *args, **kwargs) -> Any:
-        output = await self.crew.kickoff_async(inputs=inputs)
+        output = await self.crew.copy().kickoff_async(inputs=inputs)
+        self._record_usage(output)
         return output.raw
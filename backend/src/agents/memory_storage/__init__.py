@@ -1 +1,7 @@
-from .qdrant_storage import QdrantStorage, EmbedderConfig  # noqa: F401
+from .qdrant_storage import (  # noqa: F401
+    QdrantStorage,
+    EmbedderConfig,
+    MemoryCollection,
+    get_memory_collection,
+    delete_conversation_memory,
+)
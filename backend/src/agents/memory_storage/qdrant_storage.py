@@ -1,7 +1,11 @@
 import sys
+import time
 import uuid
+import atexit
+import threading
 from crewai import Crew
 from pathlib import Path
+from functools import lru_cache
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from qdrant_client import QdrantClient, models
@@ -9,7 +13,19 @@ from crewai.memory.storage.rag_storage import RAGStorage
 
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
-from src.database import get_embedding
+from src.database import get_embeddings, get_query_embedding
+from src.settings import default_settings
+from src.constants import AgentMemoryType
+from src.utils import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+# Payload fields of the memories, the conversation is the tenant of the shared collections
+CONVERSATION_ID_FIELD = "conversation_id"
+CREATED_AT_FIELD = "created_at"
+
+# Writes of a memory before it is dropped, e.g. if the embedding service rejects it
+MAX_WRITE_ATTEMPTS = 3
 
 
 class EmbedderConfig(BaseModel):
@@ -17,15 +33,462 @@ class EmbedderConfig(BaseModel):
     config: Dict[str, Any]
 
 
+@lru_cache(maxsize=None)
+def get_qdrant_client(url: str) -> QdrantClient:
+    """
+    Get the Qdrant client of the memories, shared by the collections
+
+    Args:
+        url (str): Qdrant url
+
+    Returns:
+        QdrantClient: The client
+    """
+    return QdrantClient(url)
+
+
+def get_conversation_filter(conversation_id: str) -> models.Filter:
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key=CONVERSATION_ID_FIELD,
+                match=models.MatchValue(value=conversation_id),
+            )
+        ]
+    )
+
+
+class MemoryCollection:
+    """
+    Qdrant collection of one memory type shared by all the conversations, partitioned by a tenant
+    index on `conversation_id`: one HNSW graph per conversation instead of one collection.
+
+    Saved memories are buffered and a background thread embeds and upserts them in batches, so
+    that the agents do not wait for an embedding request per memory. A batch which fails is queued
+    again, and the queued memories are written at exit. The memories older than `ttl` are not
+    searched anymore and are deleted every `prune_interval` seconds.
+
+    Args:
+        url (str): Qdrant url
+        collection_name (str): Collection name
+        vector_size (int): Size of the embeddings
+        embed_service (str): Embedding service
+        embed_model (str): Embedding model
+        distance (str): Distance of the vectors
+        quantize (bool): Binary quantization of the vectors
+        ttl (Optional[int]): Seconds a memory is kept, forever if `None`
+        prune_interval (int): Seconds between two deletions of the expired memories
+        batch_size (int): Maximum number of memories embedded and upserted at once
+        flush_interval (float): Seconds a saved memory waits for a batch before being embedded
+    """
+
+    def __init__(
+        self,
+        url: str,
+        collection_name: str,
+        vector_size: int,
+        embed_service: str,
+        embed_model: str,
+        distance: str = models.Distance.COSINE,
+        quantize: bool = True,
+        ttl: Optional[int] = None,
+        prune_interval: int = 3600,
+        batch_size: int = 32,
+        flush_interval: float = 1.0,
+    ):
+        self.client = get_qdrant_client(url)
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.embed_service = embed_service
+        self.embed_model = embed_model
+        self.distance = distance
+        self.quantize = quantize
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # (conversation_id, document, metadata, created_at, attempts) waiting for the writer
+        self._pending: list[tuple[str, str, dict, float, int]] = []
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._last_prune = 0.0
+
+        self._create_collection()
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def _create_collection(self):
+        if not self.client.collection_exists(self.collection_name):
+            logger.info("Creating memory collection %s", self.collection_name)
+
+            qdrant_config = dict(
+                vectors_config=models.VectorParams(
+                    size=self.vector_size, distance=self.distance, on_disk=True
+                ),
+                # The searches are always filtered on a conversation: no global graph
+                hnsw_config=models.HnswConfigDiff(
+                    m=0, payload_m=default_settings.qdrant_config.hnsw_m
+                ),
+            )
+            if self.quantize:
+                qdrant_config.update(
+                    optimizers_config=models.OptimizersConfigDiff(
+                        default_segment_number=5,
+                    ),
+                    quantization_config=models.BinaryQuantization(
+                        binary=models.BinaryQuantizationConfig(always_ram=True),
+                    ),
+                )
+
+            self.client.create_collection(
+                collection_name=self.collection_name, **qdrant_config
+            )
+
+        payload_schema = self.client.get_collection(self.collection_name).payload_schema
+        payload_indexes = {
+            CONVERSATION_ID_FIELD: models.KeywordIndexParams(
+                type=models.KeywordIndexType.KEYWORD, is_tenant=True
+            ),
+            CREATED_AT_FIELD: models.PayloadSchemaType.FLOAT,
+        }
+        for field_name, field_schema in payload_indexes.items():
+            if field_name not in payload_schema:
+                self.client.create_payload_index(
+                    self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                    wait=True,
+                )
+
+    def _get_filter(
+        self, conversation_id: str, filter: Optional[models.Filter] = None
+    ) -> models.Filter:
+        must = [get_conversation_filter(conversation_id)]
+        if self.ttl is not None:
+            must.append(
+                models.FieldCondition(
+                    key=CREATED_AT_FIELD,
+                    range=models.Range(gte=time.time() - self.ttl),
+                )
+            )
+        if filter is not None:
+            must.append(filter)
+
+        return models.Filter(must=must)
+
+    def add(self, conversation_id: str, document: str, metadata: Dict[str, Any]):
+        """
+        Queue a memory of a conversation, embedded and upserted in the background
+
+        Args:
+            conversation_id (str): Conversation ID
+            document (str): Memory
+            metadata (Dict[str, Any]): Metadata of the memory
+        """
+        with self._condition:
+            self._pending.append((conversation_id, document, metadata, time.time(), 0))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def flush(self, conversation_id: Optional[str] = None):
+        """
+        Embed and upsert the queued memories now
+
+        Args:
+            conversation_id (Optional[str]): Only if some memories of this conversation are queued, always if `None`
+        """
+        with self._condition:
+            # A batch being written may hold memories of the conversation
+            if not self._write_lock.locked() and not any(
+                conversation_id is None or item[0] == conversation_id
+                for item in self._pending
+            ):
+                return
+
+        self._write_pending()
+
+    def _writer(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+
+            try:
+                self._write_pending()
+                self.prune()
+            except Exception as e:
+                logger.error(f"{self.collection_name} - failed to write memories: {e}")
+                # The failed batch is queued again, wait before retrying it
+                time.sleep(self.flush_interval)
+
+    def _requeue(self, batch: list[tuple[str, str, dict, float, int]]):
+        retried = [
+            (conversation_id, document, metadata, created_at, attempts + 1)
+            for conversation_id, document, metadata, created_at, attempts in batch
+            if attempts + 1 < MAX_WRITE_ATTEMPTS
+        ]
+        if len(retried) < len(batch):
+            logger.error(
+                f"{self.collection_name} - dropped {len(batch) - len(retried)} memories "
+                f"after {MAX_WRITE_ATTEMPTS} failed writes"
+            )
+
+        with self._condition:
+            self._pending[:0] = retried
+
+    def _write_pending(self):
+        with self._write_lock:
+            while True:
+                with self._condition:
+                    batch = self._pending[: self.batch_size]
+                    del self._pending[: self.batch_size]
+
+                if not batch:
+                    return
+
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    self._requeue(batch)
+                    raise
+
+    def _write_batch(self, batch: list[tuple[str, str, dict, float, int]]):
+        vectors = get_embeddings(
+            [document for _, document, _, _, _ in batch],
+            service=self.embed_service,
+            model_name=self.embed_model,
+        )
+        points = [
+            models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=vector,
+                payload={
+                    "document": document,
+                    "metadata": metadata,
+                    CONVERSATION_ID_FIELD: conversation_id,
+                    CREATED_AT_FIELD: created_at,
+                },
+            )
+            for (
+                conversation_id,
+                document,
+                metadata,
+                created_at,
+                _,
+            ), vector in zip(batch, vectors)
+        ]
+        self.client.upsert(self.collection_name, points=points)
+
+    def search(
+        self,
+        conversation_id: str,
+        query: str,
+        limit: int = 3,
+        filter: Optional[models.Filter] = None,
+        score_threshold: float = 0,
+    ) -> List[models.ScoredPoint]:
+        """
+        Search the memories of a conversation
+
+        Args:
+            conversation_id (str): Conversation ID
+            query (str): Query
+            limit (int): Maximum number of memories. Default to `3`.
+            filter (Optional[models.Filter]): Additional filter. Default to `None`.
+            score_threshold (float): Minimum score of the memories. Default to `0`.
+
+        Returns:
+            List[models.ScoredPoint]: Memories, best first
+        """
+        # The memories saved by the previous tasks of the conversation are searchable. A failed
+        # write stays queued for the writer, the memories already written are searched.
+        try:
+            self.flush(conversation_id)
+        except Exception as e:
+            logger.error(f"{self.collection_name} - failed to write memories: {e}")
+
+        embeded_text = get_query_embedding(
+            query, service=self.embed_service, model_name=self.embed_model
+        )
+
+        return self.client.query_points(
+            self.collection_name,
+            query=embeded_text,
+            query_filter=self._get_filter(conversation_id, filter),
+            limit=limit,
+            score_threshold=score_threshold,
+        ).points
+
+    def delete(self, conversation_id: str):
+        """
+        Delete the memories of a conversation, queued ones included
+
+        Args:
+            conversation_id (str): Conversation ID
+        """
+        # A batch being written is upserted, or queued again, before the deletion
+        with self._write_lock:
+            with self._condition:
+                self._pending = [
+                    item for item in self._pending if item[0] != conversation_id
+                ]
+
+            self.client.delete(
+                self.collection_name,
+                points_selector=models.FilterSelector(
+                    filter=get_conversation_filter(conversation_id)
+                ),
+            )
+
+    def prune(self):
+        """
+        Delete the expired memories, at most once per `prune_interval`
+        """
+        now = time.time()
+        if self.ttl is None or now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+
+        self.client.delete(
+            self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key=CREATED_AT_FIELD,
+                            range=models.Range(lt=now - self.ttl),
+                        )
+                    ]
+                )
+            ),
+            wait=False,
+        )
+        logger.debug(
+            "%s - pruned the memories older than %ss", self.collection_name, self.ttl
+        )
+
+
+# Shared collections by (url, memory type, embedding model)
+memory_collections: dict[tuple, MemoryCollection] = {}
+_memory_collections_lock = threading.Lock()
+
+
+def get_memory_collection(
+    url: str,
+    type: str,
+    vector_size: int,
+    embed_service: str,
+    embed_model: str,
+    distance: str = models.Distance.COSINE,
+    quantize: bool = True,
+) -> MemoryCollection:
+    """
+    Get the shared collection of a memory type, created once per process
+
+    Args:
+        url (str): Qdrant url
+        type (str): Memory type, e.g. `entity_memory`
+        vector_size (int): Size of the embeddings
+        embed_service (str): Embedding service
+        embed_model (str): Embedding model
+        distance (str): Distance of the vectors. Default to `models.Distance.COSINE`.
+        quantize (bool): Binary quantization of the vectors. Default to `True`.
+
+    Returns:
+        MemoryCollection: The shared collection
+    """
+    memory_config = default_settings.agent_memory_config
+    key = (url, str(type), embed_service, embed_model)
+
+    with _memory_collections_lock:
+        if key not in memory_collections:
+            memory_collections[key] = MemoryCollection(
+                url=url,
+                collection_name=get_memory_collection_name(type),
+                vector_size=vector_size,
+                embed_service=embed_service,
+                embed_model=embed_model,
+                distance=distance,
+                quantize=quantize,
+                ttl=memory_config.ttl,
+                prune_interval=memory_config.prune_interval,
+                batch_size=memory_config.batch_size,
+                flush_interval=memory_config.flush_interval,
+            )
+
+        return memory_collections[key]
+
+
+def flush_memory_collections():
+    """
+    Write the memories still queued by the collections of the process, at exit
+    """
+    with _memory_collections_lock:
+        collections = list(memory_collections.values())
+
+    for collection in collections:
+        try:
+            collection.flush()
+        except Exception as e:
+            logger.error(
+                f"{collection.collection_name} - failed to write memories at exit: {e}"
+            )
+
+
+atexit.register(flush_memory_collections)
+
+
+def get_memory_collection_name(type: str) -> str:
+    return f"{default_settings.agent_memory_config.collection_prefix}{type}"
+
+
+def delete_conversation_memory(
+    conversation_id: str | uuid.UUID, url: str = default_settings.qdrant_config.url
+):
+    """
+    Delete the memories of a conversation from the shared collections
+
+    Args:
+        conversation_id (str | uuid.UUID): Conversation ID
+        url (str): Qdrant url. Default to `default_settings.qdrant_config.url`.
+    """
+    conversation_id = str(conversation_id)
+
+    with _memory_collections_lock:
+        collections = list(memory_collections.values())
+    for collection in collections:
+        collection.delete(conversation_id)
+
+    # Collections of the memory types not used by this process
+    client = get_qdrant_client(url)
+    deleted = {collection.collection_name for collection in collections}
+    for memory_type in AgentMemoryType:
+        collection_name = get_memory_collection_name(memory_type)
+        if collection_name in deleted or not client.collection_exists(collection_name):
+            continue
+
+        client.delete(
+            collection_name,
+            points_selector=models.FilterSelector(
+                filter=get_conversation_filter(conversation_id)
+            ),
+        )
+
+
 class QdrantStorage(RAGStorage):
     """
     Extends Storage to handle embeddings for memory entries using Qdrant.
 
+    The memories of a conversation are stored in the collection of their type shared by all the
+    conversations (see `MemoryCollection`), filtered on the conversation ID.
     """
 
     def __init__(
         self,
         type,
+        conversation_id: str,
         url: str,
         vector_size: int,
         distance: str = models.Distance.COSINE,
@@ -35,24 +498,12 @@ class QdrantStorage(RAGStorage):
         crew: Crew = None,
     ):
         self.url = url
-        self.qdrant_config = dict(
-            vectors_config=models.VectorParams(
-                size=vector_size, distance=distance, on_disk=True
-            ),
-        )
+        self.conversation_id = str(conversation_id)
+        self.vector_size = vector_size
+        self.distance = distance
+        self.quantize = quantize
         self.embedding_config = embedder_config  # Not use self.embedder_config to not shadow the parent class
 
-        if quantize:
-            self.qdrant_config.update(
-                optimizers_config=models.OptimizersConfigDiff(
-                    default_segment_number=5,
-                    indexing_threshold=0,
-                ),
-                quantization_config=models.BinaryQuantization(
-                    binary=models.BinaryQuantizationConfig(always_ram=True),
-                ),
-            )
-
         super().__init__(type, allow_reset, embedder_config, crew)
 
     def search(
@@ -62,17 +513,11 @@ class QdrantStorage(RAGStorage):
         filter: Optional[dict] = None,
         score_threshold: float = 0,
     ) -> List[Any]:
-        embeded_text = get_embedding(
+        points = self.collection.search(
+            self.conversation_id,
             query,
-            service=self.embedding_config.provider,
-            model_name=self.embedding_config.config["model"],
-        )
-
-        points = self.client.query_points(
-            self.type,
-            query=embeded_text,
-            query_filter=filter,
             limit=limit,
+            filter=filter,
             score_threshold=score_threshold,
         )
         results = [
@@ -82,35 +527,24 @@ class QdrantStorage(RAGStorage):
                 "context": point.payload["document"],
                 "score": point.score,
             }
-            for point in points.points
+            for point in points
         ]
 
         return results
 
     def reset(self) -> None:
-        self.client.delete_collection(self.type)
+        self.collection.delete(self.conversation_id)
 
     def _initialize_app(self):
-        self.client = QdrantClient(self.url)
-        if not self.client.collection_exists(self.type):
-            print(f"Creating collection {self.type}")
-            self.client.create_collection(
-                collection_name=self.type,
-                **self.qdrant_config,
-            )
+        self.collection = get_memory_collection(
+            url=self.url,
+            type=self.type,
+            vector_size=self.vector_size,
+            embed_service=self.embedding_config.provider,
+            embed_model=self.embedding_config.config["model"],
+            distance=self.distance,
+            quantize=self.quantize,
+        )
 
     def save(self, value: Any, metadata: Dict[str, Any]) -> None:
-        vector = get_embedding(
-            value,
-            service=self.embedding_config.provider,
-            model_name=self.embedding_config.config["model"],
-        )
-        point = models.PointStruct(
-            id=str(uuid.uuid4()),
-            vector=vector,
-            payload={
-                "document": value,
-                "metadata": metadata or {},
-            },
-        )
-        self.client.upsert(self.type, points=[point])
+        self.collection.add(self.conversation_id, value, metadata or {})
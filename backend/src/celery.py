@@ -8,7 +8,11 @@ celery_app = Celery(
     "document_parser",
     backend=os.getenv("CELERY_BACKEND"),
     broker=os.getenv("CELERY_BROKER_URL"),
-    include=["src.tasks.document_parse"],
+    include=[
+        "src.tasks.document_parse",
+        "src.tasks.cost_reconcile",
+        "src.tasks.product_catalog",
+    ],
 )
 
 celery_app.conf.update(
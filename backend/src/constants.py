@@ -1,7 +1,7 @@
 import enum
 from uuid import UUID
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from llama_index.core.bridge.pydantic import BaseModel
 
 DOWNLOAD_FOLDER = Path("downloads")
@@ -12,10 +12,12 @@ SUPPORTED_FILE_EXTENSIONS = [
     ".pdf",
     ".docx",
     ".html",
+    ".mhtml",
     ".txt",
     ".csv",
     ".xlsx",
     ".json",
+    ".jsonl",
     # ".pptx",
 ]
 
@@ -41,11 +43,9 @@ Please ONLY return in json format like this:
 }}
 """
 
-CHAT_AGENT_RESPONSE_PROMPT = """Bạn được cung cấp phản hồi từ trợ lý của chúng tôi, trong đó có phần thông tin phản hồi và phần thông tin sản phẩm. Nhiệm vụ của bạn hãy trích xuất các thông tin này.
-
-Hãy trả lời theo định dạng JSON hợp lệ. Dưới đây là cấu trúc mong muốn:
-{{
-    "text": "<nội dung phản hồi từ nội dung đưa vào>",
+STRUCTURED_ANSWER_PROMPT = """Hãy trả lời theo định dạng JSON hợp lệ. Dưới đây là cấu trúc mong muốn:
+{
+    "text": "<nội dung phản hồi>",
     "products": [{
         "url": "<url sản phẩm>",
         "name": "<tên sản phẩm>",
@@ -53,15 +53,12 @@ Hãy trả lời theo định dạng JSON hợp lệ. Dưới đây là cấu tr
         "price": "<giá sản phẩm>",
         "image_urls": [<danh sách hình ảnh>],
         "description": "<mô tả sản phẩm>"
-
     },...]
-}}
+}
 
 Lưu ý:
 - `text`: là nội dung phản hồi lược bỏ đi phần thông tin sản phẩm.
-- Đảm bảo tất cả khóa và giá trị chuỗi phải có dấu ngoặc kép.
-- Nếu không có thông tin sản phẩm nào, hãy trả chuỗi rỗng cho `products`.
-- Trong trường hợp bạn không trích xuất được bất kỳ sản phẩm nào, hãy trả về toàn bộ nội dung bạn được cung cấp trong: `text`.
+- `products`: chỉ gồm các sản phẩm lấy từ công cụ tìm kiếm sản phẩm, trả về danh sách rỗng nếu không có sản phẩm nào.
 - Với price, hãy trả về dưới dạng số, không thêm bất kỳ đơn vị tiền tệ nào đằng sau.
 - Trả về JSON hợp lệ và không thêm thông tin khác ngoài JSON."""
 
@@ -85,6 +82,22 @@ Here are something you should pay attention to:
 If there are any product's link, please provide the link in the response.
 """
 
+HISTORY_SUMMARY_PROMPT = """
+Below are the summary of a conversation between a user and an assistant so far, and the messages that follow it.
+
+Current summary:
+{summary}
+
+Following messages:
+{messages}
+
+Update the summary with the following messages. Keep what matters to continue the conversation: the needs of the user,
+the information they gave, the products and answers mentioned and the open questions.
+Write the summary in the language of the conversation, in at most {max_words} words.
+"""
+
+HISTORY_SUMMARY_MESSAGE = "Summary of the earlier conversation:\n{summary}"
+
 embedding_dim = {"text-embedding-ada-002": 1536, "text-embedding-3-large": 3072}
 
 
@@ -103,6 +116,25 @@ class DocumentMetadata(BaseModel):
     contextualized_content: str
 
 
+class ElasticSearchResponse(BaseModel):
+    """
+    ElasticSearch hit schema.
+
+    Attributes:
+        vector_id (str): Vector ID of the chunk, the same as in the vector store.
+        content (str): Original content of the chunk.
+        contextualized_content (str): Contextualized content of the chunk.
+        score (float): BM25 score of the hit.
+        document_id (Optional[str]): Document ID of the chunk.
+    """
+
+    vector_id: str
+    content: str
+    contextualized_content: str
+    score: float = 0.0
+    document_id: Optional[str] = None
+
+
 class QdrantPayload(BaseModel):
     """
     Payload for the vector
@@ -131,7 +163,7 @@ class ChatAssistantConfig(BaseModel):
         embedding_service (str): Embedding service name.
         embedding_model_name (str): Embedding model name.
         collection_name (str): Collection name.
-        session_id (str): Session ID.
+        session_id (str | None): Session ID, `None` for the cached assistants which get it per message.
         tools (list[str]): List of tools to be used.
         agent_backstory (str): Agent backstory for crewai agent.
         is_contextual_rag (bool): Flag to indicate if using contextual RAG.
@@ -147,7 +179,7 @@ class ChatAssistantConfig(BaseModel):
     embedding_model_name: str
     collection_name: str
     kb_ids: list[str | UUID]
-    session_id: str
+    session_id: str | None = None
     tools: Dict[str, Dict[str, Any]]
     agent_backstory: str
     is_contextual_rag: bool
@@ -240,6 +272,46 @@ class VectorDatabaseService(str, enum.Enum):
         return str(self.value)
 
     QDRANT = "qdrant"
+    NUMPY = "numpy"
+
+
+class QuantizationType(str, enum.Enum):
+    """
+    Vector quantization type schema.
+    """
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    NONE = "none"
+    BINARY = "binary"
+    SCALAR = "scalar"
+    PRODUCT = "product"
+
+
+class HTMLReaderService(str, enum.Enum):
+    """
+    HTML reader service schema.
+    """
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    LXML = "lxml"
+    HTML2TEXT = "html2text"
+    UNSTRUCTURED = "unstructured"
+
+
+class ContextOrdering(str, enum.Enum):
+    """
+    Order of the retrieved contexts in the prompt schema.
+    """
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    RELEVANCE = "relevance"
+    LOST_IN_THE_MIDDLE = "lost_in_the_middle"
 
 
 class RerankerService(str, enum.Enum):
@@ -254,6 +326,7 @@ class RerankerService(str, enum.Enum):
     LLMReranker = "llm_reranker"
     RankGPTReranker = "rankgpt_reranker"
     RankLLMReranker = "rankllm_reranker"
+    CrossEncoderReranker = "cross_encoder_reranker"
 
 
 class ErrorResponse(BaseModel):
@@ -329,6 +402,18 @@ class ExistAgentType(str, enum.Enum):
     CREWAI_AGENT = "crewai_agent"
 
 
+class AgentMemoryType(str, enum.Enum):
+    """
+    Agent memory type schema, one shared Qdrant collection per type.
+    """
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    ENTITY = "entity_memory"
+    SHORT_TERM = "short_term_memory"
+
+
 class ResponseType(str, enum.Enum):
     TEXT = "text"
     URL = "url"
@@ -6,6 +6,7 @@ from .core import (
     Assistants,
     Conversations,
     KnowledgeBases,
+    KnowledgeBaseClosure,
     DocumentChunks,
     MinioClient,
     init_db,
@@ -18,10 +19,32 @@ from .core import (
     QdrantPayload,
     BaseVectorDatabase,
     QdrantVectorDatabase,
+    NumpyVectorDatabase,
+    load_vector_database,
 )
 from .contextual_rag_manager import ContextualRAG
+from .runtime import (
+    RAGRuntime,
+    init_runtime,
+    get_runtime,
+    get_contextual_rag,
+    get_storage_client,
+)
+from .kb_hierarchy import KnowledgeBaseHierarchy, kb_hierarchy
+from .product_catalog import ProductCatalog, ProductCatalogCache, product_catalog_cache
+from .history_manager import HistoryManager, history_manager
 from .db_manager import DatabaseManager, get_db_manager
-from .utils import get_embedding, validate_email, is_valid_uuid
+from .utils import (
+    get_embedding,
+    get_embeddings,
+    aget_embedding,
+    get_query_embedding,
+    aget_query_embedding,
+    query_embedding_cache,
+    answer_cache,
+    validate_email,
+    is_valid_uuid,
+)
 from .ws_manager import (
     WsManager,
     MediaType,
@@ -34,6 +57,12 @@ from .ws_manager import (
 __all__ = [
     "validate_email",
     "get_embedding",
+    "get_embeddings",
+    "aget_embedding",
+    "get_query_embedding",
+    "aget_query_embedding",
+    "query_embedding_cache",
+    "answer_cache",
     "DatabaseManager",
     "init_db",
     "get_db_manager",
@@ -44,18 +73,33 @@ __all__ = [
     "Users",
     "Tokens",
     "KnowledgeBases",
+    "KnowledgeBaseClosure",
+    "KnowledgeBaseHierarchy",
+    "kb_hierarchy",
+    "ProductCatalog",
+    "ProductCatalogCache",
+    "product_catalog_cache",
+    "HistoryManager",
+    "history_manager",
     "Conversations",
     "DocumentChunks",
     "Documents",
     "Assistants",
     "Messages",
     "ContextualRAG",
+    "RAGRuntime",
+    "init_runtime",
+    "get_runtime",
+    "get_contextual_rag",
+    "get_storage_client",
     "get_session",
     "get_instance_session",
     "is_valid_uuid",
     "QdrantPayload",
     "BaseVectorDatabase",
     "QdrantVectorDatabase",
+    "NumpyVectorDatabase",
+    "load_vector_database",
     "WsManager",
     "MediaType",
     "Message",
@@ -2,43 +2,60 @@ import sys
 import time
 import uuid
 import torch
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from uuid import UUID
 from tqdm import tqdm
 from pathlib import Path
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
+from qdrant_client.models import ScoredPoint
 from llama_index.core import (
     Settings,
     Document,
     StorageContext,
     VectorStoreIndex,
 )
-from langfuse import Langfuse
 from langfuse.decorators import langfuse_context, observe
-from langfuse.llama_index import LlamaIndexCallbackHandler
 
 from llama_index.llms.openai import OpenAI
 from llama_index.core.llms import ChatMessage
 from llama_index.core.callbacks import CallbackManager
-from llama_index.core.schema import NodeWithScore, Node
-from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.core.schema import NodeWithScore, Node, QueryBundle
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.node_parser import SemanticSplitterNodeParser
 from llama_index.core.llms.function_calling import FunctionCallingLLM
 
-from llama_index.core.postprocessor import LLMRerank
 from llama_index.postprocessor.cohere_rerank import CohereRerank
 from llama_index.postprocessor.rankllm_rerank import RankLLMRerank
-from llama_index.postprocessor.rankgpt_rerank import RankGPTRerank
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from .utils import get_embedding
-from src.utils import get_formatted_logger
-from .core import QdrantVectorDatabase
+from .utils import (
+    get_embedding,
+    get_query_embedding,
+    aget_query_embedding,
+    load_embedding_model,
+    answer_cache,
+    get_context_assembler,
+    weighted_reciprocal_rank_fusion,
+)
+from src.utils import get_formatted_logger, TokenStream
+from .core import (
+    BaseVectorDatabase,
+    QdrantVectorDatabase,
+    ElasticSearch,
+    load_vector_database,
+)
+from .rerankers import (
+    ONNXCrossEncoderRerank,
+    ConcurrentLLMRerank,
+    ConcurrentRankGPTRerank,
+)
 from src.settings import GlobalSettings, default_settings
+from src.telemetry import telemetry
 from src.constants import (
     QA_PROMPT,
     ASSISTANT_SYSTEM_PROMPT,
@@ -46,18 +63,16 @@ from src.constants import (
     QdrantPayload,
     RerankerService,
     DocumentMetadata,
-    EmbeddingService,
     CONTEXTUAL_PROMPT,
+    ElasticSearchResponse,
 )
 
 logger = get_formatted_logger(__file__)
-langfuse_callback_handler = LlamaIndexCallbackHandler()
+langfuse_callback_handler = telemetry.llama_index_callback_handler
 Settings.callback_manager = CallbackManager([langfuse_callback_handler])
 
 load_dotenv()
 
-langfuse = Langfuse()
-
 Settings.chunk_size = default_settings.embedding_config.chunk_size
 
 
@@ -69,7 +84,8 @@ class ContextualRAG:
     setting: GlobalSettings
     llm: FunctionCallingLLM
     splitter: SemanticSplitterNodeParser
-    qdrant_client: QdrantVectorDatabase
+    qdrant_client: BaseVectorDatabase
+    es_client: ElasticSearch | None
 
     def __init__(self, setting: GlobalSettings):
         """
@@ -100,9 +116,21 @@ class ContextualRAG:
             top_n=setting.contextual_rag_config.top_n,
         )
 
-        self.qdrant_client = QdrantVectorDatabase(
-            url=setting.qdrant_config.url,
-        )
+        self.qdrant_client = load_vector_database(setting)
+
+        self.context_assembler = get_context_assembler(setting.context_config)
+
+        self.es_client = None
+        if setting.contextual_rag_config.hybrid_search:
+            assert (
+                setting.elastic_search_config.url is not None
+            ), "ELASTIC_SEARCH_URL is required for hybrid search."
+
+            self.es_client = ElasticSearch(url=setting.elastic_search_config.url)
+            # BM25 search runs in this pool while the dense search runs in the caller
+            self.retrieval_executor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="bm25_search"
+            )
 
         logger.info("ContextualRAG initialized successfully !!!")
 
@@ -130,10 +158,7 @@ class ContextualRAG:
         Returns:
             BaseEmbedding: Embedding model.
         """
-        if service == EmbeddingService.OPENAI:
-            return OpenAIEmbedding(model=model_name)
-        else:
-            raise ValueError("Unsupported service")
+        return load_embedding_model(service, model_name)
 
     def load_model(
         self, service: str, model_name: str, system_prompt: str | None = None
@@ -150,10 +175,28 @@ class ContextualRAG:
             FunctionCallingLLM: The loaded LLM model.
         """
         if service == LLMService.OPENAI:
-            return OpenAI(model=model_name, system_prompt=system_prompt)
+            return OpenAI(
+                model=model_name,
+                system_prompt=system_prompt,
+                # Usage of the streamed answers, in their last chunk
+                additional_kwargs={"stream_options": {"include_usage": True}},
+            )
         else:
             raise ValueError("Unsupported service")
 
+    def load_rerank_model(self) -> FunctionCallingLLM:
+        """
+        Load a dedicated LLM for the LLM based rerankers: their async calls run on the event loop
+        of the reranker, which cannot share the async client of `self.llm`.
+
+        Returns:
+            FunctionCallingLLM: The loaded LLM model.
+        """
+        return self.load_model(
+            service=self.setting.llm_config.service,
+            model_name=self.setting.llm_config.name,
+        )
+
     def load_reranker(self, reranker_service: RerankerService, top_n: int = 3):
         """
         Load the reranker only used for the contextualRAG.
@@ -172,12 +215,23 @@ class ContextualRAG:
             )
 
         elif reranker_service == RerankerService.LLMReranker:
-            return LLMRerank(top_n=top_n, choice_batch_size=5)
+            llm_rerank_config = self.setting.llm_rerank_config
+            return ConcurrentLLMRerank(
+                llm=self.load_rerank_model(),
+                top_n=top_n,
+                choice_batch_size=llm_rerank_config.choice_batch_size,
+                max_concurrency=llm_rerank_config.max_concurrency,
+                timeout=llm_rerank_config.timeout,
+            )
 
         elif reranker_service == RerankerService.RankGPTReranker:
-            return RankGPTRerank(
-                llm=self.llm,
+            llm_rerank_config = self.setting.llm_rerank_config
+            return ConcurrentRankGPTRerank(
+                llm=self.load_rerank_model(),
                 top_n=top_n,
+                window_size=llm_rerank_config.window_size,
+                max_concurrency=llm_rerank_config.max_concurrency,
+                timeout=llm_rerank_config.timeout,
             )
 
         elif reranker_service == RerankerService.RankLLMReranker:
@@ -187,6 +241,17 @@ class ContextualRAG:
                 top_n=top_n,
             )
 
+        elif reranker_service == RerankerService.CrossEncoderReranker:
+            cross_encoder_config = self.setting.cross_encoder_config
+            return ONNXCrossEncoderRerank(
+                model_path=cross_encoder_config.path,
+                top_n=top_n,
+                batch_size=cross_encoder_config.batch_size,
+                num_threads=cross_encoder_config.num_threads,
+                max_length=cross_encoder_config.max_length,
+                cache_size=cross_encoder_config.cache_size,
+            )
+
         else:
             raise ValueError(
                 f"Unsupported reranker: {reranker_service}. Please choose from: {supported_rerankers}"
@@ -218,14 +283,16 @@ class ContextualRAG:
         document = tqdm(document, desc="Splitting...") if show_progress else document
 
         for doc in document:
-            # get random uuid for vector_id
-            vector_id = str(uuid.uuid4())
             nodes = self.splitter.get_nodes_from_documents([doc])
             documents.append(
                 [
                     Document(
                         text=node.get_content(),
-                        metadata={"document_id": document_id, "vector_id": vector_id},
+                        # get random uuid for vector_id, one per chunk
+                        metadata={
+                            "document_id": document_id,
+                            "vector_id": str(uuid.uuid4()),
+                        },
                     )
                     for node in nodes
                 ]
@@ -286,7 +353,7 @@ class ContextualRAG:
             documents_metadata.append(
                 DocumentMetadata(
                     vector_id=chunk.metadata["vector_id"],
-                    original_content=whole_document,
+                    original_content=chunk.text,
                     contextualized_content=contextualized_content,
                     # contextualized_content="",
                 ),
@@ -352,6 +419,29 @@ class ContextualRAG:
                 ),
             )
 
+    def es_insert_data(
+        self,
+        kb_id: str | UUID,
+        document_id: str | UUID,
+        documents_metadata: list[DocumentMetadata],
+    ):
+        """
+        Insert data to the ElasticSearch index of the knowledge base, only when hybrid search is enabled.
+
+        Args:
+            kb_id (str | UUID): Knowledge base ID, used as index name.
+            document_id (str | UUID): Document ID.
+            documents_metadata (list[DocumentMetadata]): Metadata of the chunks to index.
+        """
+        if self.es_client is None or not documents_metadata:
+            return
+
+        self.es_client.index_documents(
+            index_name=str(kb_id),
+            document_id=document_id,
+            documents_metadata=documents_metadata,
+        )
+
     def get_qdrant_vector_store_index(
         self, client: QdrantClient, collection_name: str
     ) -> VectorStoreIndex:
@@ -401,6 +491,10 @@ class ContextualRAG:
             session_id=str(session_id),
         )
 
+        assert isinstance(
+            self.qdrant_client, QdrantVectorDatabase
+        ), "rag_search requires the qdrant vector database service."
+
         index = self.get_qdrant_vector_store_index(
             self.qdrant_client.client, collection_name=collection_name
         )
@@ -409,7 +503,395 @@ class ContextualRAG:
 
         response = query_engine.query(query)
 
-        langfuse.flush()
+        telemetry.flush()
+
+        return response
+
+    def get_semantic_search_kwargs(self, kb_ids: list[str], top_k: int) -> dict:
+        """
+        Get the keyword arguments of the semantic search over the knowledge bases.
+
+        Args:
+            kb_ids (list[str]): The knowledge base IDs to search in.
+            top_k (int): The top K documents to retrieve.
+
+        Returns:
+            dict: Keyword arguments for `search_vector` / `asearch_vector`.
+        """
+        return dict(
+            collection_name=self.setting.global_vector_db_collection_name,
+            search_params=self.qdrant_client.get_search_params(
+                self.setting.global_vector_db_collection_name,
+                hnsw_ef=self.setting.qdrant_config.search_hnsw_ef,
+            ),
+            query_filter=models.Filter(
+                should=[
+                    models.FieldCondition(
+                        key="kb_id", match=models.MatchAny(any=kb_ids)
+                    ),
+                ],
+            ),
+            limit=top_k,
+            timeout=30,
+        )
+
+    def bm25_search(
+        self, kb_ids: list[str], query: str, top_k: int
+    ) -> list[ElasticSearchResponse]:
+        """
+        Search the query with BM25 in the ElasticSearch indexes of the knowledge bases.
+        Failures are logged and treated as no hit, so that the dense results are still used.
+
+        Args:
+            kb_ids (list[str]): The knowledge base IDs to search in.
+            query (str): The query to search.
+            top_k (int): The top K documents to retrieve.
+
+        Returns:
+            list[ElasticSearchResponse]: BM25 hits, best first.
+        """
+        try:
+            return self.es_client.search(kb_ids=kb_ids, query=query, top_k=top_k)
+        except Exception as e:
+            logger.warning(f"BM25 search failed, using semantic results only: {e}")
+            return []
+
+    def get_semantic_nodes(self, points: list[ScoredPoint]) -> list[NodeWithScore]:
+        """
+        Convert the semantic search results to nodes.
+
+        Args:
+            points (list[ScoredPoint]): Semantic search results.
+
+        Returns:
+            list[NodeWithScore]: Nodes with the similarity scores.
+        """
+        return [
+            NodeWithScore(
+                node=Node(
+                    text=point.payload["text"],
+                    metadata={
+                        "vector_id": point.payload.get("vector_id") or str(point.id)
+                    },
+                ),
+                score=point.score,
+            )
+            for point in points
+        ]
+
+    def get_context_candidates(
+        self, nodes: list[NodeWithScore]
+    ) -> tuple[list[NodeWithScore], list[str]]:
+        """
+        Shortlist the nodes the context assembler may select, and the vectors they miss
+
+        Args:
+            nodes (list[NodeWithScore]): Retrieved (and reranked) nodes, best first
+
+        Returns:
+            tuple[list[NodeWithScore], list[str]]: Candidate nodes and the vector IDs to fetch
+        """
+        if self.context_assembler is None:
+            return nodes, []
+
+        candidates = self.context_assembler.get_candidates(
+            nodes, model_name=self.setting.llm_config.name
+        )
+        vector_ids = [
+            node.node.metadata["vector_id"]
+            for node in candidates
+            if node.node.embedding is None and "vector_id" in node.node.metadata
+        ]
+
+        return candidates, vector_ids
+
+    @staticmethod
+    def set_node_vectors(
+        nodes: list[NodeWithScore], vectors: dict[str, list[float]]
+    ) -> list[NodeWithScore]:
+        missing = 0
+        for node in nodes:
+            vector_id = node.node.metadata.get("vector_id")
+            if vector_id in vectors:
+                node.node.embedding = vectors[vector_id]
+            elif node.node.embedding is None:
+                missing += 1
+
+        if missing:
+            # e.g. BM25 hits of chunks not in the vector database: kept, never deduplicated
+            logger.debug("nodes without vector: %s", missing)
+
+        return nodes
+
+    def add_context_vectors(self, nodes: list[NodeWithScore]) -> list[NodeWithScore]:
+        """
+        Shortlist the nodes for the context assembler and fetch their full vectors, used to
+        remove near duplicates and diversify the contexts. Searches do not return the vectors:
+        only the candidates ones are read.
+
+        Args:
+            nodes (list[NodeWithScore]): Retrieved (and reranked) nodes, best first
+
+        Returns:
+            list[NodeWithScore]: Candidate nodes with their vectors, best first
+        """
+        candidates, vector_ids = self.get_context_candidates(nodes)
+        if not vector_ids:
+            return candidates
+
+        vectors = self.qdrant_client.get_vectors(
+            self.setting.global_vector_db_collection_name, vector_ids
+        )
+
+        return self.set_node_vectors(candidates, vectors)
+
+    async def aadd_context_vectors(
+        self, nodes: list[NodeWithScore]
+    ) -> list[NodeWithScore]:
+        """
+        Asynchronously shortlist the nodes for the context assembler and fetch their full vectors
+
+        Args:
+            nodes (list[NodeWithScore]): Retrieved (and reranked) nodes, best first
+
+        Returns:
+            list[NodeWithScore]: Candidate nodes with their vectors, best first
+        """
+        candidates, vector_ids = self.get_context_candidates(nodes)
+        if not vector_ids:
+            return candidates
+
+        vectors = await self.qdrant_client.aget_vectors(
+            self.setting.global_vector_db_collection_name, vector_ids
+        )
+
+        return self.set_node_vectors(candidates, vectors)
+
+    def fuse_results(
+        self,
+        semantic_points: list[ScoredPoint],
+        bm25_hits: list[ElasticSearchResponse],
+    ) -> list[NodeWithScore]:
+        """
+        Fuse the semantic and BM25 results with weighted reciprocal rank fusion.
+
+        Args:
+            semantic_points (list[ScoredPoint]): Semantic search results, best first.
+            bm25_hits (list[ElasticSearchResponse]): BM25 hits, best first.
+
+        Returns:
+            list[NodeWithScore]: The `fusion_top_n` fused nodes with the fused scores.
+        """
+        rag_config = self.setting.contextual_rag_config
+        texts: dict[str, str] = {}
+
+        semantic_ids = []
+        for point in semantic_points:
+            vector_id = point.payload.get("vector_id") or str(point.id)
+            texts.setdefault(vector_id, point.payload["text"])
+            semantic_ids.append(vector_id)
+
+        bm25_ids = []
+        for hit in bm25_hits:
+            # Same layout as the indexed text: contextualized content then the chunk
+            texts.setdefault(
+                hit.vector_id,
+                "\n\n".join(
+                    text for text in (hit.contextualized_content, hit.content) if text
+                ),
+            )
+            bm25_ids.append(hit.vector_id)
+
+        fused = weighted_reciprocal_rank_fusion(
+            [semantic_ids, bm25_ids],
+            weights=[rag_config.semantic_weight, rag_config.bm25_weight],
+            k=rag_config.rrf_k,
+            top_n=rag_config.fusion_top_n,
+        )
+
+        logger.debug(
+            "semantic: %s - bm25: %s - fused: %s",
+            len(semantic_ids),
+            len(bm25_ids),
+            len(fused),
+        )
+
+        return [
+            NodeWithScore(
+                node=Node(
+                    text=texts[vector_id],
+                    metadata={"vector_id": vector_id},
+                ),
+                score=score,
+            )
+            for vector_id, score in fused
+        ]
+
+    def retrieve(
+        self, kb_ids: list[str], query: str, top_k: int
+    ) -> list[NodeWithScore]:
+        """
+        Retrieve the nodes relevant to the query. With hybrid search, BM25 runs concurrently
+        with the semantic search and both are fused.
+
+        Args:
+            kb_ids (list[str]): The knowledge base IDs to search in.
+            query (str): The query to search.
+            top_k (int): The top K documents to retrieve from each retriever.
+
+        Returns:
+            list[NodeWithScore]: Retrieved nodes, best first.
+        """
+        bm25_future = None
+        if self.es_client is not None:
+            bm25_future = self.retrieval_executor.submit(
+                self.bm25_search, kb_ids, query, top_k
+            )
+
+        logger.debug("Semantic search ...")
+        query_embedding = get_query_embedding(query)
+        # No retry on empty results: the BM25 hits are still fused, if any
+        semantic_results = self.qdrant_client.search_vector(
+            vector=query_embedding, **self.get_semantic_search_kwargs(kb_ids, top_k)
+        )
+
+        if bm25_future is None:
+            return self.get_semantic_nodes(semantic_results.points)
+
+        return self.fuse_results(semantic_results.points, bm25_future.result())
+
+    async def aretrieve(
+        self, kb_ids: list[str], query: str, top_k: int
+    ) -> list[NodeWithScore]:
+        """
+        Asynchronously retrieve the nodes relevant to the query. With hybrid search, BM25 runs
+        concurrently with the semantic search and both are fused.
+
+        Args:
+            kb_ids (list[str]): The knowledge base IDs to search in.
+            query (str): The query to search.
+            top_k (int): The top K documents to retrieve from each retriever.
+
+        Returns:
+            list[NodeWithScore]: Retrieved nodes, best first.
+        """
+        bm25_task = None
+        if self.es_client is not None:
+            bm25_task = asyncio.create_task(
+                asyncio.to_thread(self.bm25_search, kb_ids, query, top_k)
+            )
+
+        logger.debug("Semantic search ...")
+        query_embedding = await aget_query_embedding(query)
+        # No retry on empty results: the BM25 hits are still fused, if any
+        semantic_results = await self.qdrant_client.asearch_vector(
+            vector=query_embedding, **self.get_semantic_search_kwargs(kb_ids, top_k)
+        )
+
+        if bm25_task is None:
+            return self.get_semantic_nodes(semantic_results.points)
+
+        return self.fuse_results(semantic_results.points, await bm25_task)
+
+    def rerank(self, query: str, nodes: list[NodeWithScore]) -> list[NodeWithScore]:
+        """
+        Rerank the retrieved nodes if reranking is enabled.
+
+        Args:
+            query (str): The query.
+            nodes (list[NodeWithScore]): The retrieved nodes.
+
+        Returns:
+            list[NodeWithScore]: The `top_n` best nodes, or the nodes unchanged if reranking is disabled.
+        """
+        if not self.setting.contextual_rag_config.rerank or not nodes:
+            return nodes
+
+        logger.debug("Reranking ...")
+        return self.reranker.postprocess_nodes(nodes, QueryBundle(query_str=query))
+
+    def get_qa_messages(
+        self, query: str, nodes: list[NodeWithScore], system_prompt: str
+    ) -> list[ChatMessage]:
+        """
+        Build the messages to answer the query from the retrieved nodes.
+
+        Args:
+            query (str): The query to answer.
+            nodes (list[NodeWithScore]): The retrieved nodes.
+            system_prompt (str): The system prompt.
+
+        Returns:
+            list[ChatMessage]: Messages to send to the LLM.
+        """
+        logger.debug("combined_nodes: %s", len(nodes))
+
+        if self.context_assembler is not None:
+            contexts = self.context_assembler.assemble(
+                nodes, model_name=self.setting.llm_config.name
+            )
+        else:
+            contexts = [n.node.text for n in nodes]
+
+        logger.debug("contexts: %s", contexts)
+
+        return [
+            ChatMessage(
+                role="system",
+                content=system_prompt,
+            ),
+            ChatMessage(
+                role="user",
+                content=QA_PROMPT.format(
+                    context_str="\n\n".join(contexts),
+                    query_str=query,
+                ),
+            ),
+        ]
+
+    def generate_answer(
+        self, messages: list[ChatMessage], token_stream: TokenStream | None = None
+    ) -> str:
+        """
+        Generate the answer, streaming its deltas to the token stream if given.
+
+        Args:
+            messages (list[ChatMessage]): The QA messages.
+            token_stream (TokenStream | None): The stream of the chat message answered by this search.
+
+        Returns:
+            str: The answer.
+        """
+        if token_stream is None:
+            return self.llm.chat(messages).message.content
+
+        response = ""
+        for chunk in self.llm.stream_chat(messages):
+            token_stream.push(chunk.delta or "")
+            response += chunk.delta or ""
+
+        return response
+
+    async def agenerate_answer(
+        self, messages: list[ChatMessage], token_stream: TokenStream | None = None
+    ) -> str:
+        """
+        Asynchronously generate the answer, streaming its deltas to the token stream if given.
+
+        Args:
+            messages (list[ChatMessage]): The QA messages.
+            token_stream (TokenStream | None): The stream of the chat message answered by this search.
+
+        Returns:
+            str: The answer.
+        """
+        if token_stream is None:
+            return (await self.llm.achat(messages)).message.content
+
+        response = ""
+        async for chunk in await self.llm.astream_chat(messages):
+            token_stream.push(chunk.delta or "")
+            response += chunk.delta or ""
 
         return response
 
@@ -421,6 +903,7 @@ class ContextualRAG:
         session_id: str | uuid.UUID,
         top_k: int = 150,
         system_prompt: str = ASSISTANT_SYSTEM_PROMPT,
+        token_stream: TokenStream | None = None,
     ) -> str:
         """
         Search the query with the Contextual RAG.
@@ -432,6 +915,7 @@ class ContextualRAG:
             top_k (int): The top K documents to retrieve. Default to `150`.
             top_n (int): The top N documents to return after reranking. Default to `3`.
             debug (bool): debug mode.
+            token_stream (TokenStream | None): Stream the answer deltas to it, e.g. when the answer is returned directly to the user.
 
         Returns:
             str: The search results.
@@ -442,74 +926,105 @@ class ContextualRAG:
             session_id=str(session_id),
         )
 
-        logger.debug("Semantic search ...")
-        while True:
-            semantic_results = self.qdrant_client.search_vector(
-                collection_name=self.setting.global_vector_db_collection_name,
-                vector=get_embedding(query),
-                search_params=models.SearchParams(
-                    quantization=models.QuantizationSearchParams(
-                        ignore=False,
-                        rescore=True,
-                        oversampling=2.0,
-                    )
-                ),
-                query_filter=models.Filter(
-                    should=[
-                        models.FieldCondition(
-                            key="kb_id", match=models.MatchAny(any=kb_ids)
-                        ),
-                    ],
-                ),
-                limit=top_k,
-                timeout=30,
+        answer_scope = None
+        if self.setting.answer_cache_config.enabled:
+            query_embedding = get_query_embedding(query)
+            answer_scope = answer_cache.get_scope(
+                kb_ids, system_prompt, self.setting.llm_config.name
             )
+            if answer_scope is not None:
+                response = answer_cache.lookup(answer_scope, query_embedding)
+                if response is not None:
+                    logger.info(
+                        "Answer cache hit, time taken: %s", time.time() - start_time
+                    )
+                    if token_stream is not None:
+                        token_stream.push(response)
+                    return response
 
-            if len(semantic_results.points) > 0:
-                break
+        combined_nodes = self.rerank(query, self.retrieve(kb_ids, query, top_k))
+        combined_nodes = self.add_context_vectors(combined_nodes)
 
-        combined_nodes: list[NodeWithScore] = [
-            NodeWithScore(
-                node=Node(text=point.payload["text"]),
-                score=point.score,
-            )
-            for point in semantic_results.points
-        ]
+        logger.debug("Generating response ...")
+        messages = self.get_qa_messages(query, combined_nodes, system_prompt)
 
-        logger.info("combined_nodes: %s", combined_nodes)
+        response = self.generate_answer(messages, token_stream)
 
-        # query_bundle = QueryBundle(query_str=query)
+        logger.info("response: %s", response)
 
-        # logger.debug("Reranking ...")
-        # retrieved_nodes = self.reranker.postprocess_nodes(combined_nodes, query_bundle)
+        if answer_scope is not None:
+            answer_cache.store(answer_scope, query, query_embedding, response)
 
-        # contexts = [n.node.text for n in retrieved_nodes]
-        contexts = [n.node.text for n in combined_nodes]
+        logger.info("Time taken: %s", time.time() - start_time)
 
-        logger.info("contexts: %s", contexts)
+        telemetry.flush()
+
+        return response
+
+    @observe(capture_input=False)
+    async def acontextual_rag_search(
+        self,
+        kb_ids: list[str],
+        query: str,
+        session_id: str | uuid.UUID,
+        top_k: int = 150,
+        system_prompt: str = ASSISTANT_SYSTEM_PROMPT,
+        token_stream: TokenStream | None = None,
+    ) -> str:
+        """
+        Search the query with the Contextual RAG without blocking the event loop.
+
+        Args:
+            kb_ids (list[str]): The knowledge base IDs to search in.
+            query (str): The query to search.
+            session_id (str | uuid.UUID): The session ID (messages.id) to check cost in langfuse.
+            top_k (int): The top K documents to retrieve. Default to `150`.
+            system_prompt (str): The system prompt. Default to `ASSISTANT_SYSTEM_PROMPT`.
+            token_stream (TokenStream | None): Stream the answer deltas to it, e.g. when the answer is returned directly to the user.
+
+        Returns:
+            str: The search results.
+        """
+        start_time = time.time()
+
+        langfuse_callback_handler.set_trace_params(
+            session_id=str(session_id),
+        )
+
+        answer_scope = None
+        if self.setting.answer_cache_config.enabled:
+            query_embedding = await aget_query_embedding(query)
+            answer_scope = await answer_cache.aget_scope(
+                kb_ids, system_prompt, self.setting.llm_config.name
+            )
+            if answer_scope is not None:
+                response = answer_cache.lookup(answer_scope, query_embedding)
+                if response is not None:
+                    logger.info(
+                        "Answer cache hit, time taken: %s", time.time() - start_time
+                    )
+                    if token_stream is not None:
+                        token_stream.push(response)
+                    return response
+
+        combined_nodes = await self.aretrieve(kb_ids, query, top_k)
+        # Rerankers are synchronous (local inference or blocking HTTP calls)
+        combined_nodes = await asyncio.to_thread(self.rerank, query, combined_nodes)
+        combined_nodes = await self.aadd_context_vectors(combined_nodes)
 
         logger.debug("Generating response ...")
-        messages = [
-            ChatMessage(
-                role="system",
-                content=system_prompt,
-            ),
-            ChatMessage(
-                role="user",
-                content=QA_PROMPT.format(
-                    context_str="\n\n".join(contexts),
-                    query_str=query,
-                ),
-            ),
-        ]
+        messages = self.get_qa_messages(query, combined_nodes, system_prompt)
 
-        response = self.llm.chat(messages).message.content
+        response = await self.agenerate_answer(messages, token_stream)
 
         logger.info("response: %s", response)
 
+        if answer_scope is not None:
+            answer_cache.store(answer_scope, query, query_embedding, response)
+
         logger.info("Time taken: %s", time.time() - start_time)
 
-        langfuse.flush()
+        telemetry.flush()
 
         return response
 
@@ -522,6 +1037,7 @@ class ContextualRAG:
         query: str,
         top_k: int = 150,
         system_prompt: str = ASSISTANT_SYSTEM_PROMPT,
+        token_stream: TokenStream | None = None,
     ):
         """
         Search the query with the RAG.
@@ -534,6 +1050,7 @@ class ContextualRAG:
             top_k (int): The top K documents to retrieve. Default to `50`.
             top_n (int): The top N documents to return after reranking. Default to `3`.
             debug (bool): debug mode.
+            token_stream (TokenStream | None): Stream the answer deltas to it.
         """
         langfuse_callback_handler.set_trace_params(
             session_id=str(session_id),
@@ -546,6 +1063,49 @@ class ContextualRAG:
                 session_id=session_id,
                 top_k=top_k,
                 system_prompt=system_prompt,
+                token_stream=token_stream,
+            )
+        else:
+            logger.warning("Original RAG search is deprecated.")
+            response = ""
+
+        return response
+
+    @observe()
+    async def asearch(
+        self,
+        session_id: str | uuid.UUID,
+        is_contextual_rag: bool,
+        kb_ids: list[str | UUID],
+        query: str,
+        top_k: int = 150,
+        system_prompt: str = ASSISTANT_SYSTEM_PROMPT,
+        token_stream: TokenStream | None = None,
+    ):
+        """
+        Asynchronously search the query with the RAG.
+
+        Args:
+            session_id (str | uuid.UUID): The session ID (conversations.id) to check cost in langfuse.
+            is_contextual_rag (bool): Is contextual RAG or not.
+            kb_ids (list[str | UUID]): The knowledge base IDs to search in.
+            query (str): The query to search.
+            top_k (int): The top K documents to retrieve. Default to `150`.
+            system_prompt (str): The system prompt. Default to `ASSISTANT_SYSTEM_PROMPT`.
+            token_stream (TokenStream | None): Stream the answer deltas to it.
+        """
+        langfuse_callback_handler.set_trace_params(
+            session_id=str(session_id),
+        )
+
+        if is_contextual_rag:
+            response = await self.acontextual_rag_search(
+                kb_ids=kb_ids,
+                query=query,
+                session_id=session_id,
+                top_k=top_k,
+                system_prompt=system_prompt,
+                token_stream=token_stream,
             )
         else:
             logger.warning("Original RAG search is deprecated.")
@@ -2,6 +2,7 @@ from .sql_model import (
     Users,
     Tokens,
     KnowledgeBases,
+    KnowledgeBaseClosure,
     Conversations,
     DocumentChunks,
     Documents,
@@ -14,13 +15,39 @@ from .sql_model import (
 )
 from .storage_service.minio import MinioClient, get_minio_client
 from .vector_database import BaseVectorDatabase, QdrantVectorDatabase, QdrantPayload
+from .numpy_vector_database import NumpyVectorDatabase
 from .storage_service import BaseStorageClient, load_storage_service
+from .elastic_search import ElasticSearch
+
+from src.settings import GlobalSettings
+from src.constants import VectorDatabaseService
+
+
+def load_vector_database(setting: GlobalSettings) -> BaseVectorDatabase:
+    """
+    Load the vector database of `contextual_rag_config.vector_database_service`
+
+    Args:
+        setting (GlobalSettings): Global settings
+
+    Returns:
+        BaseVectorDatabase: Vector database client
+    """
+    service = setting.contextual_rag_config.vector_database_service
+
+    if service == VectorDatabaseService.QDRANT:
+        return QdrantVectorDatabase.from_setting(setting)
+    elif service == VectorDatabaseService.NUMPY:
+        return NumpyVectorDatabase.from_setting(setting)
+    else:
+        raise ValueError(f"Invalid vector database service: {service}")
 
 
 __all__ = [
     "Users",
     "Tokens",
     "KnowledgeBases",
+    "KnowledgeBaseClosure",
     "Conversations",
     "DocumentChunks",
     "Documents",
@@ -32,9 +59,12 @@ __all__ = [
     "get_session",
     "BaseVectorDatabase",
     "QdrantVectorDatabase",
+    "NumpyVectorDatabase",
     "QdrantPayload",
+    "load_vector_database",
     "get_session_manager",
     "get_instance_session",
     "BaseStorageClient",
     "load_storage_service",
+    "ElasticSearch",
 ]
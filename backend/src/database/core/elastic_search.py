@@ -160,8 +160,12 @@ class ElasticSearch:
         }
         exist_index = []
         for kb_id in kb_ids:
-            if self.check_index_exists(kb_id):
-                exist_index.append(kb_id)
+            if self.check_index_exists(str(kb_id)):
+                exist_index.append(str(kb_id))
+
+        # An empty index list would search every index
+        if not exist_index:
+            return []
 
         response = self.es_client.search(
             index=",".join(exist_index),
@@ -174,6 +178,7 @@ class ElasticSearch:
                 content=hit["_source"]["content"],
                 contextualized_content=hit["_source"]["contextualized_content"],
                 score=hit["_score"],
+                document_id=hit["_source"].get("document_id"),
             )
             for hit in response["hits"]["hits"]
         ]
@@ -206,6 +211,22 @@ class ElasticSearch:
 
         self.es_client.indices.refresh(index=index_name)
 
+    def delete_index(self, index_name: str | UUID):
+        """
+        Delete the index with all its documents.
+
+        Args:
+            index_name (str | UUID): Name of the index to delete
+        """
+        index_name = str(index_name)
+
+        if not self.check_index_exists(index_name):
+            logger.debug(f"Index: {index_name} does not exist")
+            return
+
+        self.es_client.indices.delete(index=index_name)
+        logger.debug("Removed index: %s", index_name)
+
     def get_all_data_in_index(self, index_name: str) -> list[ElasticSearchResponse]:
         """
         Get all the data in the index.
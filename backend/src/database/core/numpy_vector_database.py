@@ -0,0 +1,878 @@
+import sys
+import json
+import fcntl
+import shutil
+import asyncio
+import threading
+import numpy as np
+from uuid import UUID
+from pathlib import Path
+from contextlib import contextmanager
+from qdrant_client.http import models
+from typing import List, Dict, Any, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.constants import QdrantPayload
+from src.settings import GlobalSettings
+from src.utils import get_formatted_logger
+
+from .vector_database import BaseVectorDatabase, PAYLOAD_INDEXES
+
+logger = get_formatted_logger(__file__)
+
+# Vector components scored per matrix product (16 MB of float32), bounds the memory used by a full scan
+SCAN_CHUNK_FLOATS = 2**22
+
+# Training points per IVF list, the rest of the collection is only assigned to the trained lists
+IVF_TRAINING_POINTS_PER_LIST = 64
+
+
+class NumpyCollection:
+    """
+    Points of one collection of the NumPy vector database.
+
+    Vectors are normalized (cosine distance) and stored in a (capacity, dim) matrix, memory-mapped
+    from `vectors.bin` when the collection has a directory. Point ids and payloads are kept in memory
+    and appended to `points.jsonl`, which is replayed on load. Points are only appended:
+    overwritten and deleted points are tombstoned. The payload fields of `PAYLOAD_INDEXES`
+    are encoded as integer columns so that filters are vectorized.
+
+    Several processes can share the directory (e.g. the API and the Celery workers): writers hold
+    an exclusive file lock and first replay the points logged by the others, readers replay
+    the tail of `points.jsonl` written since their last read with `refresh`.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        dtype: str = "float32",
+        path: Optional[Path] = None,
+        capacity: int = 1024,
+    ):
+        """
+        Args:
+            dim (int): Vector size
+            dtype (str): Storage type of the vectors, `float32` or `float16`. Default to `float32`.
+            path (Path, optional): Directory of the collection, in memory only if `None`
+            capacity (int): Initial number of rows. Default to `1024`.
+        """
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.path = path
+
+        self.size = 0
+        self.ids: List[str] = []
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.id_to_row: Dict[str, int] = {}
+        # Bytes of `points.jsonl` already replayed
+        self.log_offset = 0
+
+        if path is not None:
+            path.mkdir(parents=True, exist_ok=True)
+
+        with self.file_lock():
+            self.vectors = self._map(capacity)
+            capacity = len(self.vectors)
+            self.alive = np.zeros(capacity, dtype=bool)
+            self.field_vocabs: Dict[str, Dict[str, int]] = {
+                field: {} for field in PAYLOAD_INDEXES
+            }
+            self.field_codes: Dict[str, np.ndarray] = {
+                field: np.full(capacity, -1, dtype=np.int32)
+                for field in PAYLOAD_INDEXES
+            }
+
+            self.centroids: Optional[np.ndarray] = None
+            self.assignments = np.full(capacity, -1, dtype=np.int32)
+            self.ivf_trained_size = 0
+
+            if path is not None:
+                self._load()
+
+    @property
+    def count(self) -> int:
+        return int(self.alive[: self.size].sum())
+
+    def _map(self, capacity: int) -> np.ndarray:
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dim), dtype=self.dtype)
+            if hasattr(self, "vectors"):
+                vectors[: self.size] = self.vectors[: self.size]
+            return vectors
+
+        (self.path / "meta.json").write_text(
+            json.dumps({"dim": self.dim, "dtype": self.dtype.name})
+        )
+
+        file = self.path / "vectors.bin"
+        row_bytes = self.dim * self.dtype.itemsize
+        with open(file, "ab") as f:
+            # Only grows the file: an existing collection keeps its capacity
+            capacity = max(capacity, f.tell() // row_bytes)
+            f.truncate(capacity * row_bytes)
+
+        return np.memmap(file, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, min_capacity: int):
+        self.vectors = self._map(max(2 * len(self.vectors), min_capacity))
+        # The file may have been grown further by another process
+        extra = len(self.vectors) - len(self.alive)
+
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        self.assignments = np.concatenate(
+            [self.assignments, np.full(extra, -1, dtype=np.int32)]
+        )
+        for field, codes in self.field_codes.items():
+            self.field_codes[field] = np.concatenate(
+                [codes, np.full(extra, -1, dtype=np.int32)]
+            )
+
+    @contextmanager
+    def file_lock(self):
+        """
+        Exclusive lock of the collection files across the processes sharing the directory,
+        a no-op for in memory collections
+        """
+        if self.path is None:
+            yield
+            return
+
+        with open(self.path / "lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _get_log_size(self) -> int:
+        log_file = self.path / "points.jsonl"
+        return log_file.stat().st_size if log_file.exists() else 0
+
+    def _replay_log(self):
+        """
+        Replay the entries of `points.jsonl` after `log_offset`, under the file lock
+        """
+        if self._get_log_size() <= self.log_offset:
+            return
+
+        # Rows written by another process may be past the end of the mapping
+        rows_in_file = (self.path / "vectors.bin").stat().st_size // (
+            self.dim * self.dtype.itemsize
+        )
+        if rows_in_file > len(self.vectors):
+            self._grow(rows_in_file)
+
+        start = self.size
+        with open(self.path / "points.jsonl", "rb") as f:
+            f.seek(self.log_offset)
+            for line in f:
+                # Entry of a writer that crashed while logging
+                if not line.endswith(b"\n"):
+                    break
+
+                entry = json.loads(line)
+                if entry["op"] == "upsert":
+                    self._set_point(entry["id"], entry["payload"])
+                else:
+                    self._delete_rows(entry["rows"])
+                self.log_offset += len(line)
+
+        self._assign(start, self.size)
+
+    def _load(self):
+        self._replay_log()
+
+        ivf_file = self.path / "ivf.npy"
+        if ivf_file.exists():
+            self.centroids = np.load(ivf_file)
+            self.ivf_trained_size = self.count
+            self._assign(0, self.size)
+
+    def refresh(self):
+        """
+        Replay the points logged by the other processes since the last read
+        """
+        if self.path is None or self._get_log_size() <= self.log_offset:
+            return
+
+        with self.file_lock():
+            self._replay_log()
+
+    def _log(self, entries: List[Dict[str, Any]]):
+        if self.path is None:
+            return
+
+        with open(self.path / "points.jsonl", "ab") as f:
+            f.writelines(
+                (json.dumps(entry) + "\n").encode("utf-8") for entry in entries
+            )
+            self.log_offset = f.tell()
+
+    def _set_point(self, point_id: str, payload: Dict[str, Any]):
+        if self.size == len(self.vectors):
+            self._grow(self.size + 1)
+
+        row = self.size
+        if point_id in self.id_to_row:
+            self._delete_rows([self.id_to_row[point_id]])
+
+        self.ids.append(point_id)
+        self.payloads.append(payload)
+        self.id_to_row[point_id] = row
+        self.alive[row] = True
+        for field, vocab in self.field_vocabs.items():
+            value = payload.get(field)
+            if value is not None:
+                self.field_codes[field][row] = vocab.setdefault(str(value), len(vocab))
+
+        self.size += 1
+
+    def _delete_rows(self, rows: List[int]):
+        for row in rows:
+            self.alive[row] = False
+            self.payloads[row] = None
+            if self.id_to_row.get(self.ids[row]) == row:
+                del self.id_to_row[self.ids[row]]
+
+    def upsert(
+        self, point_ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]]
+    ):
+        """
+        Insert or overwrite points
+
+        Args:
+            point_ids (List[str]): Point IDs
+            vectors (np.ndarray): Normalized vectors, shape (n, dim)
+            payloads (List[Dict[str, Any]]): JSON serializable payloads
+        """
+        assert vectors.shape == (
+            len(point_ids),
+            self.dim,
+        ), f"Expected {len(point_ids)} vectors of size {self.dim}, got {vectors.shape}"
+
+        with self.file_lock():
+            # Rows are numbered in the order of the shared log
+            if self.path is not None:
+                self._replay_log()
+
+            start = self.size
+            if start + len(point_ids) > len(self.vectors):
+                self._grow(start + len(point_ids))
+
+            # Vectors are written before the log, so that a replayed point always has its vector
+            self.vectors[start : start + len(point_ids)] = vectors
+            if isinstance(self.vectors, np.memmap):
+                self.vectors.flush()
+
+            for point_id, payload in zip(point_ids, payloads):
+                self._set_point(point_id, payload)
+            self._assign(start, self.size)
+
+            self._log(
+                [
+                    {"op": "upsert", "id": point_id, "payload": payload}
+                    for point_id, payload in zip(point_ids, payloads)
+                ]
+            )
+
+    def delete(self, query_filter: models.Filter) -> int:
+        """
+        Delete the points matching a filter
+
+        Args:
+            query_filter (models.Filter): Filter conditions
+
+        Returns:
+            int: Number of deleted points
+        """
+        with self.file_lock():
+            if self.path is not None:
+                self._replay_log()
+
+            rows = np.flatnonzero(self.filter_mask(query_filter)).tolist()
+            if rows:
+                self._delete_rows(rows)
+                self._log([{"op": "delete", "rows": rows}])
+
+        return len(rows)
+
+    def iter_points(self, batch_size: int):
+        """
+        Iterate over the live points by batch
+
+        Args:
+            batch_size (int): Number of points per batch
+
+        Yields:
+            Tuple[List[str], np.ndarray, List[Dict[str, Any]]]: Point IDs, vectors and payloads
+        """
+        rows = np.flatnonzero(self.alive[: self.size])
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            yield (
+                [self.ids[row] for row in batch],
+                np.asarray(self.vectors[batch], dtype=np.float32),
+                [self.payloads[row] for row in batch],
+            )
+
+    def _condition_mask(self, condition: models.Condition, size: int) -> np.ndarray:
+        if isinstance(condition, models.Filter):
+            return self.filter_mask(condition, alive_only=False, size=size)
+
+        if isinstance(condition, models.HasIdCondition):
+            return np.isin(
+                np.arange(size),
+                [
+                    self.id_to_row[str(point_id)]
+                    for point_id in condition.has_id
+                    if str(point_id) in self.id_to_row
+                ],
+            )
+
+        if (
+            isinstance(condition, models.FieldCondition)
+            and condition.key in self.field_vocabs
+            and isinstance(condition.match, (models.MatchValue, models.MatchAny))
+        ):
+            values = (
+                [condition.match.value]
+                if isinstance(condition.match, models.MatchValue)
+                else condition.match.any
+            )
+            vocab = self.field_vocabs[condition.key]
+            return np.isin(
+                self.field_codes[condition.key][:size],
+                [vocab[str(value)] for value in values if str(value) in vocab],
+            )
+
+        raise ValueError(
+            f"Unsupported filter condition: {condition}. "
+            f"Only match conditions on {list(self.field_vocabs)} and point IDs are supported."
+        )
+
+    def filter_mask(
+        self,
+        query_filter: Optional[models.Filter],
+        alive_only: bool = True,
+        size: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Evaluate a Qdrant filter on the points
+
+        Args:
+            query_filter (models.Filter, optional): Filter conditions, all the points if `None`
+            alive_only (bool): Exclude the deleted points. Default to `True`.
+            size (int, optional): Number of rows evaluated, `self.size` if `None`
+
+        Returns:
+            np.ndarray: Boolean mask of the matching rows, of length `size`
+        """
+        size = self.size if size is None else size
+        mask = self.alive[:size].copy() if alive_only else np.ones(size, dtype=bool)
+        if query_filter is None:
+            return mask
+
+        def as_list(conditions) -> list:
+            if conditions is None:
+                return []
+            return conditions if isinstance(conditions, list) else [conditions]
+
+        for condition in as_list(query_filter.must):
+            mask &= self._condition_mask(condition, size)
+
+        should = as_list(query_filter.should)
+        if should:
+            any_mask = np.zeros(size, dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(condition, size)
+            mask &= any_mask
+
+        for condition in as_list(query_filter.must_not):
+            mask &= ~self._condition_mask(condition, size)
+
+        return mask
+
+    def _assign(self, start: int, end: int):
+        if self.centroids is None:
+            return
+
+        chunk_size = max(SCAN_CHUNK_FLOATS // self.dim, 1)
+        for chunk_start in range(start, end, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, end)
+            scores = (
+                np.asarray(self.vectors[chunk_start:chunk_end], dtype=np.float32)
+                @ self.centroids.T
+            )
+            self.assignments[chunk_start:chunk_end] = scores.argmax(axis=1)
+
+    def train_ivf(self, n_lists: Optional[int] = None, n_iter: int = 10, seed: int = 0):
+        """
+        Train the IVF index (spherical k-means) on a sample of the points and assign all the points
+
+        Args:
+            n_lists (int, optional): Number of lists, `sqrt(count)` if `None`
+            n_iter (int): Number of k-means iterations. Default to `10`.
+            seed (int): Random seed. Default to `0`.
+        """
+        rng = np.random.default_rng(seed)
+        rows = np.flatnonzero(self.alive[: self.size])
+        n_lists = min(n_lists or int(np.sqrt(len(rows))), len(rows))
+        assert n_lists > 0, "Cannot train the IVF index of an empty collection"
+
+        num_samples = n_lists * IVF_TRAINING_POINTS_PER_LIST
+        if len(rows) > num_samples:
+            rows = np.sort(rng.choice(rows, num_samples, replace=False))
+        samples = np.asarray(self.vectors[rows], dtype=np.float32)
+
+        centroids = samples[rng.choice(len(samples), n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignments = (samples @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, samples)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+
+        self.centroids = centroids.astype(np.float32)
+        self.ivf_trained_size = self.count
+        self._assign(0, self.size)
+
+        if self.path is not None:
+            np.save(self.path / "ivf.npy", self.centroids)
+
+    def search(
+        self,
+        query: np.ndarray,
+        mask: np.ndarray,
+        limit: int,
+        nprobe: Optional[int] = None,
+    ) -> List[tuple[int, float]]:
+        """
+        Search the nearest rows of a normalized query
+
+        Args:
+            query (np.ndarray): Normalized query vector
+            mask (np.ndarray): Boolean mask of the searchable rows
+            limit (int): Number of rows to return
+            nprobe (int, optional): Number of IVF lists to search, exact search if `None` or without IVF index
+
+        Returns:
+            List[tuple[int, float]]: Rows and cosine similarities, best first
+        """
+        if nprobe is not None and self.centroids is not None:
+            lists = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidates = mask & np.isin(self.assignments[: len(mask)], lists)
+            # Small filtered subsets may fall outside the probed lists
+            if candidates.sum() >= limit:
+                mask = candidates
+
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        chunk_size = max(SCAN_CHUNK_FLOATS // self.dim, 1)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            if chunk[-1] - chunk[0] + 1 == len(chunk):
+                block = self.vectors[chunk[0] : chunk[-1] + 1]
+            else:
+                block = self.vectors[chunk]
+            scores[start : start + len(chunk)] = (
+                np.asarray(block, dtype=np.float32) @ query
+            )
+
+        limit = min(limit, len(rows))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+
+class NumpyVectorDatabase(BaseVectorDatabase):
+    """
+    Embedded vector database: exact BLAS search over memory-mapped NumPy matrices,
+    with an optional IVF index for large collections. Takes the same Qdrant filters
+    and returns the same responses as `QdrantVectorDatabase`, so it can replace it in tests,
+    benchmarks and single node installs. Cosine distance only.
+
+    The processes of a node (API and Celery workers) can share the directory: searches first read
+    the points the other processes added, and collections created by them are loaded on first use.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dtype: str = "float32",
+        ivf_threshold: Optional[int] = None,
+        ivf_nprobe: int = 16,
+    ):
+        """
+        Args:
+            path (str, optional): Directory of the collections, in memory only if `None`
+            dtype (str): Storage type of the vectors, `float32` or `float16`. Default to `float32`.
+            ivf_threshold (int, optional): Number of points above which the IVF index of a collection is trained, exact search only if `None`
+            ivf_nprobe (int): Number of IVF lists searched per query. Default to `16`.
+        """
+        assert dtype in ("float32", "float16"), f"Unsupported dtype: {dtype}"
+
+        self.path = Path(path) if path is not None else None
+        self.dtype = dtype
+        self.ivf_threshold = ivf_threshold
+        self.ivf_nprobe = ivf_nprobe
+
+        self.collections: Dict[str, NumpyCollection] = {}
+        # Writes are serialized, searches evaluate their filter under the lock at the size it
+        # had then, and only score those rows while points are appended
+        self.lock = threading.RLock()
+
+        self.test_connection()
+
+    @classmethod
+    def from_setting(cls, setting: GlobalSettings) -> "NumpyVectorDatabase":
+        """
+        Create a client from the `numpy_vector_database_config` of the settings
+
+        Args:
+            setting (GlobalSettings): Global settings
+
+        Returns:
+            NumpyVectorDatabase: Client
+        """
+        numpy_config = setting.numpy_vector_database_config
+
+        return cls(
+            path=numpy_config.path,
+            dtype=numpy_config.dtype,
+            ivf_threshold=numpy_config.ivf_threshold,
+            ivf_nprobe=numpy_config.ivf_nprobe,
+        )
+
+    def test_connection(self):
+        """
+        Load the collections stored in the directory
+        """
+        if self.path is None:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        for meta_file in sorted(self.path.glob("*/meta.json")):
+            self._load_collection(meta_file.parent.name)
+
+    def _load_collection(self, collection_name: str) -> bool:
+        """
+        Load a collection stored in the directory, e.g. created by another process
+
+        Args:
+            collection_name (str): Collection name
+
+        Returns:
+            bool: Whether the collection exists in the directory
+        """
+        if self.path is None:
+            return False
+
+        meta_file = self.path / collection_name / "meta.json"
+        if not meta_file.exists():
+            return False
+
+        with self.lock:
+            if collection_name not in self.collections:
+                meta = json.loads(meta_file.read_text())
+                collection = NumpyCollection(
+                    meta["dim"], meta["dtype"], path=meta_file.parent
+                )
+                self.collections[collection_name] = collection
+
+                logger.info(
+                    "collection_name: %s - points: %s",
+                    collection_name,
+                    collection.count,
+                )
+
+        return True
+
+    def check_collection_exists(self, collection_name: str):
+        return collection_name in self.collections or self._load_collection(
+            collection_name
+        )
+
+    def get_collection(self, collection_name: str) -> NumpyCollection:
+        """
+        Get a collection
+
+        Args:
+            collection_name (str): Collection name
+
+        Returns:
+            NumpyCollection: Collection
+        """
+        if not self.check_collection_exists(collection_name):
+            raise ValueError(f"Collection {collection_name} not found")
+
+        return self.collections[collection_name]
+
+    def create_collection(self, collection_name: str, vector_size: int):
+        with self.lock:
+            if self.check_collection_exists(collection_name):
+                return
+
+            logger.info(
+                "collection_name: %s - vector_size: %s", collection_name, vector_size
+            )
+            self.collections[collection_name] = NumpyCollection(
+                vector_size,
+                self.dtype,
+                path=self.path / collection_name if self.path is not None else None,
+            )
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalize vectors to unit norm (cosine distance)
+
+        Args:
+            vectors (np.ndarray): Vectors, shape (n, dim) or (dim,)
+
+        Returns:
+            np.ndarray: Normalized float32 vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add_vector(
+        self,
+        collection_name: str,
+        vector_id: str,
+        vector: List[float],
+        payload: QdrantPayload,
+    ):
+        self.add_vectors(collection_name, [vector_id], [vector], [payload])
+
+    def add_vectors(
+        self,
+        collection_name: str,
+        vector_ids: List[str],
+        vectors: List[List[float]],
+        payloads: List[QdrantPayload],
+    ):
+        if not self.check_collection_exists(collection_name):
+            self.create_collection(collection_name, len(vectors[0]))
+
+        # Round trip through JSON so that payloads are the same before and after a reload
+        payloads = [
+            json.loads(
+                json.dumps(
+                    payload.model_dump()
+                    if isinstance(payload, QdrantPayload)
+                    else payload,
+                    default=str,
+                )
+            )
+            for payload in payloads
+        ]
+
+        with self.lock:
+            collection = self.get_collection(collection_name)
+            collection.upsert(
+                [str(vector_id) for vector_id in vector_ids],
+                self.normalize(vectors),
+                payloads,
+            )
+
+            if (
+                self.ivf_threshold is not None
+                and collection.count >= self.ivf_threshold
+                and collection.count >= 2 * collection.ivf_trained_size
+            ):
+                logger.info(
+                    "collection_name: %s - training IVF index on %s points",
+                    collection_name,
+                    collection.count,
+                )
+                collection.train_ivf()
+
+    def delete_vector(self, collection_name: str, document_id: str | UUID):
+        document_id = str(document_id)
+
+        if not self.check_collection_exists(collection_name):
+            logger.debug(f"Collection {collection_name} does not exist")
+            return
+
+        logger.debug(
+            "collection_name: %s - document_id: %s", collection_name, document_id
+        )
+
+        with self.lock:
+            self.get_collection(collection_name).delete(
+                models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="document_id",
+                            match=models.MatchValue(value=document_id),
+                        )
+                    ]
+                )
+            )
+
+    def delete_collection(self, collection_name: str):
+        if not self.check_collection_exists(collection_name):
+            logger.debug(f"Collection {collection_name} does not exist")
+            return
+
+        with self.lock:
+            collection = self.collections.pop(collection_name)
+            if collection.path is not None:
+                shutil.rmtree(collection.path)
+
+        logger.debug(f"Collection {collection_name} deleted successfully!")
+
+    def migrate_collection(
+        self, source_collection: str, target_collection: str, batch_size: int = 100
+    ):
+        """
+        Migrate all data from source collection to target collection.
+        A missing target collection is created with the dtype of this client.
+
+        Args:
+            source_collection (str): Name of the source collection
+            target_collection (str): Name of the target collection
+            batch_size (int): Number of points to process in each batch
+        """
+        if not self.check_collection_exists(source_collection):
+            logger.debug(f"Source collection: {source_collection} does not exist")
+            return
+
+        source = self.get_collection(source_collection)
+        self.create_collection(target_collection, source.dim)
+
+        for point_ids, vectors, payloads in source.iter_points(batch_size):
+            self.add_vectors(target_collection, point_ids, vectors, payloads)
+
+        self.delete_collection(source_collection)
+
+        logger.info(
+            f"Migration from {source_collection} to {target_collection} completed successfully!"
+        )
+
+    def build_index(self, collection_name: str, n_lists: Optional[int] = None):
+        """
+        Train the IVF index of a collection, whatever its size
+
+        Args:
+            collection_name (str): Collection name
+            n_lists (int, optional): Number of lists, `sqrt(count)` if `None`
+        """
+        with self.lock:
+            self.get_collection(collection_name).train_ivf(n_lists)
+
+    def get_search_params(
+        self, collection_name: str, hnsw_ef: Optional[int] = None, exact: bool = False
+    ) -> models.SearchParams:
+        """
+        Get the search parameters of a collection. `hnsw_ef` is ignored, `exact` skips the IVF index.
+
+        Args:
+            collection_name (str): Collection name
+            hnsw_ef (int, optional): Ignored, kept for compatibility with `QdrantVectorDatabase`
+            exact (bool): Search all the points. Default to `False`.
+
+        Returns:
+            models.SearchParams: Search parameters
+        """
+        return models.SearchParams(hnsw_ef=hnsw_ef, exact=exact)
+
+    def search_vector(
+        self,
+        collection_name: str,
+        vector: list[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        timeout: int = 30,
+        with_vectors: bool = False,
+    ) -> models.QueryResponse:
+        collection = self.get_collection(collection_name)
+        query = self.normalize(vector)
+
+        with self.lock:
+            collection.refresh()
+            mask = collection.filter_mask(query_filter, size=collection.size)
+
+        matches = collection.search(
+            query,
+            mask,
+            limit,
+            nprobe=None if search_params.exact else self.ivf_nprobe,
+        )
+
+        points = []
+        for row, score in matches:
+            payload = collection.payloads[row]
+            # Deleted while searching
+            if payload is None:
+                continue
+
+            points.append(
+                models.ScoredPoint(
+                    id=collection.ids[row],
+                    version=0,
+                    score=score,
+                    payload=payload,
+                    vector=(
+                        np.asarray(collection.vectors[row], dtype=np.float32).tolist()
+                        if with_vectors
+                        else None
+                    ),
+                )
+            )
+
+        return models.QueryResponse(points=points)
+
+    async def asearch_vector(
+        self,
+        collection_name: str,
+        vector: list[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        timeout: int = 30,
+        with_vectors: bool = False,
+    ) -> models.QueryResponse:
+        return await asyncio.to_thread(
+            self.search_vector,
+            collection_name,
+            vector,
+            search_params,
+            query_filter,
+            limit,
+            timeout,
+            with_vectors,
+        )
+
+    def get_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        collection = self.get_collection(collection_name)
+
+        with self.lock:
+            collection.refresh()
+            rows = {
+                vector_id: collection.id_to_row[vector_id]
+                for vector_id in map(str, vector_ids)
+                if vector_id in collection.id_to_row
+            }
+            return {
+                vector_id: np.asarray(
+                    collection.vectors[row], dtype=np.float32
+                ).tolist()
+                for vector_id, row in rows.items()
+            }
+
+    async def aget_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        return await asyncio.to_thread(self.get_vectors, collection_name, vector_ids)
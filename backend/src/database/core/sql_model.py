@@ -3,15 +3,15 @@ import sys
 import uuid as uuid_pkg
 from pathlib import Path
 from fastapi import Depends
-from sqlalchemy import Column
+from sqlalchemy import Column, Index, inspect, text
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 from dotenv import load_dotenv
 from datetime import datetime
 from contextlib import contextmanager
 from typing import List, Dict, Optional
 from pydantic import EmailStr, ConfigDict
 from sqlalchemy.dialects.postgresql import TEXT, JSON
-from sqlmodel import SQLModel, Field, String, create_engine, Session, UUID
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import SQLModel, Field, String, create_engine, Session
 from sqlalchemy.orm import sessionmaker
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
@@ -46,9 +46,60 @@ def init_db():
         },
     )
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    add_missing_indexes()
     SessionLocal = sessionmaker(bind=engine, class_=Session)
 
 
+def add_missing_columns():
+    """
+    Add the nullable columns of the models missing from the existing tables,
+    `create_all` only creates the missing tables. Idempotent, as every worker runs it at startup.
+    """
+    inspector = inspect(engine)
+
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(
+                    text(
+                        f'ALTER TABLE "{table.name}" '
+                        f'ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+                    )
+                )
+
+
+def add_missing_indexes():
+    """
+    Create the indexes of the models missing from the existing tables,
+    `create_all` only creates the indexes of the tables it creates.
+    Idempotent, as every worker runs it at startup.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                # One transaction per index, a failed one is rolled back alone
+                with engine.begin() as connection:
+                    index.create(connection, checkfirst=True)
+            except (ProgrammingError, IntegrityError):
+                # Created by a concurrent worker after the check
+                if not any(
+                    existing["name"] == index.name
+                    for existing in inspect(engine).get_indexes(table.name)
+                ):
+                    raise
+
+
 @contextmanager
 def get_instance_session():
     session = Session(engine, expire_on_commit=False)
@@ -265,16 +316,6 @@ class KnowledgeBases(SQLModel, table=True):
         default=False,
         description="Use Contextual RAG for the Knowledge Base or not",
     )
-    parents: List[uuid_pkg.UUID] = Field(
-        default=[],
-        sa_column=Column(ARRAY(UUID)),
-        description="List of KBs from which this KB is derived",
-    )
-    children: List[uuid_pkg.UUID] = Field(
-        default=[],
-        sa_column=Column(ARRAY(UUID)),
-        description="List of KBs which are derived from this KB",
-    )
     created_at: datetime = Field(
         default_factory=get_now,
         nullable=False,
@@ -300,6 +341,30 @@ class KnowledgeBases(SQLModel, table=True):
         return len(self.documents)
 
 
+class KnowledgeBaseClosure(SQLModel, table=True):
+    """
+    Knowledge base inheritance closure: one row per knowledge base (descendant) inheriting
+    another one (ancestor), directly (depth 1) or through intermediate knowledge bases.
+    """
+
+    __tablename__ = "knowledge_base_closure"
+    ancestor_id: uuid_pkg.UUID = Field(
+        primary_key=True,
+        nullable=False,
+        description="Inherited Knowledge Base",
+    )
+    descendant_id: uuid_pkg.UUID = Field(
+        primary_key=True,
+        index=True,
+        nullable=False,
+        description="Inheriting Knowledge Base",
+    )
+    depth: int = Field(
+        nullable=False,
+        description="Length of the shortest inheritance path, 1 for a direct inheritance",
+    )
+
+
 class Documents(SQLModel, table=True):
     __tablename__ = "documents"
     id: uuid_pkg.UUID = Field(
@@ -441,6 +506,15 @@ class Conversations(SQLModel, table=True):
         description="Number of user's messages in all sessions chat.",
     )
 
+    summary: str = Field(
+        sa_column=Column(TEXT, nullable=True),
+        description="Rolling summary of the messages folded out of the chat history",
+    )
+    summary_until: datetime = Field(
+        nullable=True,
+        description="Created At time of the last message folded into the summary",
+    )
+
     created_at: datetime = Field(
         default_factory=get_now,
         nullable=False,
@@ -475,6 +549,12 @@ class Conversations(SQLModel, table=True):
 
 class Messages(SQLModel, table=True):
     __tablename__ = "messages"
+    # The chat history reads the latest messages of a conversation
+    __table_args__ = (
+        Index(
+            "ix_messages_conversation_id_created_at", "conversation_id", "created_at"
+        ),
+    )
     id: uuid_pkg.UUID = Field(
         default_factory=uuid_pkg.uuid4,
         primary_key=True,
@@ -513,7 +593,11 @@ class Messages(SQLModel, table=True):
 
     response_time: float = Field(
         nullable=True,
-        description="Response time of the assistant in seconds",
+        description="Response time of the assistant in seconds, until the first token when streamed",
+    )
+    total_time: float = Field(
+        nullable=True,
+        description="Time until the assistant answer is complete in seconds",
     )
 
 
@@ -1,10 +1,11 @@
 import sys
 import logging
+import numpy as np
 from uuid import UUID
 from pathlib import Path
 from abc import ABC, abstractmethod
 from qdrant_client.http import models
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from typing import List, Dict, Any, Optional
 from qdrant_client.http.exceptions import ResponseHandlingException
 from qdrant_client.models import ScoredPoint
@@ -19,11 +20,27 @@ from tenacity import (
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from src.constants import QdrantPayload
+from src.constants import QdrantPayload, QuantizationType
+from src.settings import GlobalSettings, QuantizationConfig, QuantizationProfile
 from src.utils import get_formatted_logger
 
 logger = get_formatted_logger(__file__)
 
+# Payload fields used in search and delete filters, indexed so that filtering does not scan the collection
+PAYLOAD_INDEXES: Dict[str, models.PayloadSchemaType] = {
+    "kb_id": models.PayloadSchemaType.KEYWORD,
+    "document_id": models.PayloadSchemaType.KEYWORD,
+}
+
+# Names of the vectors of the two-stage collections: the first pass searches the truncated (matryoshka)
+# embedding which stays in RAM, the shortlist is rescored with the full embedding stored on disk
+FULL_VECTOR_NAME = "full"
+SMALL_VECTOR_NAME = "small"
+
+# Payload field partitioning the points by tenant. Inherited knowledge bases are searched
+# by matching any of the `parents` kb_ids, so a knowledge base is the natural tenant.
+TENANT_FIELD = "kb_id"
+
 
 class BaseVectorDatabase(ABC):
     @abstractmethod
@@ -92,6 +109,142 @@ class BaseVectorDatabase(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def delete_vector(self, collection_name: str, document_id: str | UUID):
+        """
+        Delete the vectors of a document from the collection
+
+        Args:
+            collection_name (str): Collection name to delete
+            document_id (str | UUID): Document ID to delete
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_collection(self, collection_name: str):
+        """
+        Delete a collection
+
+        Args:
+            collection_name (str): Collection name to delete
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def migrate_collection(
+        self, source_collection: str, target_collection: str, batch_size: int = 100
+    ):
+        """
+        Migrate all data from source collection to target collection
+
+        Args:
+            source_collection (str): Name of the source collection
+            target_collection (str): Name of the target collection
+            batch_size (int): Number of points to process in each batch
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_search_params(
+        self, collection_name: str, hnsw_ef: Optional[int] = None, exact: bool = False
+    ) -> models.SearchParams:
+        """
+        Get the search parameters of a collection
+
+        Args:
+            collection_name (str): Collection name
+            hnsw_ef (int, optional): Size of the HNSW search beam
+            exact (bool): Search without index nor quantization. Default to `False`.
+
+        Returns:
+            models.SearchParams: Search parameters
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_vector(
+        self,
+        collection_name: str,
+        vector: list[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        timeout: int = 30,
+        with_vectors: bool = False,
+    ) -> models.QueryResponse:
+        """
+        Search for a vector in the collection
+
+        Args:
+            collection_name (str): Collection name to search
+            vector (list[float]): Vector embedding
+            search_params (models.SearchParams): Search parameters
+            query_filter (models.Filter): Filter conditions (list of kb_ids)
+            limit (int)
+            with_vectors (bool): Return the vectors of the points as well
+        Returns:
+            models.QueryResponse: Scored points, best first
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def asearch_vector(
+        self,
+        collection_name: str,
+        vector: list[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        timeout: int = 30,
+        with_vectors: bool = False,
+    ) -> models.QueryResponse:
+        """
+        Search for a vector in the collection without blocking the event loop
+
+        Args:
+            collection_name (str): Collection name to search
+            vector (list[float]): Vector embedding
+            search_params (models.SearchParams): Search parameters
+            query_filter (models.Filter): Filter conditions (list of kb_ids)
+            limit (int)
+            with_vectors (bool): Return the vectors of the points as well
+        Returns:
+            models.QueryResponse: Scored points, best first
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Get the full vectors of points
+
+        Args:
+            collection_name (str): Collection name
+            vector_ids (List[str]): Vector IDs
+
+        Returns:
+            Dict[str, List[float]]: Vectors by vector ID, missing points are left out
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aget_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Get the full vectors of points without blocking the event loop
+
+        Args:
+            collection_name (str): Collection name
+            vector_ids (List[str]): Vector IDs
+
+        Returns:
+            Dict[str, List[float]]: Vectors by vector ID, missing points are left out
+        """
+        raise NotImplementedError
+
 
 class QdrantVectorDatabase(BaseVectorDatabase):
     """
@@ -106,14 +259,74 @@ class QdrantVectorDatabase(BaseVectorDatabase):
         before_sleep=before_sleep_log(logger, logging.DEBUG),
         retry=retry_if_exception_type(ConnectionError),
     )
-    def __init__(self, url: str, distance: str = models.Distance.COSINE) -> None:
+    def __init__(
+        self,
+        url: str,
+        distance: str = models.Distance.COSINE,
+        hnsw_config: Optional[models.HnswConfigDiff] = None,
+        indexing_threshold: int = 20000,
+        tenant_partitioning: bool = False,
+        quantization: Optional[QuantizationConfig] = None,
+        small_vector_dim: Optional[int] = None,
+        prefetch_factor: float = 4.0,
+    ) -> None:
+        """
+        Args:
+            url (str): Qdrant url
+            distance (str): Distance of the vectors. Default to `models.Distance.COSINE`.
+            hnsw_config (models.HnswConfigDiff, optional): HNSW index parameters, Qdrant defaults if `None`.
+            indexing_threshold (int): Size of a segment in kilobytes above which its HNSW index is built. Default to `20000`.
+            tenant_partitioning (bool): Index `TENANT_FIELD` as a tenant, Qdrant then stores the points of a tenant together. Default to `False`.
+            quantization (QuantizationConfig, optional): Quantization profiles of the collections, binary quantization if `None`.
+            small_vector_dim (int, optional): Dimension of the truncated vector of the new collections, one full vector per point if `None`.
+            prefetch_factor (float): Size of the first pass shortlist of two-stage searches, as a multiple of the limit. Default to `4.0`.
+        """
         self.url = url
         self.client = QdrantClient(url)
+        self.async_client = AsyncQdrantClient(url)
         self.distance = distance
+        self.hnsw_config = hnsw_config
+        self.indexing_threshold = indexing_threshold
+        self.tenant_partitioning = tenant_partitioning
+        self.quantization = quantization or QuantizationConfig()
+        self.small_vector_dim = small_vector_dim
+        self.prefetch_factor = prefetch_factor
+        # Dimension of the truncated vector per collection, `None` for single vector collections
+        self.collection_small_vector_dims: Dict[str, Optional[int]] = {}
         self.test_connection()
 
         logger.info("QdrantVectorDatabase initialized successfully !!!")
 
+    @classmethod
+    def from_setting(cls, setting: GlobalSettings) -> "QdrantVectorDatabase":
+        """
+        Create the client with the url and the index parameters of the settings.
+
+        With tenant partitioning, one HNSW graph is built per tenant (`payload_m`) instead of
+        a global graph (`m=0`): a search filtered on a few knowledge bases only walks their graphs.
+
+        Args:
+            setting (GlobalSettings): The settings
+        """
+        qdrant_config = setting.qdrant_config
+
+        return cls(
+            url=qdrant_config.url,
+            hnsw_config=models.HnswConfigDiff(
+                m=0 if qdrant_config.tenant_partitioning else qdrant_config.hnsw_m,
+                payload_m=qdrant_config.hnsw_m
+                if qdrant_config.tenant_partitioning
+                else None,
+                ef_construct=qdrant_config.hnsw_ef_construct,
+                full_scan_threshold=qdrant_config.full_scan_threshold,
+            ),
+            indexing_threshold=qdrant_config.indexing_threshold,
+            tenant_partitioning=qdrant_config.tenant_partitioning,
+            quantization=qdrant_config.quantization,
+            small_vector_dim=qdrant_config.matryoshka_dim,
+            prefetch_factor=qdrant_config.matryoshka_prefetch_factor,
+        )
+
     def test_connection(self):
         """
         Test the connection with the Qdrant server.
@@ -131,20 +344,332 @@ class QdrantVectorDatabase(BaseVectorDatabase):
             logger.info(
                 "collection_name: %s - vector_size: %s", collection_name, vector_size
             )
+            vectors_config = models.VectorParams(
+                size=vector_size, distance=self.distance, on_disk=True
+            )
+            if (
+                self.small_vector_dim is not None
+                and self.small_vector_dim < vector_size
+            ):
+                vectors_config = {
+                    FULL_VECTOR_NAME: vectors_config,
+                    SMALL_VECTOR_NAME: models.VectorParams(
+                        size=self.small_vector_dim, distance=self.distance
+                    ),
+                }
+
             self.client.create_collection(
                 collection_name,
-                vectors_config=models.VectorParams(
-                    size=vector_size, distance=self.distance, on_disk=True
-                ),
+                vectors_config=vectors_config,
+                hnsw_config=self.hnsw_config,
                 optimizers_config=models.OptimizersConfigDiff(
                     default_segment_number=5,
-                    indexing_threshold=0,
+                    indexing_threshold=self.indexing_threshold,
+                ),
+                quantization_config=self.get_quantization_config(
+                    self.get_quantization_profile(collection_name)
+                ),
+            )
+            self.create_payload_indexes(collection_name)
+            self.collection_small_vector_dims.pop(collection_name, None)
+
+    @staticmethod
+    def _get_small_vector_dim(
+        vectors_config: models.VectorParams | Dict[str, models.VectorParams],
+    ) -> Optional[int]:
+        if isinstance(vectors_config, dict) and SMALL_VECTOR_NAME in vectors_config:
+            return vectors_config[SMALL_VECTOR_NAME].size
+
+        return None
+
+    def get_small_vector_dim(self, collection_name: str) -> Optional[int]:
+        """
+        Get the dimension of the truncated vector of a collection
+
+        Args:
+            collection_name (str): Collection name
+
+        Returns:
+            Optional[int]: Dimension of the truncated vector, `None` for a single vector collection
+        """
+        if collection_name not in self.collection_small_vector_dims:
+            self.collection_small_vector_dims[collection_name] = (
+                self._get_small_vector_dim(
+                    self.client.get_collection(collection_name).config.params.vectors
+                )
+            )
+
+        return self.collection_small_vector_dims[collection_name]
+
+    async def aget_small_vector_dim(self, collection_name: str) -> Optional[int]:
+        """
+        Asynchronously get the dimension of the truncated vector of a collection
+
+        Args:
+            collection_name (str): Collection name
+
+        Returns:
+            Optional[int]: Dimension of the truncated vector, `None` for a single vector collection
+        """
+        if collection_name not in self.collection_small_vector_dims:
+            collection = await self.async_client.get_collection(collection_name)
+            self.collection_small_vector_dims[collection_name] = (
+                self._get_small_vector_dim(collection.config.params.vectors)
+            )
+
+        return self.collection_small_vector_dims[collection_name]
+
+    @staticmethod
+    def truncate_vector(vector: List[float], dim: int) -> List[float]:
+        """
+        Truncate a matryoshka embedding (e.g. text-embedding-3) and normalize it again
+
+        Args:
+            vector (List[float]): Full embedding
+            dim (int): Dimension of the truncated embedding
+
+        Returns:
+            List[float]: Truncated embedding with unit norm
+        """
+        truncated = np.asarray(vector[:dim], dtype=np.float32)
+        return (truncated / (np.linalg.norm(truncated) + 1e-12)).tolist()
+
+    def get_point_vector(
+        self, collection_name: str, vector: List[float] | Dict[str, List[float]]
+    ) -> List[float] | Dict[str, List[float]]:
+        """
+        Get the vector of a point in the layout of the collection
+
+        Args:
+            collection_name (str): Collection name
+            vector (List[float] | Dict[str, List[float]]): Full embedding, or named vectors of another collection
+
+        Returns:
+            List[float] | Dict[str, List[float]]: Full embedding, or full and truncated named vectors
+        """
+        if isinstance(vector, dict):
+            vector = vector[FULL_VECTOR_NAME]
+
+        small_vector_dim = self.get_small_vector_dim(collection_name)
+        if small_vector_dim is None:
+            return vector
+
+        return {
+            FULL_VECTOR_NAME: vector,
+            SMALL_VECTOR_NAME: self.truncate_vector(vector, small_vector_dim),
+        }
+
+    def get_query_kwargs(
+        self,
+        small_vector_dim: Optional[int],
+        vector: List[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter],
+        limit: int,
+        with_vectors: bool,
+    ) -> dict:
+        """
+        Get the `query_points` arguments. Two-stage collections are searched on the truncated vector
+        for a shortlist of `limit * prefetch_factor` points, which are rescored with the full vector.
+
+        Args:
+            small_vector_dim (int, optional): Dimension of the truncated vector of the collection
+            vector (List[float]): Full query embedding
+            search_params (models.SearchParams): Search parameters of the first pass
+            query_filter (models.Filter, optional): Filter conditions
+            limit (int): Number of points to return
+            with_vectors (bool): Return the full vectors of the points as well
+
+        Returns:
+            dict: Keyword arguments of `query_points`
+        """
+        if small_vector_dim is None:
+            return dict(
+                query=vector,
+                search_params=search_params,
+                query_filter=query_filter,
+                limit=limit,
+                with_vectors=with_vectors,
+            )
+
+        return dict(
+            prefetch=models.Prefetch(
+                query=self.truncate_vector(vector, small_vector_dim),
+                using=SMALL_VECTOR_NAME,
+                filter=query_filter,
+                params=search_params,
+                limit=int(limit * self.prefetch_factor),
+            ),
+            query=vector,
+            using=FULL_VECTOR_NAME,
+            # Rescore the shortlist with the original full vectors
+            search_params=models.SearchParams(
+                quantization=models.QuantizationSearchParams(ignore=True)
+            ),
+            query_filter=query_filter,
+            limit=limit,
+            with_vectors=[FULL_VECTOR_NAME] if with_vectors else False,
+        )
+
+    @staticmethod
+    def _unname_vectors(response: models.QueryResponse) -> models.QueryResponse:
+        for point in response.points:
+            if isinstance(point.vector, dict):
+                point.vector = point.vector.get(FULL_VECTOR_NAME)
+
+        return response
+
+    def get_quantization_profile(self, collection_name: str) -> QuantizationProfile:
+        """
+        Get the quantization profile of a collection
+
+        Args:
+            collection_name (str): Collection name
+
+        Returns:
+            QuantizationProfile: The profile set for the collection, or the default profile
+        """
+        profile_name = self.quantization.collection_profiles.get(
+            collection_name, self.quantization.default_profile
+        )
+        assert (
+            profile_name in self.quantization.profiles
+        ), f"Unknown quantization profile: {profile_name}"
+
+        return self.quantization.profiles[profile_name]
+
+    @staticmethod
+    def get_quantization_config(
+        profile: QuantizationProfile,
+    ) -> Optional[models.QuantizationConfig]:
+        """
+        Get the Qdrant quantization config of a profile
+
+        Args:
+            profile (QuantizationProfile): Quantization profile
+
+        Returns:
+            Optional[models.QuantizationConfig]: Quantization config, `None` without quantization
+        """
+        if profile.type == QuantizationType.BINARY:
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=profile.always_ram),
+            )
+
+        elif profile.type == QuantizationType.SCALAR:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=profile.quantile,
+                    always_ram=profile.always_ram,
                 ),
-                quantization_config=models.BinaryQuantization(
-                    binary=models.BinaryQuantizationConfig(always_ram=True),
+            )
+
+        elif profile.type == QuantizationType.PRODUCT:
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(
+                    compression=models.CompressionRatio(profile.compression or "x16"),
+                    always_ram=profile.always_ram,
                 ),
             )
 
+        return None
+
+    def get_search_params(
+        self, collection_name: str, hnsw_ef: Optional[int] = None, exact: bool = False
+    ) -> models.SearchParams:
+        """
+        Get the search parameters matching the quantization profile of a collection
+
+        Args:
+            collection_name (str): Collection name
+            hnsw_ef (int, optional): Size of the HNSW search beam, Qdrant picks it if `None`
+            exact (bool): Search without index nor quantization, e.g. to get the ground truth. Default to `False`.
+
+        Returns:
+            models.SearchParams: Search parameters
+        """
+        profile = self.get_quantization_profile(collection_name)
+
+        if exact or profile.type == QuantizationType.NONE:
+            return models.SearchParams(
+                hnsw_ef=hnsw_ef,
+                exact=exact,
+                quantization=models.QuantizationSearchParams(ignore=True),
+            )
+
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            quantization=models.QuantizationSearchParams(
+                ignore=False,
+                rescore=profile.rescore,
+                oversampling=profile.oversampling,
+            ),
+        )
+
+    def create_payload_indexes(self, collection_name: str):
+        """
+        Create the missing keyword indexes of the filtered payload fields, the tenant index included
+
+        Args:
+            collection_name (str): Collection name
+        """
+        payload_schema = self.client.get_collection(collection_name).payload_schema
+
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            is_tenant = self.tenant_partitioning and field_name == TENANT_FIELD
+
+            if field_name in payload_schema and (
+                not is_tenant
+                or getattr(payload_schema[field_name].params, "is_tenant", False)
+            ):
+                continue
+
+            if is_tenant:
+                field_schema = models.KeywordIndexParams(
+                    type=models.KeywordIndexType.KEYWORD, is_tenant=True
+                )
+
+            logger.info(
+                "collection_name: %s - creating payload index: %s",
+                collection_name,
+                field_name,
+            )
+            self.client.create_payload_index(
+                collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
+            )
+
+    def apply_index_settings(self, collection_name: str):
+        """
+        Apply the HNSW parameters, the indexing threshold, the quantization profile and the payload indexes
+        to an existing collection.
+        Qdrant builds the indexes in the background, the collection stays searchable meanwhile.
+
+        Args:
+            collection_name (str): Collection name
+        """
+        if not self.check_collection_exists(collection_name):
+            logger.debug(f"Collection {collection_name} does not exist")
+            return
+
+        self.client.update_collection(
+            collection_name,
+            hnsw_config=self.hnsw_config,
+            optimizers_config=models.OptimizersConfigDiff(
+                indexing_threshold=self.indexing_threshold,
+            ),
+            quantization_config=self.get_quantization_config(
+                self.get_quantization_profile(collection_name)
+            )
+            or models.Disabled.DISABLED,
+        )
+        self.create_payload_indexes(collection_name)
+
+        logger.info(f"Index settings applied to {collection_name}")
+
     def add_vector(
         self,
         collection_name: str,
@@ -170,7 +695,7 @@ class QdrantVectorDatabase(BaseVectorDatabase):
                 models.PointStruct(
                     id=vector_id,
                     payload=payload.model_dump(),
-                    vector=vector,
+                    vector=self.get_point_vector(collection_name, vector),
                 )
             ],
         )
@@ -198,7 +723,7 @@ class QdrantVectorDatabase(BaseVectorDatabase):
             models.PointStruct(
                 id=vector_id,
                 payload=payload.model_dump(),
-                vector=vector,
+                vector=self.get_point_vector(collection_name, vector),
             )
             for vector_id, vector, payload in zip(vector_ids, vectors, payloads)
         ]
@@ -249,6 +774,7 @@ class QdrantVectorDatabase(BaseVectorDatabase):
             return
 
         success = self.client.delete_collection(collection_name)
+        self.collection_small_vector_dims.pop(collection_name, None)
 
         if success:
             logger.debug(f"Collection {collection_name} deleted successfully!")
@@ -258,6 +784,8 @@ class QdrantVectorDatabase(BaseVectorDatabase):
     ):
         """
         Migrate all data from source collection to target collection.
+        A missing target collection is created with the index, tenant and vector settings of this client,
+        e.g. to move the existing points to a tenant partitioned or a two-stage collection.
 
         Args:
             source_collection (str): Name of the source collection
@@ -268,9 +796,13 @@ class QdrantVectorDatabase(BaseVectorDatabase):
             logger.debug(f"Source collection: {source_collection} does not exist")
             return
 
-        assert self.check_collection_exists(
-            target_collection
-        ), f"Target collection: {target_collection} does not exist"
+        if not self.check_collection_exists(target_collection):
+            vectors_config = self.client.get_collection(
+                source_collection
+            ).config.params.vectors
+            if isinstance(vectors_config, dict):
+                vectors_config = vectors_config[FULL_VECTOR_NAME]
+            self.create_collection(target_collection, vectors_config.size)
 
         offset: Optional[str] = None
 
@@ -291,7 +823,7 @@ class QdrantVectorDatabase(BaseVectorDatabase):
                 models.PointStruct(
                     id=point.id,
                     payload=point.payload,
-                    vector=point.vector,
+                    vector=self.get_point_vector(target_collection, point.vector),
                 )
                 for point in points
             ]
@@ -318,6 +850,7 @@ class QdrantVectorDatabase(BaseVectorDatabase):
         query_filter: Optional[models.Filter] = None,
         limit: int = 10,
         timeout: int = 30,
+        with_vectors: bool = False,
     ) -> List[ScoredPoint]:
         """
         Search for a vector in the collection
@@ -328,15 +861,131 @@ class QdrantVectorDatabase(BaseVectorDatabase):
             search_params (models.SearchParams): Search parameters
             query_filter (models.Filter): Filter conditions (list of kb_ids)
             limit (int)
+            with_vectors (bool): Return the vectors of the points as well
         Returns:
             List[models.PointStruct]: List of points
         """
-        return self.client.query_points(
+        response = self.client.query_points(
             collection_name=collection_name,
-            query=vector,
-            search_params=search_params,
             with_payload=True,
-            query_filter=query_filter,
-            limit=limit,
             timeout=timeout,
+            **self.get_query_kwargs(
+                self.get_small_vector_dim(collection_name),
+                vector,
+                search_params,
+                query_filter,
+                limit,
+                with_vectors,
+            ),
         )
+
+        return self._unname_vectors(response)
+
+    async def asearch_vector(
+        self,
+        collection_name: str,
+        vector: list[float],
+        search_params: models.SearchParams,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        timeout: int = 30,
+        with_vectors: bool = False,
+    ) -> List[ScoredPoint]:
+        """
+        Search for a vector in the collection without blocking the event loop
+
+        Args:
+            collection_name (str): Collection name to search
+            vector (list[float]): Vector embedding
+            search_params (models.SearchParams): Search parameters
+            query_filter (models.Filter): Filter conditions (list of kb_ids)
+            limit (int)
+            with_vectors (bool): Return the vectors of the points as well
+        Returns:
+            List[models.PointStruct]: List of points
+        """
+        response = await self.async_client.query_points(
+            collection_name=collection_name,
+            with_payload=True,
+            timeout=timeout,
+            **self.get_query_kwargs(
+                await self.aget_small_vector_dim(collection_name),
+                vector,
+                search_params,
+                query_filter,
+                limit,
+                with_vectors,
+            ),
+        )
+
+        return self._unname_vectors(response)
+
+    def get_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Get the full vectors of points
+
+        Args:
+            collection_name (str): Collection name
+            vector_ids (List[str]): Vector IDs
+
+        Returns:
+            Dict[str, List[float]]: Vectors by vector ID, missing points are left out
+        """
+        if not vector_ids:
+            return {}
+
+        points = self.client.retrieve(
+            collection_name,
+            ids=vector_ids,
+            with_payload=False,
+            with_vectors=self._get_full_vector_selector(
+                self.get_small_vector_dim(collection_name)
+            ),
+        )
+
+        return self._get_vectors_by_id(points)
+
+    async def aget_vectors(
+        self, collection_name: str, vector_ids: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Get the full vectors of points without blocking the event loop
+
+        Args:
+            collection_name (str): Collection name
+            vector_ids (List[str]): Vector IDs
+
+        Returns:
+            Dict[str, List[float]]: Vectors by vector ID, missing points are left out
+        """
+        if not vector_ids:
+            return {}
+
+        points = await self.async_client.retrieve(
+            collection_name,
+            ids=vector_ids,
+            with_payload=False,
+            with_vectors=self._get_full_vector_selector(
+                await self.aget_small_vector_dim(collection_name)
+            ),
+        )
+
+        return self._get_vectors_by_id(points)
+
+    @staticmethod
+    def _get_full_vector_selector(small_vector_dim: Optional[int]) -> bool | List[str]:
+        return [FULL_VECTOR_NAME] if small_vector_dim is not None else True
+
+    @staticmethod
+    def _get_vectors_by_id(points: List[models.Record]) -> Dict[str, List[float]]:
+        return {
+            str(point.id): (
+                point.vector.get(FULL_VECTOR_NAME)
+                if isinstance(point.vector, dict)
+                else point.vector
+            )
+            for point in points
+            if point.vector is not None
+        }
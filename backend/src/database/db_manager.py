@@ -1,8 +1,8 @@
+import os
 import sys
-import copy
+import threading
 from uuid import UUID
 from pathlib import Path
-from collections import deque
 from typing import Type
 from sqlmodel import Session, select
 from llama_index.core import Document
@@ -10,25 +10,31 @@ from fastapi import Depends, HTTPException, status
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from .runtime import get_runtime
 from .contextual_rag_manager import ContextualRAG
+from .utils import answer_cache
+from .kb_hierarchy import kb_hierarchy
+from .product_catalog import product_catalog_cache
 from .core import (
     Messages,
     Conversations,
     Assistants,
     Documents,
-    load_storage_service,
     BaseStorageClient,
     DocumentChunks,
     KnowledgeBases,
 )
 from api.deps import SessionDeps
 
-from src.utils import get_formatted_logger
-from src.constants import DocumentMetadata, DOWNLOAD_FOLDER
+from src.utils import get_formatted_logger, LRUTTLCache
+from src.constants import DocumentMetadata
 from src.settings import GlobalSettings, get_default_setting
 
 logger = get_formatted_logger(__file__)
 
+# Product files whose catalog is being indexed by a worker, scheduled once per process and period
+indexing_product_files = LRUTTLCache(max_size=1024, ttl=600)
+
 
 class DatabaseManager:
     """
@@ -45,16 +51,17 @@ class DatabaseManager:
 
         Args:
             setting (GlobalSettings): Global settings
+            db_session (Session): Database session
         """
         self.setting = setting
         self.db_session = db_session
 
-        self.storage_client: Type[BaseStorageClient] = load_storage_service(
-            setting.storage_config.type
-        )
-        self.contextual_rag_client = ContextualRAG.from_setting(setting)
+        # Clients are shared process-wide, only the database session is per request
+        runtime = get_runtime(setting)
+        self.storage_client: Type[BaseStorageClient] = runtime.storage_client
+        self.contextual_rag_client: ContextualRAG = runtime.contextual_rag
 
-        logger.info("DatabaseManager initialized successfully !!!")
+        logger.debug("DatabaseManager initialized successfully !!!")
 
     @classmethod
     def from_setting(cls, setting: GlobalSettings, db_session: Session = None):
@@ -86,27 +93,98 @@ class DatabaseManager:
 
     def get_product_file_path(self, knowledge_base_id: str) -> str:
         """
-        Get product file path
+        Get the product catalog path of a knowledge base. The catalog built by the document
+        worker is only downloaded when its current version has no local catalog yet. The
+        product files processed before the catalogs are indexed by the `index_product_catalog`
+        task, the product search is unavailable until then.
 
         Args:
             knowledge_base_id (str): Knowledge base ID
 
         Returns:
-            str: Product file path or None
+            str: Product catalog path or None
         """
         query = select(Documents.file_path_in_storage_service).where(
             Documents.knowledge_base_id == knowledge_base_id,
             Documents.is_product_file,
         )
         product_file_path = self.db_session.exec(query).first()
-        file_path_to_save = str(DOWNLOAD_FOLDER / f"{knowledge_base_id}.xlsx")
 
-        if product_file_path:
-            self.download_file(product_file_path, file_path_to_save)
-            return file_path_to_save
+        if not product_file_path:
+            return None
+
+        # The object name is unique per upload: it versions the catalog
+        catalog_path = product_catalog_cache.get_catalog_path(product_file_path)
+        if catalog_path.exists():
+            return str(catalog_path)
+
+        if product_file_path in indexing_product_files:
+            return None
+
+        if self.download_product_catalog(product_file_path, catalog_path):
+            return str(catalog_path)
+
+        # Imported here, the tasks depend on this package
+        from src.tasks import index_product_catalog
+
+        logger.info(f"Scheduling the indexing of the product file {product_file_path}")
+        index_product_catalog.delay(product_file_path)
+        indexing_product_files.set(product_file_path, True)
 
         return None
 
+    def download_product_catalog(
+        self, object_name: str, catalog_path: str | Path
+    ) -> bool:
+        """
+        Download the catalog of a product file, built by the document worker
+
+        Args:
+            object_name (str): Object name of the product file in Minio
+            catalog_path (str | Path): Local catalog path
+
+        Returns:
+            bool: Whether the catalog was downloaded
+        """
+        catalog_path = Path(catalog_path)
+        catalog_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Downloaded next to the catalog then renamed, readers never see a partial file
+        tmp_path = catalog_path.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+
+        try:
+            self.download_file(
+                product_catalog_cache.get_catalog_object_name(object_name),
+                str(tmp_path),
+            )
+        except Exception as e:
+            # Minio raises on a missing object, S3 logs it
+            logger.warning(f"No product catalog for {object_name}: {e}")
+
+        if not tmp_path.exists():
+            return False
+
+        tmp_path.replace(catalog_path)
+        return True
+
+    def index_product_file(self, file_path: str | Path, object_name: str):
+        """
+        Index a product file, embedding its products, and upload its catalog next to it
+
+        Args:
+            file_path (str | Path): Local product file path
+            object_name (str): Object name of the product file in Minio
+        """
+        catalog_path = product_catalog_cache.build(file_path, version=object_name)
+
+        self.storage_client.upload_file(
+            bucket_name=self.storage_client.get_upload_bucket_name(),
+            object_name=product_catalog_cache.get_catalog_object_name(object_name),
+            file_path=catalog_path,
+        )
+
     def download_file(self, object_name: str, file_path: str):
         """
         Download file from Minio
@@ -178,11 +256,32 @@ class DatabaseManager:
             document_id=document_id,
         )
 
+    def index_to_elastic_search(
+        self,
+        kb_id: str,
+        document_id: UUID,
+        documents_metadata: list[DocumentMetadata],
+    ):
+        """
+        Index to ElasticSearch for hybrid search, do nothing if hybrid search is disabled
+
+        Args:
+            kb_id (str): Knowledge base ID
+            document_id (UUID): Document ID
+            documents_metadata (list[DocumentMetadata]): Metadata of the chunks
+        """
+        self.contextual_rag_client.es_insert_data(
+            kb_id=kb_id,
+            document_id=document_id,
+            documents_metadata=documents_metadata,
+        )
+
     def delete_file(
         self,
         object_name: str,
         document_id: UUID,
         delete_to_retry: bool = False,
+        knowledge_base_id: UUID | None = None,
     ):
         """
         Delete file
@@ -190,9 +289,8 @@ class DatabaseManager:
         Args:
             object_name (str): Object name in Minio
             document_id (UUID): Document ID
-            knownledge_base_id (UUID): Knowledge base ID
-            is_contextual_rag (bool): Is contextual RAG
             delete_to_retry (bool, optional): Delete file to retry processing. Defaults to `False`.
+            knowledge_base_id (UUID, optional): Knowledge base ID, required to delete the chunks from ElasticSearch and invalidate the cached answers. Defaults to `None`.
         """
 
         if not delete_to_retry:
@@ -201,11 +299,29 @@ class DatabaseManager:
                 object_name=object_name,
             )
 
+            # Product files have a catalog, removing a missing object is a no-op
+            if Path(object_name).suffix == ".xlsx":
+                self.storage_client.remove_file(
+                    bucket_name=self.storage_client.get_upload_bucket_name(),
+                    object_name=product_catalog_cache.get_catalog_object_name(
+                        object_name
+                    ),
+                )
+
         self.contextual_rag_client.qdrant_client.delete_vector(
             collection_name=self.setting.global_vector_db_collection_name,
             document_id=document_id,
         )
 
+        es_client = self.contextual_rag_client.es_client
+        if es_client is not None and knowledge_base_id is not None:
+            es_client.delete_documents(
+                index_name=knowledge_base_id, document_id=document_id
+            )
+
+        if knowledge_base_id is not None:
+            answer_cache.invalidate(knowledge_base_id)
+
         logger.info(f"Removed: {document_id}")
 
     def delete_conversation(self, conversation_id: str | UUID):
@@ -242,13 +358,18 @@ class DatabaseManager:
         self.db_session.close()
 
         logger.info("Deleting memory from crewAI, conversation_id: %s", conversation_id)
-        # Delete collection which are memory from crewAI
-        self.contextual_rag_client.qdrant_client.delete_collection(
-            collection_name=f"entity_memory_{conversation_id}"
-        )
-        self.contextual_rag_client.qdrant_client.delete_collection(
-            collection_name=f"short_term_memory_{conversation_id}"
-        )
+        # The memories of crewAI are in collections shared by the conversations. Imported here,
+        # the agents depend on this package.
+        from src.agents.memory_storage import delete_conversation_memory
+
+        try:
+            delete_conversation_memory(
+                conversation_id, url=self.setting.qdrant_config.url
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to delete the memory of conversation {conversation_id}: {e}"
+            )
 
         logger.info(f"Deleted conversation: {conversation_id}")
 
@@ -301,6 +422,7 @@ class DatabaseManager:
                 object_name=doc.file_path_in_storage_service,
                 document_id=doc.id,
                 delete_to_retry=False,
+                knowledge_base_id=knowledge_base_id,
             )
 
             document_chunks = self.db_session.exec(
@@ -324,42 +446,12 @@ class DatabaseManager:
         for assistant_id in assistants_ids:
             self.delete_assistant(assistant_id=assistant_id)
 
-        parents_copy = copy.deepcopy(kb.parents)
-        # Delete the knowledge base from the parents of this knowledge base. Mean that this deleted knowledge base is no longer inheriting its parents
-        for parent_id in kb.parents:
-            parent_kb = self.db_session.exec(
-                select(KnowledgeBases).where(KnowledgeBases.id == parent_id)
-            ).first()
+        if self.contextual_rag_client.es_client is not None:
+            self.contextual_rag_client.es_client.delete_index(knowledge_base_id)
 
-            parent_kb_children = copy.deepcopy(parent_kb.children)
-            parent_kb_children = [
-                child for child in parent_kb_children if child != kb.id
-            ]
-            parent_kb.children = list(set(parent_kb_children))
-
-            self.db_session.add(parent_kb)
-            self.db_session.commit()
-
-        # Delete the knowledge base from the children of its parents. Mean that the knowledge base is no longer inheriting its parents
-        queue = deque(kb.children)
-        parents_copy.append(kb.id)
-
-        while queue:
-            child_id = queue.popleft()
-            child_kb = self.db_session.exec(
-                select(KnowledgeBases).where(KnowledgeBases.id == child_id)
-            ).first()
-
-            child_kb_parents = copy.deepcopy(child_kb.parents)
-            child_kb_parents = [
-                parent for parent in child_kb_parents if parent not in parents_copy
-            ]
-            child_kb.parents = list(set(child_kb_parents))
-
-            self.db_session.add(child_kb)
-            self.db_session.commit()
-
-            queue.extend(child_kb.children)
+        # Descendants stop inheriting this knowledge base, and its ancestors unless inherited otherwise
+        kb_hierarchy.remove_knowledge_base(self.db_session, kb.id)
+        self.db_session.commit()
 
 
 def get_db_manager(
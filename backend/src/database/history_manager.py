@@ -0,0 +1,338 @@
+import sys
+import threading
+from uuid import UUID
+from pathlib import Path
+from typing import Optional
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select, desc
+from llama_index.llms.openai import OpenAI
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from .core import Conversations, Messages, get_instance_session
+from src.utils import get_formatted_logger, openai_compute_token, LRUTTLCache
+from src.settings import default_settings
+from src.constants import (
+    MesssageHistory,
+    HISTORY_SUMMARY_PROMPT,
+    HISTORY_SUMMARY_MESSAGE,
+)
+
+logger = get_formatted_logger(__file__)
+
+
+class ConversationHistory:
+    """
+    Cached projection of the chat history of a conversation: its summary and its latest messages
+    not folded into the summary, oldest first.
+
+    Args:
+        summary (Optional[str]): Summary of the folded messages
+        summary_until (Optional[datetime]): Created At time of the last folded message
+        messages (list[Messages]): Latest messages not folded into the summary, oldest first
+    """
+
+    def __init__(
+        self,
+        summary: Optional[str],
+        summary_until: Optional[datetime],
+        messages: list[Messages],
+    ):
+        self.summary = summary
+        self.summary_until = summary_until
+        self.message_ids: list[UUID] = []
+        self.messages: list[MesssageHistory] = []
+        self.tokens: list[int] = []
+        self.add_messages(messages)
+
+    @property
+    def last_message_id(self) -> Optional[UUID]:
+        return self.message_ids[-1] if self.message_ids else None
+
+    def add_messages(self, messages: list[Messages]):
+        """
+        Append messages to the history
+
+        Args:
+            messages (list[Messages]): New messages, oldest first
+        """
+        for message in messages:
+            self.message_ids.append(message.id)
+            self.messages.append(
+                MesssageHistory(content=message.content, role=message.sender_type)
+            )
+            # Any OpenAI tokenizer is close enough for a budget
+            self.tokens.append(openai_compute_token(message.content, "gpt-4o"))
+
+    def trim(self, max_messages: int):
+        """
+        Keep the latest messages only
+
+        Args:
+            max_messages (int): Number of messages kept
+        """
+        self.message_ids = self.message_ids[-max_messages:]
+        self.messages = self.messages[-max_messages:]
+        self.tokens = self.tokens[-max_messages:]
+
+
+class HistoryManager:
+    """
+    Chat history of the conversations sent to the agents: the latest turns fitting in a token
+    budget, preceded by a rolling summary of the older messages.
+
+    The messages falling out of the budget are folded into `Conversations.summary` in the
+    background, `Conversations.summary_until` marking the last folded message. The history of a
+    conversation is cached: a turn only reads the ID of the latest message to validate it, and
+    reloads at most `2 * max_turns + 1` messages when another process answered in the meantime.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        token_budget: int = 3000,
+        summary_model: str = "gpt-4o-mini",
+        summary_max_words: int = 300,
+        fold_batch_size: int = 20,
+        cache_size: int = 10000,
+    ):
+        """
+        Args:
+            max_turns (int): Maximum number of recent turns sent to the agent. Default to `10`.
+            token_budget (int): Maximum number of tokens of the recent messages. Default to `3000`.
+            summary_model (str): LLM folding the older messages into the summary. Default to `gpt-4o-mini`.
+            summary_max_words (int): Maximum number of words of the summary. Default to `300`.
+            fold_batch_size (int): Maximum number of messages folded at once. Default to `20`.
+            cache_size (int): Maximum number of cached conversation histories. Default to `10000`.
+        """
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_model = summary_model
+        self.summary_max_words = summary_max_words
+        self.fold_batch_size = fold_batch_size
+
+        self.histories = LRUTTLCache(max_size=cache_size)
+        self.llm: Optional[OpenAI] = None
+
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self._folding: set[UUID] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def max_messages(self) -> int:
+        # One more message than a full window, to know if some must be folded
+        return 2 * self.max_turns + 1
+
+    def _get_window_size(self, tokens: list[int]) -> int:
+        """
+        Number of latest messages within the turn and token budgets
+        """
+        budget = self.token_budget
+        size = 0
+
+        for message_tokens in reversed(tokens):
+            if size == 2 * self.max_turns or message_tokens > budget:
+                break
+            budget -= message_tokens
+            size += 1
+
+        return size
+
+    def _get_history(
+        self, session: Session, conversation: Conversations
+    ) -> ConversationHistory:
+        last_message_id = session.exec(
+            select(Messages.id)
+            .where(Messages.conversation_id == conversation.id)
+            .order_by(desc(Messages.created_at))
+            .limit(1)
+        ).first()
+
+        history: Optional[ConversationHistory] = self.histories.get(conversation.id)
+        if (
+            history is not None
+            and history.last_message_id == last_message_id
+            and history.summary_until == conversation.summary_until
+        ):
+            return history
+
+        query = select(Messages).where(Messages.conversation_id == conversation.id)
+        if conversation.summary_until is not None:
+            query = query.where(Messages.created_at > conversation.summary_until)
+
+        messages = session.exec(
+            query.order_by(desc(Messages.created_at)).limit(self.max_messages)
+        ).all()
+
+        history = ConversationHistory(
+            summary=conversation.summary,
+            summary_until=conversation.summary_until,
+            messages=messages[::-1],
+        )
+        self.histories.set(conversation.id, history)
+
+        return history
+
+    def get_message_history(
+        self, session: Session, conversation: Conversations
+    ) -> list[MesssageHistory]:
+        """
+        Get the chat history of a conversation sent to the agent
+
+        Args:
+            session (Session): Database session
+            conversation (Conversations): Conversation
+
+        Returns:
+            list[MesssageHistory]: The summary as a system message if any, then the latest messages, oldest first
+        """
+        history = self._get_history(session, conversation)
+
+        window_size = self._get_window_size(history.tokens)
+        message_history = history.messages[len(history.messages) - window_size :]
+
+        if history.summary:
+            message_history = [
+                MesssageHistory(
+                    content=HISTORY_SUMMARY_MESSAGE.format(summary=history.summary),
+                    role="system",
+                ),
+                *message_history,
+            ]
+
+        return message_history
+
+    def add_messages(self, conversation_id: UUID, messages: list[Messages]):
+        """
+        Add the committed messages of a turn to the cached history, and fold the messages falling
+        out of the budget in the background
+
+        Args:
+            conversation_id (UUID): Conversation ID
+            messages (list[Messages]): Messages of the turn, oldest first
+        """
+        history: Optional[ConversationHistory] = self.histories.get(conversation_id)
+        if history is None:
+            return
+
+        with self._lock:
+            history.add_messages(messages)
+            history.trim(self.max_messages)
+            must_fold = self._get_window_size(history.tokens) < len(history.tokens)
+
+        if must_fold:
+            self.schedule_fold(conversation_id)
+
+    def schedule_fold(self, conversation_id: UUID):
+        """
+        Fold the messages of a conversation falling out of the budget in the background
+
+        Args:
+            conversation_id (UUID): Conversation ID
+        """
+        with self._lock:
+            if conversation_id in self._folding:
+                return
+            self._folding.add(conversation_id)
+
+        self.executor.submit(self._fold_task, conversation_id)
+
+    def _fold_task(self, conversation_id: UUID):
+        try:
+            folded = self.fold(conversation_id)
+        except Exception as e:
+            logger.error(f"conversation_id: {conversation_id} - failed to fold: {e}")
+            folded = 0
+        finally:
+            with self._lock:
+                self._folding.discard(conversation_id)
+
+        # Older conversations catch up batch by batch
+        if folded == self.fold_batch_size:
+            self.schedule_fold(conversation_id)
+
+    def fold(self, conversation_id: UUID) -> int:
+        """
+        Fold the oldest messages falling out of the budget into the summary of a conversation
+
+        Args:
+            conversation_id (UUID): Conversation ID
+
+        Returns:
+            int: Number of folded messages
+        """
+        with get_instance_session() as session:
+            conversation = session.get(Conversations, conversation_id)
+            if conversation is None:
+                return 0
+
+            history = self._get_history(session, conversation)
+            window_size = self._get_window_size(history.tokens)
+            if window_size == len(history.tokens):
+                return 0
+
+            query = select(Messages).where(Messages.conversation_id == conversation_id)
+            if conversation.summary_until is not None:
+                query = query.where(Messages.created_at > conversation.summary_until)
+            if window_size > 0:
+                oldest_kept = session.get(
+                    Messages,
+                    history.message_ids[len(history.message_ids) - window_size],
+                )
+                query = query.where(Messages.created_at < oldest_kept.created_at)
+
+            messages = session.exec(
+                query.order_by(Messages.created_at).limit(self.fold_batch_size)
+            ).all()
+            if not messages:
+                return 0
+
+            conversation.summary = self.summarize(conversation.summary, messages)
+            conversation.summary_until = messages[-1].created_at
+            session.add(conversation)
+            session.commit()
+
+        self.histories.pop(conversation_id)
+
+        logger.debug(
+            "conversation_id: %s - folded %s messages into the summary",
+            conversation_id,
+            len(messages),
+        )
+
+        return len(messages)
+
+    def summarize(self, summary: Optional[str], messages: list[Messages]) -> str:
+        """
+        Update a summary with the messages following it
+
+        Args:
+            summary (Optional[str]): Current summary
+            messages (list[Messages]): Messages following the summary, oldest first
+
+        Returns:
+            str: Updated summary
+        """
+        if self.llm is None:
+            self.llm = OpenAI(model=self.summary_model, temperature=0)
+
+        prompt = HISTORY_SUMMARY_PROMPT.format(
+            summary=summary or "None",
+            messages="\n".join(
+                f"{message.sender_type}: {message.content}" for message in messages
+            ),
+            max_words=self.summary_max_words,
+        )
+
+        return self.llm.complete(prompt).text.strip()
+
+
+history_manager = HistoryManager(
+    max_turns=default_settings.history_config.max_turns,
+    token_budget=default_settings.history_config.token_budget,
+    summary_model=default_settings.history_config.summary_model,
+    summary_max_words=default_settings.history_config.summary_max_words,
+    fold_batch_size=default_settings.history_config.fold_batch_size,
+    cache_size=default_settings.history_config.cache_size,
+)
@@ -0,0 +1,327 @@
+import sys
+from uuid import UUID
+from pathlib import Path
+from collections import defaultdict, deque
+from sqlmodel import Session, select, delete, func, or_
+from sqlalchemy.dialects.postgresql import insert
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from .core import KnowledgeBaseClosure
+from src.utils import get_formatted_logger, LRUTTLCache
+from src.settings import default_settings
+
+logger = get_formatted_logger(__file__)
+
+
+class KnowledgeBaseHierarchy:
+    """
+    Knowledge base inheritance, stored as a closure table: one `KnowledgeBaseClosure` row per
+    (ancestor, descendant) pair with the length of the shortest inheritance path, so that ancestors,
+    descendants and direct children (depth 1) are indexed lookups.
+
+    The effective knowledge bases of a knowledge base (its ancestors and itself), searched by every
+    chat message of its assistants, are cached in process. The writes of this process invalidate
+    the cache, the other processes see them after `ttl` seconds.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        """
+        Args:
+            max_size (int): Maximum number of cached knowledge bases. Default to `10000`.
+            ttl (float): Time to live of the cached knowledge bases in seconds. Default to `60`.
+        """
+        self.kb_ids_cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+
+    def get_ancestor_ids(self, session: Session, kb_id: str | UUID) -> list[UUID]:
+        """
+        Get the knowledge bases inherited by a knowledge base, closest first
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID
+
+        Returns:
+            list[UUID]: Ancestor IDs
+        """
+        return list(
+            session.exec(
+                select(KnowledgeBaseClosure.ancestor_id)
+                .where(KnowledgeBaseClosure.descendant_id == kb_id)
+                .order_by(KnowledgeBaseClosure.depth, KnowledgeBaseClosure.ancestor_id)
+            ).all()
+        )
+
+    def get_descendant_ids(self, session: Session, kb_id: str | UUID) -> list[UUID]:
+        """
+        Get the knowledge bases inheriting a knowledge base, closest first
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID
+
+        Returns:
+            list[UUID]: Descendant IDs
+        """
+        return list(
+            session.exec(
+                select(KnowledgeBaseClosure.descendant_id)
+                .where(KnowledgeBaseClosure.ancestor_id == kb_id)
+                .order_by(
+                    KnowledgeBaseClosure.depth, KnowledgeBaseClosure.descendant_id
+                )
+            ).all()
+        )
+
+    def get_children_ids(self, session: Session, kb_id: str | UUID) -> list[UUID]:
+        """
+        Get the knowledge bases directly inheriting a knowledge base
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID
+
+        Returns:
+            list[UUID]: Children IDs
+        """
+        return list(
+            session.exec(
+                select(KnowledgeBaseClosure.descendant_id).where(
+                    KnowledgeBaseClosure.ancestor_id == kb_id,
+                    KnowledgeBaseClosure.depth == 1,
+                )
+            ).all()
+        )
+
+    def has_relatives(self, session: Session, kb_id: str | UUID) -> bool:
+        """
+        Check if a knowledge base inherits or is inherited by another knowledge base
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID
+
+        Returns:
+            bool: Whether the knowledge base is part of an inheritance
+        """
+        return (
+            session.exec(
+                select(KnowledgeBaseClosure.depth)
+                .where(
+                    or_(
+                        KnowledgeBaseClosure.ancestor_id == kb_id,
+                        KnowledgeBaseClosure.descendant_id == kb_id,
+                    )
+                )
+                .limit(1)
+            ).first()
+            is not None
+        )
+
+    def get_kb_ids(self, session: Session, kb_id: str | UUID) -> list[UUID]:
+        """
+        Get the knowledge bases searched for a knowledge base: its ancestors and itself. Cached.
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID, e.g. the knowledge base of an assistant
+
+        Returns:
+            list[UUID]: Knowledge base IDs, the knowledge base last
+        """
+        kb_id = UUID(str(kb_id))
+
+        kb_ids = self.kb_ids_cache.get(kb_id)
+        if kb_ids is None:
+            kb_ids = self.get_ancestor_ids(session, kb_id) + [kb_id]
+            self.kb_ids_cache.set(kb_id, kb_ids)
+
+        # Callers may extend the list
+        return list(kb_ids)
+
+    def invalidate(self, kb_ids: list[str | UUID]):
+        """
+        Remove knowledge bases from the cache
+
+        Args:
+            kb_ids (list[str | UUID]): Knowledge base IDs
+        """
+        for kb_id in kb_ids:
+            self.kb_ids_cache.pop(UUID(str(kb_id)))
+
+    def _get_depths(
+        self, session: Session, kb_id: UUID, ancestors: bool
+    ) -> dict[UUID, int]:
+        if ancestors:
+            rows = session.exec(
+                select(
+                    KnowledgeBaseClosure.ancestor_id, KnowledgeBaseClosure.depth
+                ).where(KnowledgeBaseClosure.descendant_id == kb_id)
+            ).all()
+        else:
+            rows = session.exec(
+                select(
+                    KnowledgeBaseClosure.descendant_id, KnowledgeBaseClosure.depth
+                ).where(KnowledgeBaseClosure.ancestor_id == kb_id)
+            ).all()
+
+        return dict(rows)
+
+    def _insert(self, session: Session, depths: dict[tuple[UUID, UUID], int]):
+        if not depths:
+            return
+
+        statement = insert(KnowledgeBaseClosure).values(
+            [
+                dict(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+                for (ancestor_id, descendant_id), depth in depths.items()
+            ]
+        )
+        # A pair reachable through several paths keeps its shortest one
+        session.exec(
+            statement.on_conflict_do_update(
+                index_elements=["ancestor_id", "descendant_id"],
+                set_=dict(
+                    depth=func.least(
+                        statement.excluded.depth, KnowledgeBaseClosure.depth
+                    )
+                ),
+            )
+        )
+
+    def add_inheritance(
+        self, session: Session, source_kb_id: str | UUID, target_kb_id: str | UUID
+    ):
+        """
+        Make a knowledge base inherit another one, along with the ancestors of the source.
+        The caller commits the session.
+
+        Args:
+            session (Session): Database session
+            source_kb_id (str | UUID): Inherited knowledge base ID
+            target_kb_id (str | UUID): Inheriting knowledge base ID
+        """
+        source_kb_id, target_kb_id = UUID(str(source_kb_id)), UUID(str(target_kb_id))
+
+        ancestors = self._get_depths(session, source_kb_id, ancestors=True)
+        ancestors[source_kb_id] = 0
+        descendants = self._get_depths(session, target_kb_id, ancestors=False)
+        descendants[target_kb_id] = 0
+
+        assert (
+            target_kb_id not in ancestors and source_kb_id not in descendants
+        ), "Inheritance cycle"
+
+        self._insert(
+            session,
+            {
+                (ancestor_id, descendant_id): ancestor_depth + 1 + descendant_depth
+                for ancestor_id, ancestor_depth in ancestors.items()
+                for descendant_id, descendant_depth in descendants.items()
+            },
+        )
+
+        self.invalidate(list(descendants))
+
+    def remove_knowledge_base(self, session: Session, kb_id: str | UUID):
+        """
+        Remove a knowledge base from the inheritance. Its descendants only keep the ancestors
+        they still reach without it. The caller commits the session.
+
+        Args:
+            session (Session): Database session
+            kb_id (str | UUID): Knowledge base ID
+        """
+        kb_id = UUID(str(kb_id))
+
+        affected = set(self._get_depths(session, kb_id, ancestors=False))
+        session.exec(
+            delete(KnowledgeBaseClosure).where(
+                or_(
+                    KnowledgeBaseClosure.ancestor_id == kb_id,
+                    KnowledgeBaseClosure.descendant_id == kb_id,
+                )
+            )
+        )
+        self.invalidate([kb_id])
+
+        if not affected:
+            return
+
+        # Direct inheritances are kept, the transitive ones of the descendants are rebuilt from them
+        parents: dict[UUID, list[UUID]] = defaultdict(list)
+        for parent_id, child_id in session.exec(
+            select(
+                KnowledgeBaseClosure.ancestor_id, KnowledgeBaseClosure.descendant_id
+            ).where(
+                KnowledgeBaseClosure.descendant_id.in_(affected),
+                KnowledgeBaseClosure.depth == 1,
+            )
+        ).all():
+            parents[child_id].append(parent_id)
+
+        session.exec(
+            delete(KnowledgeBaseClosure).where(
+                KnowledgeBaseClosure.descendant_id.in_(affected),
+                KnowledgeBaseClosure.depth > 1,
+            )
+        )
+
+        # Ancestors of the unaffected parents did not change
+        ancestors: dict[UUID, dict[UUID, int]] = {
+            parent_id: self._get_depths(session, parent_id, ancestors=True)
+            for parent_id in {p for ps in parents.values() for p in ps} - affected
+        }
+
+        # Topological order of the affected knowledge bases
+        pending = {
+            child_id: sum(parent_id in affected for parent_id in parents[child_id])
+            for child_id in affected
+        }
+        children: dict[UUID, list[UUID]] = defaultdict(list)
+        for child_id in affected:
+            for parent_id in parents[child_id]:
+                if parent_id in affected:
+                    children[parent_id].append(child_id)
+
+        depths: dict[tuple[UUID, UUID], int] = {}
+        queue = deque(child_id for child_id, count in pending.items() if count == 0)
+        while queue:
+            child_id = queue.popleft()
+
+            child_ancestors: dict[UUID, int] = {}
+            for parent_id in parents[child_id]:
+                for ancestor_id, depth in ancestors[parent_id].items():
+                    child_ancestors[ancestor_id] = min(
+                        depth + 1, child_ancestors.get(ancestor_id, depth + 1)
+                    )
+                child_ancestors[parent_id] = 1
+            ancestors[child_id] = child_ancestors
+
+            depths.update(
+                {
+                    (ancestor_id, child_id): depth
+                    for ancestor_id, depth in child_ancestors.items()
+                    if depth > 1
+                }
+            )
+
+            for grandchild_id in children[child_id]:
+                pending[grandchild_id] -= 1
+                if pending[grandchild_id] == 0:
+                    queue.append(grandchild_id)
+
+        self._insert(session, depths)
+        self.invalidate(list(affected))
+
+        logger.debug(
+            "kb_id: %s - rebuilt the inheritance of %s knowledge bases",
+            kb_id,
+            len(affected),
+        )
+
+
+kb_hierarchy = KnowledgeBaseHierarchy(
+    max_size=default_settings.kb_hierarchy_config.max_size,
+    ttl=default_settings.kb_hierarchy_config.ttl,
+)
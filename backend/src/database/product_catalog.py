@@ -0,0 +1,493 @@
+import sys
+import hashlib
+import os
+import threading
+import numpy as np
+import polars as pl
+
+from pathlib import Path
+from typing import Any, Callable, Optional
+from rapidfuzz import fuzz, process, utils
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from .utils import get_embeddings, weighted_reciprocal_rank_fusion
+from src.utils import get_formatted_logger, parse_price, LRUTTLCache
+from src.settings import GlobalSettings, default_settings
+
+logger = get_formatted_logger(__file__)
+
+PRODUCT_SHEET_NAME = "product"
+EMBEDDING_COLUMN = "embedding"
+
+
+def get_trigrams(text: str) -> set[str]:
+    """
+    Get the character trigrams of a normalized text, padded to weight the word starts
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        set[str]: Trigrams
+    """
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_prices(prices: pl.Series) -> np.ndarray:
+    """
+    Parse a price column, text prices with `parse_price` (e.g. "1.200.000 đ" or "12.99")
+
+    Args:
+        prices (pl.Series): Price column
+
+    Returns:
+        np.ndarray: Prices, NaN when missing, not a number or ambiguous
+    """
+    if prices.dtype == pl.String:
+        prices = prices.map_elements(parse_price, return_dtype=pl.Float64)
+
+    return prices.cast(pl.Float64, strict=False).fill_null(np.nan).to_numpy().copy()
+
+
+class ProductCatalog:
+    """
+    In-memory index of the products of a product file, one row per product name.
+
+    The names are normalized once, so that a search only normalizes the query: an exact name is a
+    dict lookup, other queries are scored with rapidfuzz and the scorer of `thefuzz.process.extract`
+    (WRatio). Large catalogs only score the names sharing the most trigrams with the query, counted
+    from a trigram inverted index.
+
+    Catalogs with product embeddings also rank the products by cosine similarity with the query
+    embedding, so that descriptive queries match, and fuse both rankings with weighted reciprocal
+    rank fusion. Price filters select the candidate rows before any scoring.
+    """
+
+    def __init__(
+        self,
+        df_product: pl.DataFrame,
+        query_cache_size: int = 1024,
+        candidate_count: int = 64,
+        fuzzy_weight: float = 0.5,
+        semantic_weight: float = 0.5,
+        rrf_k: int = 60,
+    ):
+        """
+        Args:
+            df_product (pl.DataFrame): Products, with at least a `name` column, and an `embedding` column once embedded
+            query_cache_size (int): Maximum number of cached search results. Default to `1024`.
+            candidate_count (int): Number of products ranked by each search method, all of them if the catalog is smaller. Default to `64`.
+            fuzzy_weight (float): Weight of the fuzzy name ranking in the fusion. Default to `0.5`.
+            semantic_weight (float): Weight of the embedding ranking in the fusion. Default to `0.5`.
+            rrf_k (int): Smoothing constant of reciprocal rank fusion. Default to `60`.
+        """
+        assert "name" in df_product.columns, "Product file must have a name column"
+
+        # Duplicated names keep their first row, as the previous `df.filter(...)[0]` lookups
+        self.df_product = df_product.filter(pl.col("name").is_not_null()).unique(
+            subset="name", keep="first", maintain_order=True
+        )
+        self.rows: dict[str, dict[str, Any]] = {
+            row["name"]: row
+            for row in self.df_product.drop(EMBEDDING_COLUMN, strict=False).to_dicts()
+        }
+        self.names = list(self.rows)
+        self.processed_names = [utils.default_process(str(name)) for name in self.names]
+        self.name_by_processed_name = {
+            processed_name: index
+            for index, processed_name in enumerate(self.processed_names)
+        }
+
+        self.prices = (
+            parse_prices(self.df_product["price"])
+            if "price" in self.df_product.columns
+            else np.full(len(self.names), np.nan)
+        )
+        self.embeddings: Optional[np.ndarray] = (
+            self.df_product[EMBEDDING_COLUMN].to_numpy().astype(np.float32)
+            if EMBEDDING_COLUMN in self.df_product.columns
+            else None
+        )
+
+        self.candidate_count = candidate_count
+        self.fuzzy_weight = fuzzy_weight
+        self.semantic_weight = semantic_weight
+        self.rrf_k = rrf_k
+
+        self.trigram_postings: dict[str, np.ndarray] = {}
+        if len(self.names) > candidate_count:
+            postings: dict[str, list[int]] = {}
+            for index, processed_name in enumerate(self.processed_names):
+                for trigram in get_trigrams(processed_name):
+                    postings.setdefault(trigram, []).append(index)
+            self.trigram_postings = {
+                trigram: np.array(indices, dtype=np.int32)
+                for trigram, indices in postings.items()
+            }
+
+        self.query_cache = LRUTTLCache(max_size=query_cache_size)
+
+    @classmethod
+    def from_excel(cls, file_path: str | Path, **kwargs) -> "ProductCatalog":
+        """
+        Read the `product` sheet of a product file
+
+        Args:
+            file_path (str | Path): Product file path, `.xlsx`
+
+        Returns:
+            ProductCatalog: Product catalog
+        """
+        assert Path(file_path).suffix == ".xlsx", "Only support xlsx file"
+
+        return cls(pl.read_excel(file_path, sheet_name=PRODUCT_SHEET_NAME), **kwargs)
+
+    @classmethod
+    def load(cls, file_path: str | Path, **kwargs) -> "ProductCatalog":
+        """
+        Load a product catalog saved with `save`, or read a product file
+
+        Args:
+            file_path (str | Path): Catalog path, `.parquet`, or product file path, `.xlsx`
+
+        Returns:
+            ProductCatalog: Product catalog
+        """
+        if Path(file_path).suffix == ".xlsx":
+            return cls.from_excel(file_path, **kwargs)
+
+        return cls(pl.read_parquet(file_path), **kwargs)
+
+    def save(self, file_path: str | Path):
+        """
+        Save the products and their embeddings, loading them back is much faster than reading
+        the product file
+
+        Args:
+            file_path (str | Path): Catalog path, `.parquet`
+        """
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Readers never see a partial file
+        tmp_path = file_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        self.df_product.write_parquet(tmp_path)
+        tmp_path.replace(file_path)
+
+    def embed(
+        self,
+        embed_fn: Callable[[list[str]], list[list[float]]] = get_embeddings,
+        embedding_dim: Optional[int] = None,
+    ):
+        """
+        Embed the name and description of the products
+
+        Args:
+            embed_fn (Callable[[list[str]], list[list[float]]]): Batch embedding function. Default to `get_embeddings`.
+            embedding_dim (Optional[int]): Number of leading dimensions kept, for Matryoshka embedding models. All of them if `None`.
+        """
+        texts = [
+            f"{row['name']}. {row.get('description') or ''}".strip()
+            for row in self.rows.values()
+        ]
+        embeddings = np.asarray(embed_fn(texts), dtype=np.float32)
+        if embedding_dim is not None:
+            embeddings = embeddings[:, :embedding_dim]
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+
+        self.embeddings = embeddings
+        self.df_product = self.df_product.with_columns(
+            pl.Series(
+                EMBEDDING_COLUMN,
+                embeddings,
+                dtype=pl.Array(pl.Float32, embeddings.shape[1]),
+            )
+        )
+        self.query_cache.clear()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get(self, name: str) -> Optional[dict[str, Any]]:
+        """
+        Get a product by its name
+
+        Args:
+            name (str): Product name
+
+        Returns:
+            Optional[dict[str, Any]]: Product row, `None` if there is no such product
+        """
+        return self.rows.get(name)
+
+    def get_price_mask(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Get the products within a price range, products without price are excluded by a filter
+
+        Args:
+            min_price (Optional[float]): Minimum price, included
+            max_price (Optional[float]): Maximum price, included
+
+        Returns:
+            Optional[np.ndarray]: Boolean mask of the products, `None` without filter
+        """
+        if min_price is None and max_price is None:
+            return None
+
+        # NaN comparisons are False
+        mask = np.ones(len(self.names), dtype=bool)
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if max_price is not None:
+            mask &= self.prices <= max_price
+
+        return mask
+
+    def _get_choices(
+        self, processed_query: str, mask: Optional[np.ndarray]
+    ) -> dict[int, str]:
+        indices = range(len(self.names)) if mask is None else np.flatnonzero(mask)
+
+        postings = [
+            self.trigram_postings[trigram]
+            for trigram in get_trigrams(processed_query)
+            if trigram in self.trigram_postings
+        ]
+        if len(indices) <= self.candidate_count or not postings:
+            return {int(index): self.processed_names[index] for index in indices}
+
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.names))
+        if mask is not None:
+            counts[~mask] = -1
+        candidates = np.argpartition(-counts, self.candidate_count)[
+            : self.candidate_count
+        ]
+
+        return {int(index): self.processed_names[index] for index in candidates}
+
+    def _fuzzy_search(
+        self, processed_query: str, mask: Optional[np.ndarray]
+    ) -> list[int]:
+        matches = process.extract(
+            processed_query,
+            self._get_choices(processed_query, mask),
+            scorer=fuzz.WRatio,
+            processor=None,
+            limit=self.candidate_count,
+        )
+
+        return [index for _, _, index in matches]
+
+    def _semantic_search(
+        self, query_embedding: list[float], mask: Optional[np.ndarray]
+    ) -> list[int]:
+        query = np.asarray(query_embedding, dtype=np.float32)[
+            : self.embeddings.shape[1]
+        ]
+        query /= np.linalg.norm(query) + 1e-12
+
+        if mask is None:
+            indices = np.arange(len(self.names))
+            scores = self.embeddings @ query
+        else:
+            indices = np.flatnonzero(mask)
+            scores = self.embeddings[indices] @ query
+
+        if len(indices) == 0:
+            return []
+
+        top_k = min(self.candidate_count, len(indices))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return indices[top].tolist()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 3,
+        query_embedding: Optional[list[float]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get the products which best match a query
+
+        Args:
+            query (str): Product name or description to search
+            limit (int): Maximum number of products. Default to `3`.
+            query_embedding (Optional[list[float]]): Embedding of the query, fuzzy search only if `None` or the catalog is not embedded
+            min_price (Optional[float]): Minimum price, included
+            max_price (Optional[float]): Maximum price, included
+
+        Returns:
+            list[dict[str, Any]]: Product rows, best match first
+        """
+        use_embeddings = query_embedding is not None and self.embeddings is not None
+
+        key = (query, limit, min_price, max_price, use_embeddings)
+        indices = self.query_cache.get(key)
+
+        if indices is None:
+            processed_query = utils.default_process(query)
+            mask = self.get_price_mask(min_price, max_price)
+
+            fuzzy_indices = self._fuzzy_search(processed_query, mask)
+            if use_embeddings:
+                fused = weighted_reciprocal_rank_fusion(
+                    [fuzzy_indices, self._semantic_search(query_embedding, mask)],
+                    weights=[self.fuzzy_weight, self.semantic_weight],
+                    k=self.rrf_k,
+                    top_n=limit,
+                )
+                indices = [index for index, _ in fused]
+            else:
+                indices = fuzzy_indices[:limit]
+
+            # An exact name is always the best match
+            exact_index = self.name_by_processed_name.get(processed_query)
+            if exact_index is not None and (mask is None or mask[exact_index]):
+                indices = [exact_index] + [
+                    index for index in indices if index != exact_index
+                ]
+                indices = indices[:limit]
+
+            self.query_cache.set(key, indices)
+
+        return [self.rows[self.names[index]] for index in indices]
+
+
+class ProductCatalogCache:
+    """
+    Product catalogs of the knowledge bases, cached in memory and saved on local disk.
+
+    A catalog is identified by its version, the storage object name of the product file, which
+    changes when a product file is uploaded. The document worker embeds the products once and
+    uploads the catalog next to the product file: the API hosts download it once per version.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_size: int = 64,
+        query_cache_size: int = 1024,
+        embed_products: bool = True,
+        embedding_dim: Optional[int] = None,
+        fuzzy_weight: float = 0.5,
+        semantic_weight: float = 0.5,
+        rrf_k: int = 60,
+    ):
+        """
+        Args:
+            path (str | Path): Folder of the saved catalogs
+            max_size (int): Maximum number of catalogs in memory. Default to `64`.
+            query_cache_size (int): Maximum number of cached search results per catalog. Default to `1024`.
+            embed_products (bool): Embed the products of the built catalogs. Default to `True`.
+            embedding_dim (Optional[int]): Number of leading embedding dimensions kept, all of them if `None`. Default to `None`.
+            fuzzy_weight (float): Weight of the fuzzy name ranking in the fusion. Default to `0.5`.
+            semantic_weight (float): Weight of the embedding ranking in the fusion. Default to `0.5`.
+            rrf_k (int): Smoothing constant of reciprocal rank fusion. Default to `60`.
+        """
+        self.path = Path(path)
+        self.embed_products = embed_products
+        self.embedding_dim = embedding_dim
+        self.catalog_kwargs = dict(
+            query_cache_size=query_cache_size,
+            fuzzy_weight=fuzzy_weight,
+            semantic_weight=semantic_weight,
+            rrf_k=rrf_k,
+        )
+        self.catalogs = LRUTTLCache(max_size=max_size)
+
+    @classmethod
+    def from_setting(cls, setting: GlobalSettings) -> "ProductCatalogCache":
+        return cls(
+            path=setting.product_catalog_config.path,
+            max_size=setting.product_catalog_config.max_size,
+            query_cache_size=setting.product_catalog_config.query_cache_size,
+            embed_products=setting.product_catalog_config.embed_products,
+            embedding_dim=setting.product_catalog_config.embedding_dim,
+            fuzzy_weight=setting.product_catalog_config.fuzzy_weight,
+            semantic_weight=setting.product_catalog_config.semantic_weight,
+            rrf_k=setting.contextual_rag_config.rrf_k,
+        )
+
+    def get_catalog_path(self, version: str) -> Path:
+        """
+        Get the local path of a catalog version
+
+        Args:
+            version (str): Catalog version, e.g. the storage object name of the product file
+
+        Returns:
+            Path: Catalog path, `.parquet`
+        """
+        return (
+            self.path / f"{hashlib.sha256(version.encode()).hexdigest()[:32]}.parquet"
+        )
+
+    @staticmethod
+    def get_catalog_object_name(object_name: str) -> str:
+        """
+        Get the storage object name of the catalog of a product file
+
+        Args:
+            object_name (str): Storage object name of the product file
+
+        Returns:
+            str: Storage object name of the catalog
+        """
+        return f"{object_name}.catalog.parquet"
+
+    def build(self, file_path: str | Path, version: str) -> Path:
+        """
+        Index a product file, embedding its products if enabled, and save its catalog
+
+        Args:
+            file_path (str | Path): Product file path, `.xlsx`
+            version (str): Catalog version
+
+        Returns:
+            Path: Catalog path
+        """
+        catalog_path = self.get_catalog_path(version)
+        catalog = ProductCatalog.from_excel(file_path, **self.catalog_kwargs)
+        if self.embed_products and len(catalog) > 0:
+            catalog.embed(embedding_dim=self.embedding_dim)
+
+        catalog.save(catalog_path)
+        self.catalogs.set(str(catalog_path), catalog)
+
+        logger.info(
+            "version: %s - indexed %s products, embedded: %s",
+            version,
+            len(catalog),
+            catalog.embeddings is not None,
+        )
+
+        return catalog_path
+
+    def get_catalog(self, file_path: str | Path) -> ProductCatalog:
+        """
+        Get the catalog of a path, loaded on a miss
+
+        Args:
+            file_path (str | Path): Catalog path, or product file path
+
+        Returns:
+            ProductCatalog: Product catalog
+        """
+        catalog = self.catalogs.get(str(file_path))
+
+        if catalog is None:
+            catalog = ProductCatalog.load(file_path, **self.catalog_kwargs)
+            self.catalogs.set(str(file_path), catalog)
+
+        return catalog
+
+
+product_catalog_cache = ProductCatalogCache.from_setting(default_settings)
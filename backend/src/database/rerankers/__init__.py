@@ -0,0 +1,9 @@
+from .cross_encoder import ONNXCrossEncoderRerank
+from .llm_rerank import RerankExecutor, ConcurrentLLMRerank, ConcurrentRankGPTRerank
+
+__all__ = [
+    "ONNXCrossEncoderRerank",
+    "RerankExecutor",
+    "ConcurrentLLMRerank",
+    "ConcurrentRankGPTRerank",
+]
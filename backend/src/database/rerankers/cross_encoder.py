@@ -0,0 +1,204 @@
+import sys
+import hashlib
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+import numpy as np
+from llama_index.core.bridge.pydantic import ConfigDict, Field, PrivateAttr
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+from src.utils import get_formatted_logger, LRUTTLCache
+
+logger = get_formatted_logger(__file__)
+
+
+class ONNXCrossEncoderRerank(BaseNodePostprocessor):
+    """
+    Rerank nodes on CPU with a cross-encoder exported to ONNX (see `scripts/export_cross_encoder_onnx.py`).
+
+    Reranker behavior:
+        - (query, chunk) pairs are sorted by length and scored in batches to minimize padding
+        - Scores are cached by hash of (query, chunk), so repeated questions skip the inference
+        - Only the `top_n` best nodes are returned, with the cross-encoder score
+
+    Args:
+        model_path (str): Folder with `model.onnx` and the tokenizer files
+        top_n (int): Number of nodes to return. Default to `3`.
+        batch_size (int): Number of pairs scored in one inference. Default to `32`.
+        num_threads (int): Number of CPU threads used by onnxruntime. Default to `4`.
+        max_length (int): Maximum number of tokens of a pair. Default to `512`.
+        cache_size (int): Number of cached scores. Default to `10000`.
+    """
+
+    model_config = ConfigDict(protected_namespaces=("pydantic_model_",))
+
+    model_path: str = Field(description="Folder of the ONNX cross-encoder.")
+    top_n: int = Field(default=3, description="Number of nodes to return.")
+    batch_size: int = Field(default=32, description="Pairs scored per inference.")
+    num_threads: int = Field(default=4, description="CPU threads of onnxruntime.")
+    max_length: int = Field(default=512, description="Max tokens of a pair.")
+    cache_size: int = Field(default=10000, description="Number of cached scores.")
+
+    _session: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+    _input_names: list[str] = PrivateAttr()
+    _cache: LRUTTLCache = PrivateAttr()
+
+    def __init__(
+        self,
+        model_path: str,
+        top_n: int = 3,
+        batch_size: int = 32,
+        num_threads: int = 4,
+        max_length: int = 512,
+        cache_size: int = 10000,
+    ):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ImportError(
+                "The cross_encoder_reranker needs the onnxruntime and transformers packages, "
+                "please `pip install -r requirements.txt -r requirements-cross-encoder.txt`"
+            )
+
+        if not (Path(model_path) / "model.onnx").exists():
+            raise FileNotFoundError(
+                f"No `model.onnx` in {model_path}, please export the cross-encoder with "
+                f"`python scripts/export_cross_encoder_onnx.py --output {model_path}`"
+            )
+
+        super().__init__(
+            model_path=model_path,
+            top_n=top_n,
+            batch_size=batch_size,
+            num_threads=num_threads,
+            max_length=max_length,
+            cache_size=cache_size,
+        )
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        session_options.inter_op_num_threads = 1
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+
+        self._session = ort.InferenceSession(
+            str(Path(model_path) / "model.onnx"),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = [node.name for node in self._session.get_inputs()]
+        self._tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self._cache = LRUTTLCache(max_size=cache_size)
+
+        logger.info("ONNXCrossEncoderRerank initialized successfully !!!")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ONNXCrossEncoderRerank"
+
+    @staticmethod
+    def get_cache_key(query: str, text: str) -> str:
+        return hashlib.sha1(f"{query}\x00{text}".encode("utf-8")).hexdigest()
+
+    def score_batch(self, query: str, texts: list[str]) -> np.ndarray:
+        """
+        Score a batch of (query, text) pairs
+
+        Args:
+            query (str): The query
+            texts (list[str]): The texts to score against the query
+
+        Returns:
+            np.ndarray: Relevance logits, one per text
+        """
+        inputs = self._tokenizer(
+            [query] * len(texts),
+            texts,
+            padding=True,
+            truncation="only_second",
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feed = {
+            name: inputs[name].astype(np.int64)
+            for name in self._input_names
+            if name in inputs
+        }
+
+        logits = self._session.run(None, feed)[0]
+
+        # Single logit models output the relevance, two logits models the (irrelevant, relevant) pair
+        return logits.reshape(len(texts), -1)[:, -1]
+
+    def score(self, query: str, texts: list[str]) -> list[float]:
+        """
+        Score the texts against the query, using the cache and batched inference
+
+        Args:
+            query (str): The query
+            texts (list[str]): The texts to score
+
+        Returns:
+            list[float]: Scores, one per text
+        """
+        keys = [self.get_cache_key(query, text) for text in texts]
+        scores: list[Optional[float]] = [self._cache.get(key) for key in keys]
+
+        missing = sorted(
+            (i for i, score in enumerate(scores) if score is None),
+            key=lambda i: len(texts[i]),
+        )
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            batch_scores = self.score_batch(query, [texts[i] for i in batch])
+
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self._cache.set(keys[i], scores[i])
+
+        return scores
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if len(nodes) == 0:
+            return []
+
+        with self.callback_manager.event(
+            CBEventType.RERANKING,
+            payload={
+                EventPayload.NODES: nodes,
+                EventPayload.MODEL_NAME: self.model_path,
+                EventPayload.QUERY_STR: query_bundle.query_str,
+                EventPayload.TOP_K: self.top_n,
+            },
+        ) as event:
+            scores = self.score(
+                query_bundle.query_str,
+                [
+                    node.node.get_content(metadata_mode=MetadataMode.NONE)
+                    for node in nodes
+                ],
+            )
+
+            for node, score in zip(nodes, scores):
+                node.score = score
+
+            new_nodes = sorted(nodes, key=lambda node: -node.score)[: self.top_n]
+            event.on_end(payload={EventPayload.NODES: new_nodes})
+
+        return new_nodes
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,402 @@
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+from llama_index.core.llms import LLM
+from llama_index.core.postprocessor import LLMRerank
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.postprocessor.rankgpt_rerank import RankGPTRerank
+
+from src.utils import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+
+class RerankExecutor:
+    """
+    Run the LLM calls of a reranker concurrently on a dedicated event loop, at most
+    `max_concurrency` at a time across all the queries served by the process.
+
+    The calls are coroutines cancelled at the deadline, so a timed out reranking frees its
+    concurrency slots at once instead of leaving the requests running.
+
+    Args:
+        max_concurrency (int): Maximum number of concurrent LLM calls
+        timeout (float): Time budget of one reranking in seconds
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 10.0):
+        assert max_concurrency > 0, "max_concurrency must be positive"
+
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self.loop.run_forever, name="llm_rerank", daemon=True
+        ).start()
+        self.fallbacks = 0
+
+    def get_deadline(self) -> float:
+        return time.monotonic() + self.timeout
+
+    @staticmethod
+    def get_call_timeout(deadline: float) -> float:
+        """
+        Time left before the deadline, passed to the LLM client as the request timeout
+        """
+        return max(deadline - time.monotonic(), 0.001)
+
+    async def run_call(self, fn: Callable[[Any], Awaitable], item: Any) -> Any:
+        async with self.semaphore:
+            return await fn(item)
+
+    async def gather(
+        self, fn: Callable[[Any], Awaitable], items: Sequence, deadline: float
+    ) -> list:
+        tasks = [asyncio.ensure_future(self.run_call(fn, item)) for item in items]
+        done, pending = await asyncio.wait(
+            tasks,
+            timeout=max(deadline - time.monotonic(), 0.0),
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+
+        if pending:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            # Propagate the error of a failed call rather than a timeout
+            for task in done:
+                task.result()
+
+            raise TimeoutError(f"{len(pending)}/{len(tasks)} LLM calls timed out")
+
+        return [task.result() for task in tasks]
+
+    def map(
+        self, fn: Callable[[Any], Awaitable], items: Sequence, deadline: float
+    ) -> list:
+        """
+        Await `fn` on every item concurrently, cancelling the calls still running at the deadline
+
+        Args:
+            fn (Callable[[Any], Awaitable]): Coroutine function called with one item
+            items (Sequence): Items, e.g. batches of nodes
+            deadline (float): `time.monotonic()` deadline of the reranking
+
+        Returns:
+            list: Results in the order of `items`
+
+        Raises:
+            TimeoutError: If the deadline is reached before all the calls end
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.gather(fn, items, deadline), self.loop
+        ).result()
+
+    def rerank_or_fallback(
+        self,
+        rerank_fn: Callable[[float], List[NodeWithScore]],
+        nodes: List[NodeWithScore],
+        top_n: int,
+    ) -> List[NodeWithScore]:
+        """
+        Rerank the nodes, falling back to their dense order on timeout or LLM error
+
+        Args:
+            rerank_fn (Callable[[float], List[NodeWithScore]]): Reranking function taking the deadline
+            nodes (List[NodeWithScore]): Nodes in dense order
+            top_n (int): Number of nodes to return
+
+        Returns:
+            List[NodeWithScore]: The `top_n` best nodes
+        """
+        try:
+            return rerank_fn(self.get_deadline())[:top_n]
+        except Exception as e:
+            self.fallbacks += 1
+            logger.warning(f"LLM reranking failed, keeping the dense order: {e}")
+            return nodes[:top_n]
+
+
+class ConcurrentLLMRerank(LLMRerank):
+    """
+    `LLMRerank` scoring the choice batches concurrently.
+
+    Reranker behavior:
+        - Batches of `choice_batch_size` nodes are scored by the LLM concurrently
+        - Nodes are sorted by LLM relevance, ties and unchosen nodes keep the dense order
+        - On timeout or LLM error the nodes keep the dense order
+
+    Args:
+        llm (LLM): The LLM to rerank with
+        top_n (int): Number of nodes to return. Default to `3`.
+        choice_batch_size (int): Number of nodes scored per LLM call. Default to `5`.
+        max_concurrency (int): Maximum number of concurrent LLM calls. Default to `8`.
+        timeout (float): Time budget of one reranking in seconds. Default to `10.0`.
+    """
+
+    max_concurrency: int = Field(default=8, description="Concurrent LLM calls.")
+    timeout: float = Field(default=10.0, description="Reranking time budget.")
+
+    _executor: RerankExecutor = PrivateAttr()
+
+    def __init__(
+        self,
+        llm: Optional[LLM] = None,
+        top_n: int = 3,
+        choice_batch_size: int = 5,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            llm=llm, top_n=top_n, choice_batch_size=choice_batch_size, **kwargs
+        )
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor = RerankExecutor(max_concurrency, timeout)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ConcurrentLLMRerank"
+
+    async def ascore_batch(
+        self, query_str: str, nodes_batch: list, deadline: float
+    ) -> list[tuple[int, float]]:
+        """
+        Score a batch of nodes with one LLM call
+
+        Args:
+            query_str (str): The query
+            nodes_batch (list): Nodes of the batch
+            deadline (float): `time.monotonic()` deadline of the reranking
+
+        Returns:
+            list[tuple[int, float]]: (index in the batch, relevance) of the chosen nodes
+        """
+        messages = self.choice_select_prompt.format_messages(
+            llm=self.llm,
+            context_str=self._format_node_batch_fn(nodes_batch),
+            query_str=query_str,
+        )
+        response = await self.llm.achat(
+            messages, timeout=RerankExecutor.get_call_timeout(deadline)
+        )
+        raw_response = response.message.content or ""
+        raw_choices, relevances = self._parse_choice_select_answer_fn(
+            raw_response, len(nodes_batch)
+        )
+        relevances = relevances or [1.0 for _ in raw_choices]
+
+        return [
+            (int(choice) - 1, relevance)
+            for choice, relevance in zip(raw_choices, relevances)
+            if 0 < int(choice) <= len(nodes_batch)
+        ]
+
+    def rerank(
+        self, nodes: List[NodeWithScore], query_str: str, deadline: float
+    ) -> List[NodeWithScore]:
+        batch_starts = range(0, len(nodes), self.choice_batch_size)
+        batches_scores = self._executor.map(
+            lambda start: self.ascore_batch(
+                query_str,
+                [node.node for node in nodes[start : start + self.choice_batch_size]],
+                deadline,
+            ),
+            batch_starts,
+            deadline,
+        )
+
+        relevance: dict[int, float] = {}
+        for start, batch_scores in zip(batch_starts, batches_scores):
+            for index, score in batch_scores:
+                relevance.setdefault(start + index, score)
+
+        # Deterministic merge: LLM relevance first, then dense rank
+        order = sorted(range(len(nodes)), key=lambda i: (-relevance.get(i, 0.0), i))
+
+        return [
+            NodeWithScore(node=nodes[i].node, score=relevance.get(i, 0.0))
+            for i in order
+        ]
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Query bundle must be provided.")
+        if len(nodes) == 0:
+            return []
+
+        return self._executor.rerank_or_fallback(
+            lambda deadline: self.rerank(nodes, query_bundle.query_str, deadline),
+            nodes,
+            self.top_n,
+        )
+
+
+class ConcurrentRankGPTRerank(RankGPTRerank):
+    """
+    `RankGPTRerank` ranking windows of nodes concurrently, tournament style.
+
+    Reranker behavior:
+        - Nodes are split in windows of `window_size` which are ranked by the LLM concurrently
+        - The `top_n` best nodes of every window are ranked again until they fit in one window
+        - Nodes eliminated in a window follow, ordered by their rank in the window then by window
+        - Scores are reciprocal ranks so that downstream consumers keep the reranked order
+        - On timeout or LLM error the nodes keep the dense order
+
+    Args:
+        llm (LLM): The LLM to rerank with
+        top_n (int): Number of nodes to return. Default to `3`.
+        window_size (int): Number of nodes ranked per LLM call. Default to `20`.
+        max_concurrency (int): Maximum number of concurrent LLM calls. Default to `8`.
+        timeout (float): Time budget of one reranking in seconds. Default to `10.0`.
+    """
+
+    window_size: int = Field(default=20, description="Nodes ranked per LLM call.")
+    max_concurrency: int = Field(default=8, description="Concurrent LLM calls.")
+    timeout: float = Field(default=10.0, description="Reranking time budget.")
+
+    _executor: RerankExecutor = PrivateAttr()
+
+    def __init__(
+        self,
+        llm: Optional[LLM] = None,
+        top_n: int = 3,
+        window_size: int = 20,
+        max_concurrency: int = 8,
+        timeout: float = 10.0,
+        **kwargs: Any,
+    ):
+        assert window_size > top_n, "window_size must be greater than top_n"
+
+        super().__init__(llm=llm, top_n=top_n, **kwargs)
+        self.window_size = window_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor = RerankExecutor(max_concurrency, timeout)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ConcurrentRankGPTRerank"
+
+    async def arank_window(
+        self, query_str: str, nodes: List[NodeWithScore], deadline: float
+    ) -> list[int]:
+        """
+        Rank a window of nodes with one LLM call
+
+        Args:
+            query_str (str): The query
+            nodes (List[NodeWithScore]): Nodes of the window
+            deadline (float): `time.monotonic()` deadline of the reranking
+
+        Returns:
+            list[int]: Permutation of the window indices, best first
+        """
+        item = {
+            "query": query_str,
+            "hits": [
+                {"content": node.get_content(metadata_mode=MetadataMode.EMBED)}
+                for node in nodes
+            ],
+        }
+        response = await self.llm.achat(
+            self.create_permutation_instruction(item),
+            timeout=RerankExecutor.get_call_timeout(deadline),
+        )
+
+        if response.message is None or response.message.content is None:
+            return list(range(len(nodes)))
+
+        return self._receive_permutation(item, str(response.message.content))
+
+    def rank(
+        self,
+        query_str: str,
+        indices: list[int],
+        nodes: List[NodeWithScore],
+        deadline: float,
+    ) -> list[int]:
+        """
+        Rank the nodes with a tournament of concurrent windows
+
+        Args:
+            query_str (str): The query
+            indices (list[int]): Indices of the nodes to rank, in dense order
+            nodes (List[NodeWithScore]): All the nodes
+            deadline (float): `time.monotonic()` deadline of the reranking
+
+        Returns:
+            list[int]: `indices` reordered, best first
+        """
+        windows = [
+            indices[start : start + self.window_size]
+            for start in range(0, len(indices), self.window_size)
+        ]
+        permutations = self._executor.map(
+            lambda window: self.arank_window(
+                query_str, [nodes[i] for i in window], deadline
+            ),
+            windows,
+            deadline,
+        )
+        ranked_windows = [
+            [window[i] for i in permutation]
+            for window, permutation in zip(windows, permutations)
+        ]
+
+        if len(ranked_windows) == 1:
+            return ranked_windows[0]
+
+        winners = [i for ranked in ranked_windows for i in ranked[: self.top_n]]
+        eliminated = sorted(
+            (
+                (rank, window_index, i)
+                for window_index, ranked in enumerate(ranked_windows)
+                for rank, i in enumerate(ranked)
+                if rank >= self.top_n
+            )
+        )
+
+        return self.rank(query_str, winners, nodes, deadline) + [
+            i for _, _, i in eliminated
+        ]
+
+    def rerank(
+        self, nodes: List[NodeWithScore], query_str: str, deadline: float
+    ) -> List[NodeWithScore]:
+        order = self.rank(query_str, list(range(len(nodes))), nodes, deadline)
+
+        return [
+            NodeWithScore(node=nodes[i].node, score=1.0 / (rank + 1))
+            for rank, i in enumerate(order)
+        ]
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Query bundle must be provided.")
+        if len(nodes) == 0:
+            return []
+
+        self._ensure_llm()
+
+        return self._executor.rerank_or_fallback(
+            lambda deadline: self.rerank(nodes, query_bundle.query_str, deadline),
+            nodes,
+            self.top_n,
+        )
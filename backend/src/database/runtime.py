@@ -0,0 +1,110 @@
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Type
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from .contextual_rag_manager import ContextualRAG
+from .core import BaseStorageClient, load_storage_service
+
+from src.utils import get_formatted_logger
+from src.settings import GlobalSettings, default_settings
+
+logger = get_formatted_logger(__file__)
+
+
+class RAGRuntime:
+    """
+    Process-wide holder of the warm clients (embedding model, LLM, splitter, reranker,
+    vector database and storage client), created once and shared by every request / task.
+    """
+
+    setting: GlobalSettings
+    contextual_rag: ContextualRAG
+    storage_client: Type[BaseStorageClient]
+
+    def __init__(self, setting: GlobalSettings):
+        """
+        Initialize the runtime
+
+        Args:
+            setting (GlobalSettings): Global settings
+        """
+        self.setting = setting
+
+        self.contextual_rag = ContextualRAG.from_setting(setting)
+        self.storage_client = load_storage_service(setting.storage_config.type)
+
+        logger.info("RAGRuntime initialized successfully !!!")
+
+
+_runtime: Optional[RAGRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def init_runtime(setting: GlobalSettings = default_settings) -> RAGRuntime:
+    """
+    Create the process-wide runtime. Call it once in the FastAPI lifespan and in the
+    Celery worker process init, calling it again returns the existing runtime.
+
+    Args:
+        setting (GlobalSettings): Global settings. Defaults to `default_settings`.
+
+    Returns:
+        RAGRuntime: The process-wide runtime
+    """
+    global _runtime
+
+    if _runtime is not None:
+        return _runtime
+
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = RAGRuntime(setting)
+
+    return _runtime
+
+
+def get_runtime(setting: GlobalSettings = default_settings) -> RAGRuntime:
+    """
+    Get the process-wide runtime, lazily created for scripts which did not call `init_runtime`.
+
+    Args:
+        setting (GlobalSettings): Global settings used if the runtime is not created yet. Defaults to `default_settings`.
+
+    Returns:
+        RAGRuntime: The process-wide runtime
+    """
+    if _runtime is None:
+        logger.warning("RAGRuntime is not initialized, initializing now ...")
+
+    return init_runtime(setting)
+
+
+def get_contextual_rag(setting: GlobalSettings = default_settings) -> ContextualRAG:
+    """
+    Get the shared ContextualRAG client
+
+    Args:
+        setting (GlobalSettings): Global settings. Defaults to `default_settings`.
+
+    Returns:
+        ContextualRAG: The shared ContextualRAG client
+    """
+    return get_runtime(setting).contextual_rag
+
+
+def get_storage_client(
+    setting: GlobalSettings = default_settings,
+) -> Type[BaseStorageClient]:
+    """
+    Get the shared storage client
+
+    Args:
+        setting (GlobalSettings): Global settings. Defaults to `default_settings`.
+
+    Returns:
+        Type[BaseStorageClient]: The shared storage client
+    """
+    return get_runtime(setting).storage_client
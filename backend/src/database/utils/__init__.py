@@ -1,4 +1,30 @@
-from .embedding import get_embedding
+from .embedding import (
+    get_embedding,
+    get_embeddings,
+    aget_embedding,
+    get_query_embedding,
+    aget_query_embedding,
+    load_embedding_model,
+    query_embedding_cache,
+)
+from .answer_cache import SemanticAnswerCache, answer_cache
+from .context_assembly import ContextAssembler, get_context_assembler
+from .rank_fusion import weighted_reciprocal_rank_fusion
 from .validators import validate_email, is_valid_uuid
 
-__all__ = ["validate_email", "get_embedding", "is_valid_uuid"]
+__all__ = [
+    "validate_email",
+    "get_embedding",
+    "get_embeddings",
+    "aget_embedding",
+    "get_query_embedding",
+    "aget_query_embedding",
+    "load_embedding_model",
+    "query_embedding_cache",
+    "SemanticAnswerCache",
+    "answer_cache",
+    "is_valid_uuid",
+    "weighted_reciprocal_rank_fusion",
+    "ContextAssembler",
+    "get_context_assembler",
+]
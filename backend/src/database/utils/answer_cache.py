@@ -0,0 +1,314 @@
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+from uuid import UUID
+from typing import Hashable, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+import redis
+import redis.asyncio
+import numpy as np
+
+from src.settings import default_settings
+from src.utils import get_formatted_logger, LRUTTLCache
+
+from .embedding import normalize_query
+
+logger = get_formatted_logger(__file__)
+
+
+class ScopeIndex:
+    """
+    Normalized query embeddings of the cached answers of one scope, one row per cache key.
+    A removed row is replaced by the last one, so that updates never copy the matrix.
+
+    Args:
+        dim (int): Dimension of the embeddings
+    """
+
+    def __init__(self, dim: int):
+        self.keys: list[Hashable] = []
+        self.rows: dict[Hashable, int] = {}
+        self.matrix = np.empty((8, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: Hashable, vector: np.ndarray):
+        row = self.rows.get(key)
+
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.matrix):
+                self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            self.rows[key] = row
+            self.keys.append(key)
+
+        self.matrix[row] = vector
+
+    def remove(self, key: Hashable):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+
+        last_key = self.keys.pop()
+        if last_key != key:
+            self.matrix[row] = self.matrix[len(self.keys)]
+            self.keys[row] = last_key
+            self.rows[last_key] = row
+
+    def search(self, vector: np.ndarray) -> tuple[Hashable, float]:
+        """
+        Get the key of the most similar cached query
+
+        Args:
+            vector (np.ndarray): Normalized query embedding
+
+        Returns:
+            tuple[Hashable, float]: Cache key and cosine similarity
+        """
+        similarities = self.matrix[: len(self.keys)] @ vector
+        best = int(np.argmax(similarities))
+
+        return self.keys[best], float(similarities[best])
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers looked up by query embedding similarity.
+
+    Answers are scoped by the knowledge bases searched, their versions, the system prompt and the LLM.
+    Processing or deleting a document bumps the version of its knowledge base, so the answers
+    generated from the previous content are never served again and age out of the LRU.
+    Versions are kept in Redis when configured so that Celery workers invalidate the API workers.
+    Every scope keeps the matrix of its query embeddings, so a lookup only scores the queries of its scope.
+
+    Args:
+        max_size (int): Maximum number of cached answers
+        ttl (int): Time to live of an answer in seconds
+        similarity_threshold (float): Minimum cosine similarity between queries to serve a cached answer
+        redis_url (str | None): Redis url of the knowledge base versions, `None` to keep them in process
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: int,
+        similarity_threshold: float,
+        redis_url: Optional[str] = None,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.entries = LRUTTLCache(max_size=max_size, ttl=ttl, on_evict=self._on_evict)
+        self.scopes: dict[str, ScopeIndex] = {}
+        self.lock = threading.RLock()
+
+        self.local_versions: dict[str, int] = {}
+        self.redis_client = redis.Redis.from_url(redis_url) if redis_url else None
+        self.async_redis_client = (
+            redis.asyncio.Redis.from_url(redis_url) if redis_url else None
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self.version_errors = 0
+
+    @staticmethod
+    def get_version_key(kb_id: str | UUID) -> str:
+        return f"answer_cache:kb_version:{kb_id}"
+
+    @staticmethod
+    def get_scope_key(
+        kb_versions: dict[str, int], system_prompt: str, model_name: str
+    ) -> str:
+        scope = json.dumps(
+            [sorted(kb_versions.items()), system_prompt, model_name],
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(scope.encode("utf-8")).hexdigest()
+
+    def _load_versions(
+        self, kb_ids: list[str], values: Optional[list[Optional[bytes]]]
+    ) -> dict[str, int]:
+        if values is None:
+            return {kb_id: self.local_versions.get(kb_id, 0) for kb_id in kb_ids}
+
+        return {kb_id: int(value or 0) for kb_id, value in zip(kb_ids, values)}
+
+    def get_scope(
+        self, kb_ids: list[str | UUID], system_prompt: str, model_name: str
+    ) -> Optional[str]:
+        """
+        Get the scope of the answers to a query over the knowledge bases
+
+        Args:
+            kb_ids (list[str | UUID]): Knowledge base IDs searched, parents included
+            system_prompt (str): System prompt of the answer
+            model_name (str): LLM answering
+
+        Returns:
+            Optional[str]: Scope key, `None` if the knowledge base versions are unavailable
+        """
+        kb_ids = sorted({str(kb_id) for kb_id in kb_ids})
+        values = None
+
+        if self.redis_client is not None:
+            try:
+                values = self.redis_client.mget(
+                    [self.get_version_key(kb_id) for kb_id in kb_ids]
+                )
+            except redis.RedisError as e:
+                self.version_errors += 1
+                logger.warning(f"Answer cache versions are unavailable: {e}")
+                return None
+
+        return self.get_scope_key(
+            self._load_versions(kb_ids, values), system_prompt, model_name
+        )
+
+    async def aget_scope(
+        self, kb_ids: list[str | UUID], system_prompt: str, model_name: str
+    ) -> Optional[str]:
+        """
+        Asynchronously get the scope of the answers to a query over the knowledge bases
+
+        Args:
+            kb_ids (list[str | UUID]): Knowledge base IDs searched, parents included
+            system_prompt (str): System prompt of the answer
+            model_name (str): LLM answering
+
+        Returns:
+            Optional[str]: Scope key, `None` if the knowledge base versions are unavailable
+        """
+        kb_ids = sorted({str(kb_id) for kb_id in kb_ids})
+        values = None
+
+        if self.async_redis_client is not None:
+            try:
+                values = await self.async_redis_client.mget(
+                    [self.get_version_key(kb_id) for kb_id in kb_ids]
+                )
+            except redis.RedisError as e:
+                self.version_errors += 1
+                logger.warning(f"Answer cache versions are unavailable: {e}")
+                return None
+
+        return self.get_scope_key(
+            self._load_versions(kb_ids, values), system_prompt, model_name
+        )
+
+    def lookup(self, scope: str, query_embedding: list[float]) -> Optional[str]:
+        """
+        Get the answer of the most similar cached query of the scope
+
+        Args:
+            scope (str): Scope key from `get_scope`
+            query_embedding (list[float]): Embedding of the query
+
+        Returns:
+            Optional[str]: The cached answer, `None` if no query is similar enough
+        """
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) + 1e-12
+
+        with self.lock:
+            index = self.scopes.get(scope)
+
+            while index is not None and len(index) > 0:
+                key, similarity = index.search(query_vector)
+                if similarity < self.similarity_threshold:
+                    break
+
+                # Refresh the recency of the served answer, without counting an LRU lookup
+                answer = self.entries.touch(key)
+                if answer is not None:
+                    self.hits += 1
+                    return answer
+
+                # Expired, search the remaining queries of the scope
+                self._on_evict(key, None)
+
+        self.misses += 1
+        return None
+
+    def store(self, scope: str, query: str, query_embedding: list[float], answer: str):
+        """
+        Cache the answer of a query
+
+        Args:
+            scope (str): Scope key from `get_scope`
+            query (str): The query
+            query_embedding (list[float]): Embedding of the query
+            answer (str): Generated answer
+        """
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) + 1e-12
+
+        query_hash = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        key = (scope, query_hash)
+
+        with self.lock:
+            self.entries.set(key, answer)
+
+            if scope not in self.scopes:
+                self.scopes[scope] = ScopeIndex(len(query_vector))
+            self.scopes[scope].add(key, query_vector)
+
+    def _on_evict(self, key: tuple[str, str], answer: Optional[str]):
+        with self.lock:
+            index = self.scopes.get(key[0])
+            if index is None:
+                return
+
+            index.remove(key)
+            if len(index) == 0:
+                del self.scopes[key[0]]
+
+    def invalidate(self, kb_id: str | UUID):
+        """
+        Invalidate the cached answers generated from a knowledge base
+
+        Args:
+            kb_id (str | UUID): Knowledge base ID whose content changed
+        """
+        kb_id = str(kb_id)
+        self.local_versions[kb_id] = self.local_versions.get(kb_id, 0) + 1
+
+        if self.redis_client is None:
+            return
+
+        try:
+            self.redis_client.incr(self.get_version_key(kb_id))
+        except redis.RedisError as e:
+            self.version_errors += 1
+            logger.error(f"Cannot invalidate the cached answers of {kb_id}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics
+
+        Returns:
+            dict: Size of the cache, semantic hits and misses
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self.entries),
+            "max_size": self.entries.max_size,
+            "ttl": self.entries.ttl,
+            "similarity_threshold": self.similarity_threshold,
+            "shared": self.redis_client is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_errors": self.version_errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    max_size=default_settings.answer_cache_config.max_size,
+    ttl=default_settings.answer_cache_config.ttl,
+    similarity_threshold=default_settings.answer_cache_config.similarity_threshold,
+    redis_url=default_settings.answer_cache_config.redis_url,
+)
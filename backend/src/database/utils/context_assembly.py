@@ -0,0 +1,287 @@
+import sys
+from pathlib import Path
+from functools import lru_cache
+from typing import Callable, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+import tiktoken
+import numpy as np
+from llama_index.core.schema import NodeWithScore
+
+from src.settings import ContextConfig
+from src.constants import ContextOrdering
+from src.utils import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+# Rough number of characters per token, used when the tokenizer cannot be loaded
+CHARACTERS_PER_TOKEN = 4
+
+# Tokens of the candidates of the selection, as a multiple of the token budget
+CANDIDATE_BUDGET_FACTOR = 2
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model_name: str) -> Callable[[str], int]:
+    """
+    Get a function counting the tokens of a text for the given model
+
+    Args:
+        model_name (str): LLM model name
+
+    Returns:
+        Callable[[str], int]: Token counter
+    """
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(
+            f"Cannot load the tokenizer of {model_name}, estimating tokens from characters: {e}"
+        )
+        return lambda text: len(text) // CHARACTERS_PER_TOKEN + 1
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def lost_in_the_middle_order(items: list) -> list:
+    """
+    Order items ranked best first so that the best ones are at both ends of the prompt,
+    where LLMs attend the most, and the weakest ones are in the middle.
+
+    Args:
+        items (list): Items ranked best first
+
+    Returns:
+        list: Reordered items, e.g. [1, 2, 3, 4, 5] -> [1, 3, 5, 4, 2]
+    """
+    return items[::2] + items[1::2][::-1]
+
+
+class ContextAssembler:
+    """
+    Select and order the retrieved chunks sent to the LLM:
+        - Near duplicate chunks (cosine similarity above `dedup_threshold`) are removed, the chunks
+          without embedding (e.g. BM25 hits missing from the vector database) are always kept
+        - Chunks are selected with maximal marginal relevance until the token budget of the model is spent
+        - Selected chunks are ordered for the LLM
+
+    Args:
+        token_budgets (dict[str, int]): Token budget of the contexts per LLM model, `default` key is used for unknown models
+        dedup_threshold (float): Cosine similarity above which two chunks are near duplicates
+        mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0)
+        ordering (ContextOrdering): Order of the selected chunks in the prompt
+        separator (str): Separator between chunks in the prompt
+    """
+
+    def __init__(
+        self,
+        token_budgets: dict[str, int],
+        dedup_threshold: float = 0.95,
+        mmr_lambda: float = 0.7,
+        ordering: ContextOrdering = ContextOrdering.LOST_IN_THE_MIDDLE,
+        separator: str = "\n\n",
+    ):
+        assert "default" in token_budgets, "token_budgets requires a `default` key"
+        assert 0.0 <= mmr_lambda <= 1.0, "mmr_lambda must be in [0, 1]"
+
+        self.token_budgets = token_budgets
+        self.dedup_threshold = dedup_threshold
+        self.mmr_lambda = mmr_lambda
+        self.ordering = ordering
+        self.separator = separator
+
+    def get_token_budget(self, model_name: str) -> int:
+        return self.token_budgets.get(model_name, self.token_budgets["default"])
+
+    @staticmethod
+    def get_similarity_matrix(
+        nodes: list[NodeWithScore],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the cosine similarity matrix between the node embeddings
+
+        Args:
+            nodes (list[NodeWithScore]): Nodes, possibly without embedding
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Similarity matrix (0 for nodes without embedding) and mask of nodes with embedding
+        """
+        has_vector = np.array([node.node.embedding is not None for node in nodes])
+        similarity = np.zeros((len(nodes), len(nodes)), dtype=np.float32)
+
+        if has_vector.sum() < 2:
+            return similarity, has_vector
+
+        indices = np.flatnonzero(has_vector)
+        vectors = np.asarray(
+            [nodes[i].node.embedding for i in indices], dtype=np.float32
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        similarity[np.ix_(indices, indices)] = vectors @ vectors.T
+
+        return similarity, has_vector
+
+    def remove_near_duplicates(self, similarity: np.ndarray) -> np.ndarray:
+        """
+        Greedily keep the best ranked node of each group of near duplicates
+
+        Args:
+            similarity (np.ndarray): Similarity matrix of nodes ranked best first
+
+        Returns:
+            np.ndarray: Indices of the kept nodes, best first
+        """
+        kept: list[int] = []
+
+        for i in range(len(similarity)):
+            if kept and similarity[i, kept].max() >= self.dedup_threshold:
+                continue
+            kept.append(i)
+
+        return np.asarray(kept, dtype=int)
+
+    def select_mmr(
+        self,
+        relevance: np.ndarray,
+        similarity: np.ndarray,
+        token_counts: np.ndarray,
+        budget: int,
+    ) -> list[int]:
+        """
+        Select nodes with maximal marginal relevance within the token budget
+
+        Args:
+            relevance (np.ndarray): Relevance of the nodes, normalized in [0, 1]
+            similarity (np.ndarray): Similarity matrix of the nodes
+            token_counts (np.ndarray): Number of tokens of each node (separator included)
+            budget (int): Token budget
+
+        Returns:
+            list[int]: Indices of the selected nodes, in selection order
+        """
+        selected: list[int] = []
+        available = token_counts <= budget
+        max_similarity = np.zeros(len(relevance), dtype=np.float32)
+
+        while available.any():
+            mmr = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * max_similarity
+            mmr[~available] = -np.inf
+
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            budget -= token_counts[best]
+
+            available[best] = False
+            available &= token_counts <= budget
+            max_similarity = np.maximum(max_similarity, similarity[:, best])
+
+        return selected
+
+    def get_candidates(
+        self, nodes: list[NodeWithScore], model_name: str
+    ) -> list[NodeWithScore]:
+        """
+        Shortlist the best ranked nodes worth selecting, up to `CANDIDATE_BUDGET_FACTOR` times the
+        token budget: only their vectors are needed for deduplication and MMR
+
+        Args:
+            nodes (list[NodeWithScore]): Retrieved nodes, ranked best first
+            model_name (str): LLM model name, used for the token budget and the tokenizer
+
+        Returns:
+            list[NodeWithScore]: Candidate nodes, ranked best first
+        """
+        count_tokens = get_token_counter(model_name)
+        budget = CANDIDATE_BUDGET_FACTOR * self.get_token_budget(model_name)
+
+        candidates: list[NodeWithScore] = []
+        for node in nodes:
+            budget -= count_tokens(node.node.text)
+            if budget < 0 and candidates:
+                break
+            candidates.append(node)
+
+        return candidates
+
+    def assemble(self, nodes: list[NodeWithScore], model_name: str) -> list[str]:
+        """
+        Select and order the contexts to send to the LLM
+
+        Args:
+            nodes (list[NodeWithScore]): Retrieved nodes, ranked best first
+            model_name (str): LLM model name, used for the token budget and the tokenizer
+
+        Returns:
+            list[str]: Contexts to join in the prompt
+        """
+        if not nodes:
+            return []
+
+        count_tokens = get_token_counter(model_name)
+        budget = self.get_token_budget(model_name)
+        separator_tokens = count_tokens(self.separator)
+
+        similarity, has_vector = self.get_similarity_matrix(nodes)
+
+        kept = (
+            self.remove_near_duplicates(similarity)
+            if has_vector.any()
+            else np.arange(len(nodes))
+        )
+        similarity = similarity[np.ix_(kept, kept)]
+        nodes = [nodes[i] for i in kept]
+
+        scores = np.asarray([node.score or 0.0 for node in nodes], dtype=np.float32)
+        score_range = scores.max() - scores.min()
+        relevance = (
+            (scores - scores.min()) / score_range
+            if score_range > 0
+            else np.ones_like(scores)
+        )
+
+        token_counts = np.asarray(
+            [count_tokens(node.node.text) + separator_tokens for node in nodes]
+        )
+
+        selected = self.select_mmr(relevance, similarity, token_counts, budget)
+        # Rank the selected chunks by relevance before ordering them in the prompt
+        selected.sort(key=lambda i: -relevance[i])
+
+        if self.ordering == ContextOrdering.LOST_IN_THE_MIDDLE:
+            selected = lost_in_the_middle_order(selected)
+
+        logger.debug(
+            "retrieved: %s - deduplicated: %s - selected: %s - tokens: %s/%s",
+            len(has_vector),
+            len(nodes),
+            len(selected),
+            int(token_counts[selected].sum()) if selected else 0,
+            budget,
+        )
+
+        return [nodes[i].node.text for i in selected]
+
+
+def get_context_assembler(config: ContextConfig) -> Optional[ContextAssembler]:
+    """
+    Create the context assembler from the settings, `None` if disabled
+
+    Args:
+        config (ContextConfig): Context assembly configuration
+
+    Returns:
+        Optional[ContextAssembler]: The context assembler
+    """
+    if not config.enabled:
+        return None
+
+    return ContextAssembler(
+        token_budgets=config.token_budgets,
+        dedup_threshold=config.dedup_threshold,
+        mmr_lambda=config.mmr_lambda,
+        ordering=config.ordering,
+    )
@@ -1,12 +1,41 @@
 import sys
+import hashlib
+import unicodedata
 from pathlib import Path
+from functools import lru_cache
+from typing import Optional
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
+import redis
+import redis.asyncio
+import numpy as np
 from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from langfuse.decorators import observe, langfuse_context
 
 from src.constants import EmbeddingService
 from src.settings import default_settings
+from src.utils import get_formatted_logger, LRUTTLCache
+
+logger = get_formatted_logger(__file__)
+
+
+@lru_cache(maxsize=None)
+def load_embedding_model(service: EmbeddingService, model_name: str) -> BaseEmbedding:
+    """
+    Load the embedding model once per (service, model) and reuse its HTTP client
+
+    Args:
+        service (EmbeddingService): The service to use for the embedding
+        model_name (str): Embedding model
+
+    Returns:
+        BaseEmbedding: The embedding model
+    """
+    if service == EmbeddingService.OPENAI:
+        return OpenAIEmbedding(model=model_name)
+    else:
+        raise ValueError(f"Unsupported embedding service: {service}")
 
 
 @observe(capture_input=False, as_type="generation")
@@ -28,9 +57,281 @@ def get_embedding(
     langfuse_context.update_current_observation(
         input=chunk,
     )
-    if service == EmbeddingService.OPENAI:
-        model = OpenAIEmbedding(model=model_name)
-    else:
-        raise ValueError(f"Unsupported embedding service: {service}")
+    model = load_embedding_model(service, model_name)
 
     return model.get_text_embedding(chunk)
+
+
+@observe(capture_input=False, as_type="generation")
+def get_embeddings(
+    chunks: list[str],
+    service: EmbeddingService = default_settings.embedding_config.service,
+    model_name: str = default_settings.embedding_config.name,
+) -> list[list[float]]:
+    """
+    Get the embeddings of text chunks in batched requests using the specified service
+
+    Args:
+        chunks (list[str]): Text chunks to get the embeddings for
+        service (EmbeddingService): The service to use for the embedding
+        model_name (str): Embedding model
+    Returns:
+        list[list[float]]: The embeddings of the text chunks, in order
+    """
+    langfuse_context.update_current_observation(
+        input=f"{len(chunks)} chunks",
+    )
+    model = load_embedding_model(service, model_name)
+
+    return model.get_text_embedding_batch(chunks)
+
+
+@observe(capture_input=False, as_type="generation")
+async def aget_embedding(
+    chunk: str,
+    service: EmbeddingService = default_settings.embedding_config.service,
+    model_name: str = default_settings.embedding_config.name,
+) -> list[float]:
+    """
+    Asynchronously get the embedding of the text chunk using the specified service
+
+    Args:
+        chunk (str): Text chunk to get the embedding for
+        service (EmbeddingService): The service to use for the embedding
+        model_name (str): Embedding model
+    Returns:
+        list[float]: The embedding of the text chunk
+    """
+    langfuse_context.update_current_observation(
+        input=chunk,
+    )
+    model = load_embedding_model(service, model_name)
+
+    return await model.aget_text_embedding(chunk)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so that trivially different spellings share a cache entry
+
+    Args:
+        query (str): The query
+
+    Returns:
+        str: NFKC normalized, lowercased query with collapsed whitespaces
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    LRU + TTL cache of query embeddings, keyed by embedding model and normalized query.
+    Optionally backed by Redis so that entries are shared across uvicorn workers.
+
+    Args:
+        max_size (int): Maximum number of embeddings kept in process
+        ttl (int): Time to live of an embedding in seconds
+        redis_url (str | None): Redis url of the shared cache, `None` to only cache in process
+    """
+
+    def __init__(self, max_size: int, ttl: int, redis_url: Optional[str] = None):
+        self.ttl = ttl
+        self.local_cache = LRUTTLCache(max_size=max_size, ttl=ttl)
+
+        self.redis_client = redis.Redis.from_url(redis_url) if redis_url else None
+        self.async_redis_client = (
+            redis.asyncio.Redis.from_url(redis_url) if redis_url else None
+        )
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def get_key(model_name: str, query: str) -> str:
+        digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        return f"query_embedding:{model_name}:{digest}"
+
+    def get(self, key: str) -> Optional[list[float]]:
+        """
+        Get the cached embedding, looking in process first then in Redis
+
+        Args:
+            key (str): Cache key from `get_key`
+
+        Returns:
+            Optional[list[float]]: The embedding or `None` on miss
+        """
+        embedding = self.local_cache.get(key)
+        if embedding is not None or self.redis_client is None:
+            return embedding
+
+        try:
+            value = self.redis_client.get(key)
+        except redis.RedisError as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared embedding cache is unavailable: {e}")
+            return None
+
+        return self._load_shared_value(key, value)
+
+    async def aget(self, key: str) -> Optional[list[float]]:
+        """
+        Asynchronously get the cached embedding, looking in process first then in Redis
+
+        Args:
+            key (str): Cache key from `get_key`
+
+        Returns:
+            Optional[list[float]]: The embedding or `None` on miss
+        """
+        embedding = self.local_cache.get(key)
+        if embedding is not None or self.async_redis_client is None:
+            return embedding
+
+        try:
+            value = await self.async_redis_client.get(key)
+        except redis.RedisError as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared embedding cache is unavailable: {e}")
+            return None
+
+        return self._load_shared_value(key, value)
+
+    def _load_shared_value(
+        self, key: str, value: Optional[bytes]
+    ) -> Optional[list[float]]:
+        if value is None:
+            return None
+
+        self.shared_hits += 1
+        embedding = np.frombuffer(value, dtype=np.float32).tolist()
+        self.local_cache.set(key, embedding)
+
+        return embedding
+
+    def set(self, key: str, embedding: list[float]):
+        """
+        Cache the embedding in process and in Redis
+
+        Args:
+            key (str): Cache key from `get_key`
+            embedding (list[float]): The embedding
+        """
+        self.local_cache.set(key, embedding)
+
+        if self.redis_client is None:
+            return
+
+        try:
+            self.redis_client.set(
+                key, np.asarray(embedding, dtype=np.float32).tobytes(), ex=self.ttl
+            )
+        except redis.RedisError as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared embedding cache is unavailable: {e}")
+
+    async def aset(self, key: str, embedding: list[float]):
+        """
+        Asynchronously cache the embedding in process and in Redis
+
+        Args:
+            key (str): Cache key from `get_key`
+            embedding (list[float]): The embedding
+        """
+        self.local_cache.set(key, embedding)
+
+        if self.async_redis_client is None:
+            return
+
+        try:
+            await self.async_redis_client.set(
+                key, np.asarray(embedding, dtype=np.float32).tobytes(), ex=self.ttl
+            )
+        except redis.RedisError as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared embedding cache is unavailable: {e}")
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics
+
+        Returns:
+            dict: Statistics of the in-process cache and the shared cache
+        """
+        stats = self.local_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+
+        stats.update(
+            shared=self.redis_client is not None,
+            shared_hits=self.shared_hits,
+            shared_errors=self.shared_errors,
+            total_hit_rate=(stats["hits"] + self.shared_hits) / lookups
+            if lookups
+            else 0.0,
+        )
+
+        return stats
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=default_settings.embedding_cache_config.max_size,
+    ttl=default_settings.embedding_cache_config.ttl,
+    redis_url=default_settings.embedding_cache_config.redis_url,
+)
+
+
+def get_query_embedding(
+    query: str,
+    service: EmbeddingService = default_settings.embedding_config.service,
+    model_name: str = default_settings.embedding_config.name,
+) -> list[float]:
+    """
+    Get the embedding of a search query, served from the query embedding cache when possible
+
+    Args:
+        query (str): The query to get the embedding for
+        service (EmbeddingService): The service to use for the embedding
+        model_name (str): Embedding model
+
+    Returns:
+        list[float]: The embedding of the query
+    """
+    if not default_settings.embedding_cache_config.enabled:
+        return get_embedding(query, service=service, model_name=model_name)
+
+    key = query_embedding_cache.get_key(model_name, query)
+
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = get_embedding(query, service=service, model_name=model_name)
+        query_embedding_cache.set(key, embedding)
+
+    return embedding
+
+
+async def aget_query_embedding(
+    query: str,
+    service: EmbeddingService = default_settings.embedding_config.service,
+    model_name: str = default_settings.embedding_config.name,
+) -> list[float]:
+    """
+    Asynchronously get the embedding of a search query, served from the query embedding cache when possible
+
+    Args:
+        query (str): The query to get the embedding for
+        service (EmbeddingService): The service to use for the embedding
+        model_name (str): Embedding model
+
+    Returns:
+        list[float]: The embedding of the query
+    """
+    if not default_settings.embedding_cache_config.enabled:
+        return await aget_embedding(query, service=service, model_name=model_name)
+
+    key = query_embedding_cache.get_key(model_name, query)
+
+    embedding = await query_embedding_cache.aget(key)
+    if embedding is None:
+        embedding = await aget_embedding(query, service=service, model_name=model_name)
+        await query_embedding_cache.aset(key, embedding)
+
+    return embedding
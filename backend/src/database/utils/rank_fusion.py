@@ -0,0 +1,42 @@
+from typing import Hashable, Sequence
+
+
+def weighted_reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Hashable]],
+    weights: Sequence[float],
+    k: int = 60,
+    top_n: int | None = None,
+) -> list[tuple[Hashable, float]]:
+    """
+    Fuse several ranked lists with weighted reciprocal rank fusion:
+    `score(d) = sum_i weight_i / (k + rank_i(d))`, ranks starting from 1.
+
+    Args:
+        ranked_lists (Sequence[Sequence[Hashable]]): Ranked IDs from each retriever, best first
+        weights (Sequence[float]): Weight of each retriever
+        k (int): Smoothing constant, higher values flatten the contribution of top ranks. Default to `60`.
+        top_n (int | None): Number of fused IDs to return, all of them if `None`. Default to `None`.
+
+    Returns:
+        list[tuple[Hashable, float]]: Fused IDs and scores, best first. Ties keep the first seen order.
+    """
+    assert len(ranked_lists) == len(
+        weights
+    ), "ranked_lists and weights must have the same length"
+
+    scores: dict[Hashable, float] = {}
+
+    for ranked_ids, weight in zip(ranked_lists, weights):
+        seen = set()
+        for rank, item_id in enumerate(ranked_ids, start=1):
+            # Only the best rank of an ID inside one list counts
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+
+            scores[item_id] = scores.get(item_id, 0.0) + weight / (k + rank)
+
+    # `sorted` is stable, so ties keep the insertion (first seen) order
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    return fused[:top_n] if top_n is not None else fused
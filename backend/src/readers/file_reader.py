@@ -1,14 +1,16 @@
 # This file contains the core function to parse documents from multiple files.
 
 import sys
-from typing import Any
+from typing import Any, Iterator
 from pathlib import Path
+from itertools import islice
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from dotenv import load_dotenv
 from llama_index.core import Document
 from llama_index.core import SimpleDirectoryReader
+from llama_index.core.readers.file.base import default_file_metadata_func
 from .utils import get_files_from_folder_or_file_paths
 
 from src.utils import get_formatted_logger
@@ -48,3 +50,52 @@ def parse_multiple_files(
     ).load_data(show_progress=True)
 
     return documents
+
+
+def iter_document_batches(
+    files_or_folder: list[str] | str, extractor: dict[str, Any], batch_size: int
+) -> Iterator[list[Document]]:
+    """
+    Read the content of multiple files lazily, in batches of documents.
+
+    The files whose reader implements `lazy_load_data` (e.g. `StreamingJSONReader`) are streamed,
+    so only one batch of their documents is in memory at once. The other files are loaded whole.
+
+    Args:
+        files_or_folder (list[str] | str): List of file paths or folder paths containing files.
+        extractor (dict[str, Any]): Extractor to extract content from files.
+        batch_size (int): Maximum number of documents per batch.
+    Returns:
+        Iterator[list[Document]]: Batches of documents from all files.
+    """
+    assert extractor, "Extractor is required."
+    assert batch_size > 0, "batch_size must be positive"
+
+    if isinstance(files_or_folder, str):
+        files_or_folder = [files_or_folder]
+
+    valid_files = get_files_from_folder_or_file_paths(files_or_folder)
+
+    if len(valid_files) == 0:
+        raise ValueError("No valid files found.")
+
+    logger.info(f"Valid files: {valid_files}")
+
+    for file in valid_files:
+        reader = extractor.get(Path(file).suffix)
+
+        try:
+            documents = reader.lazy_load_data(
+                Path(file), extra_info=default_file_metadata_func(str(file))
+            )
+        except (AttributeError, NotImplementedError):
+            # No reader for the extension, or a reader without lazy loading
+            documents = iter(
+                SimpleDirectoryReader(
+                    input_files=[file],
+                    file_extractor=extractor,
+                ).load_data()
+            )
+
+        while batch := list(islice(documents, batch_size)):
+            yield batch
@@ -6,6 +6,9 @@ from .loaders import (
     ExcelReader,
     TxtReader,
     MhtmlReader,
+    FastHtmlReader,
+    FastMhtmlReader,
+    StreamingJSONReader,
     PDFReader,
 )
 
@@ -15,6 +18,9 @@ __all__ = [
     "TxtReader",
     "HtmlReader",
     "MhtmlReader",
+    "FastHtmlReader",
+    "FastMhtmlReader",
+    "StreamingJSONReader",
     "DocxReader",
     "PDFReader",
     "PDFThumbnailReader",
@@ -1,6 +1,7 @@
 from .txt_loader import TxtReader
 from .docx_loader import DocxReader
-from .html_loader import HtmlReader, MhtmlReader
+from .html_loader import HtmlReader, MhtmlReader, FastHtmlReader, FastMhtmlReader
+from .json_loader import StreamingJSONReader
 from .pdf_loader import PDFReader, PDFThumbnailReader
 from .excel_loader import PandasExcelReader, ExcelReader
 
@@ -8,6 +9,9 @@ __all__ = [
     "TxtReader",
     "HtmlReader",
     "MhtmlReader",
+    "FastHtmlReader",
+    "FastMhtmlReader",
+    "StreamingJSONReader",
     "DocxReader",
     "PDFReader",
     "PDFThumbnailReader",
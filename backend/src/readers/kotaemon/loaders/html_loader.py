@@ -1,3 +1,4 @@
+import re
 import sys
 import email
 from pathlib import Path
@@ -162,3 +163,261 @@ class MhtmlReader(BaseReader):
                 f.write(page[0])
 
         return [Document(text="\n\n".join(page), metadata=metadata)]
+
+
+BOILERPLATE_TAGS = (
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+    "button",
+    "nav",
+    "footer",
+    "aside",
+)
+
+# Content roots: their headers hold titles and bylines, not the site banner
+CONTENT_TAGS = ("article", "main")
+
+BOILERPLATE_ROLES = ("navigation", "banner", "contentinfo", "complementary", "search")
+
+BOILERPLATE_CLASS_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|sidebar|footer|header|cookies?|"
+    r"banner|social|pagination|skip-link)([\s_-]|$)",
+    re.IGNORECASE,
+)
+
+BLOCK_TAGS = (
+    "p",
+    "div",
+    "section",
+    "article",
+    "main",
+    "li",
+    "ul",
+    "ol",
+    "dl",
+    "dt",
+    "dd",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "pre",
+    "blockquote",
+    "table",
+    "tr",
+    "br",
+    "hr",
+    "figure",
+    "figcaption",
+)
+
+
+def is_inside_content(element) -> bool:
+    """
+    Whether an element is in an `<article>` or `<main>`, where headers are part of the content
+    """
+    return any(ancestor.tag in CONTENT_TAGS for ancestor in element.iterancestors())
+
+
+def lxml_html_to_text(
+    html: str | bytes, strip_boilerplate: bool = True
+) -> tuple[str, str]:
+    """
+    Extract the readable text and the title from an HTML string using lxml.
+
+    Args:
+        html (str | bytes): Raw HTML content
+        strip_boilerplate (bool): Remove navigation, site header, footer, scripts, ... Default to `True`.
+
+    Returns:
+        tuple[str, str]: The extracted text (one block per line) and the page title.
+    """
+    import lxml.html
+    from lxml import etree
+
+    try:
+        root = lxml.html.fromstring(html)
+    except etree.ParserError:
+        # Empty or whitespace-only document
+        return "", ""
+
+    title_element = root.find(".//title")
+    title = title_element.text_content().strip() if title_element is not None else ""
+
+    etree.strip_elements(root, etree.Comment, with_tail=False)
+
+    if strip_boilerplate:
+        etree.strip_elements(root, "title", *BOILERPLATE_TAGS, with_tail=False)
+
+        for element in list(root.iter(etree.Element)):
+            if element.getparent() is None:
+                continue
+            if element.tag == "header":
+                # Site banner, unlike the headers of the articles
+                if not is_inside_content(element):
+                    element.drop_tree()
+                continue
+            role = element.get("role", "")
+            class_and_id = f"{element.get('class', '')} {element.get('id', '')}"
+            if role in BOILERPLATE_ROLES or BOILERPLATE_CLASS_PATTERN.search(
+                class_and_id
+            ):
+                element.drop_tree()
+    else:
+        etree.strip_elements(
+            root, "title", "script", "style", "noscript", "template", with_tail=False
+        )
+
+    # Keep block boundaries and table cells apart once the tree is flattened
+    for element in root.iter(*BLOCK_TAGS):
+        element.tail = "\n" + (element.tail or "")
+    for element in root.iter("td", "th"):
+        element.tail = " | " + (element.tail or "")
+
+    lines = (" ".join(line.split()) for line in root.text_content().splitlines())
+    text = "\n".join(line for line in lines if line)
+
+    return text, title
+
+
+class FastHtmlReader(HtmlReader):
+    """Reader HTML using lxml, much faster than `UnstructuredReader`
+
+    Reader behavior:
+        - HTML is parsed with lxml, boilerplate (scripts, navigation, site header, footer, ...) is stripped
+        - All of the texts will be split by `page_break_pattern`
+        - Each page is extracted as a Document
+        - The output is a list of Documents
+
+    Args:
+        page_break_pattern (str): Pattern to split the HTML into pages
+        strip_boilerplate (bool): Remove boilerplate elements before extracting text. Default to `True`.
+    """
+
+    def __init__(
+        self,
+        page_break_pattern: Optional[str] = None,
+        strip_boilerplate: bool = True,
+        *args,
+        **kwargs,
+    ):
+        try:
+            import lxml.html  # noqa
+        except ImportError:
+            raise ImportError(
+                "lxml is not installed. " "Please install it using `pip install lxml`"
+            )
+
+        self._page_break_pattern: Optional[str] = page_break_pattern
+        self._strip_boilerplate = strip_boilerplate
+
+    def load_data(
+        self, file_path: Path | str, extra_info: Optional[dict] = None, **kwargs
+    ) -> list[Document]:
+        """Load data using lxml
+
+        Args:
+            file_path: path to HTML file
+            extra_info: extra information passed to this reader during extracting data
+
+        Returns:
+            list[Document]: list of documents extracted from the HTML file
+        """
+        file_path = Path(file_path).resolve()
+
+        # Let lxml detect the encoding from the <meta> tag
+        all_text, title = lxml_html_to_text(
+            file_path.read_bytes(), strip_boilerplate=self._strip_boilerplate
+        )
+
+        pages = (
+            all_text.split(self._page_break_pattern)
+            if self._page_break_pattern
+            else [all_text]
+        )
+
+        extra_info = extra_info or {}
+
+        return [
+            Document(
+                text=page.strip(),
+                metadata={"page_label": page_id + 1, "title": title, **extra_info},
+            )
+            for page_id, page in enumerate(pages)
+            if page.strip()
+        ]
+
+
+class FastMhtmlReader(MhtmlReader):
+    """Parse `MHTML` files with lxml, stripping boilerplate from each HTML part.
+
+    Args:
+        page_break_pattern (str): Pattern to split the HTML into pages
+        strip_boilerplate (bool): Remove boilerplate elements before extracting text. Default to `True`.
+    """
+
+    def __init__(
+        self,
+        page_break_pattern: Optional[str] = None,
+        strip_boilerplate: bool = True,
+    ) -> None:
+        try:
+            import lxml.html  # noqa
+        except ImportError:
+            raise ImportError(
+                "lxml is not installed. " "Please install it using `pip install lxml`"
+            )
+
+        self._page_break_pattern: Optional[str] = page_break_pattern
+        self._strip_boilerplate = strip_boilerplate
+
+    def load_data(
+        self, file_path: Path | str, extra_info: Optional[dict] = None, **kwargs
+    ) -> list[Document]:
+        """Load MHTML document into document objects."""
+        extra_info = extra_info or {}
+
+        with open(file_path, "rb") as f:
+            message = email.message_from_binary_file(f)
+
+        texts = []
+        title = ""
+        for part in message.walk():
+            if part.get_content_type() != "text/html":
+                continue
+
+            text, part_title = lxml_html_to_text(
+                part.get_payload(decode=True),
+                strip_boilerplate=self._strip_boilerplate,
+            )
+            title = title or part_title
+            if text:
+                texts.append(text)
+
+        all_text = "\n\n".join(texts)
+        pages = (
+            all_text.split(self._page_break_pattern)
+            if self._page_break_pattern
+            else [all_text]
+        )
+
+        return [
+            Document(
+                text=page.strip(),
+                metadata={
+                    "source": str(file_path),
+                    "title": title,
+                    "page_label": page_id + 1,
+                    **extra_info,
+                },
+            )
+            for page_id, page in enumerate(pages)
+            if page.strip()
+        ]
@@ -0,0 +1,286 @@
+import sys
+import json
+from pathlib import Path
+from collections import defaultdict
+from typing import IO, Any, Iterator, Optional
+
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+
+from llama_index.core.readers.base import BaseReader
+
+from src.readers.kotaemon.base import Document
+
+NUMBER_CHARACTERS = "0123456789+-.eE"
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+
+# First item of an empty array
+_EMPTY = object()
+
+
+class JSONStream:
+    """
+    Incremental decoder of the JSON values of a file, reading `chunk_size` characters at once.
+
+    Args:
+        f (IO[str]): Opened file
+        file_path (Path | str): Path to the file, for the error messages
+        chunk_size (int): Number of characters read from the file at once
+    """
+
+    def __init__(self, f: IO[str], file_path: Path | str, chunk_size: int):
+        self.f = f
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Skip whitespace and return the next character, `None` at EOF."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position].isspace()
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof or not self.fill():
+                return None
+
+    def expect(self, characters: str) -> str:
+        """Consume the next character, one of `characters`."""
+        character = self.peek()
+        if character is None or character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} in {self.file_path}, got: {character!r}"
+            )
+        self.position += 1
+        return character
+
+    def decode(self) -> Any:
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # The value is cut by the end of the buffer, read more
+                if self.eof or not self.fill():
+                    raise
+                continue
+
+            # A number may be cut by the end of the buffer as well
+            cut_number = isinstance(value, (int, float)) and (
+                end == len(self.buffer) or self.buffer[end] in NUMBER_CHARACTERS
+            )
+            if cut_number and not self.eof and self.fill():
+                continue
+
+            self.position = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """Decode the items of an array, its `[` already consumed."""
+        if self.peek() == "]":
+            self.position += 1
+            return
+
+        while True:
+            yield self.decode()
+            if self.expect(",]") == "]":
+                return
+
+    def iter_object_records(self) -> Iterator[Any]:
+        """
+        Decode a wrapper object, its `{` already consumed: the items of its arrays of objects (or
+        arrays) are records, its other members are gathered into one last record.
+        """
+        members: dict[str, Any] = {}
+        streamed = False
+
+        if self.peek() == "}":
+            self.position += 1
+            yield members
+            return
+
+        while True:
+            key = self.decode()
+            self.expect(":")
+
+            if self.peek() == "[":
+                self.position += 1
+                items = self.iter_array()
+                first = next(items, _EMPTY)
+
+                if isinstance(first, (dict, list)):
+                    streamed = True
+                    yield first
+                    yield from items
+                else:
+                    # Always drain the array: `null` is a valid first item
+                    members[key] = [] if first is _EMPTY else [first, *items]
+            else:
+                members[key] = self.decode()
+
+            if self.expect(",}") == "}":
+                break
+
+        if members or not streamed:
+            yield members
+
+
+class StreamingJSONReader(BaseReader):
+    """Read large JSON / JSON Lines files record by record
+
+    Reader behavior:
+        - A top-level array is streamed element by element, without loading the whole file
+        - A top-level object, e.g. `{"data": [...]}`, streams the items of its arrays of objects,
+          its other members are one more record
+        - JSON Lines (or concatenated JSON values) are streamed value by value
+        - Any other top-level value is emitted as a single record
+        - Every `records_per_document` records are rendered with `record_template` and joined into one Document
+        - The output is a list of Documents (use `lazy_load_data` to keep memory bounded)
+
+    Args:
+        records_per_document (int): Number of records grouped into one Document. Default to `20`.
+        record_template (str | None): `str.format` template applied to dict records, e.g. `"{title}: {body}"`.
+            Missing keys are rendered as empty strings. Default to `None` (dump the record as JSON).
+        record_separator (str): Separator between records inside one Document. Default to `"\\n\\n"`.
+        chunk_size (int): Number of characters read from the file at once. Default to `1MB`.
+        encoding (str): File encoding. Default to `utf-8`.
+    """
+
+    def __init__(
+        self,
+        records_per_document: int = 20,
+        record_template: Optional[str] = None,
+        record_separator: str = "\n\n",
+        chunk_size: int = 1024 * 1024,
+        encoding: str = "utf-8",
+        *args,
+        **kwargs,
+    ):
+        assert records_per_document > 0, "records_per_document must be positive"
+
+        self.records_per_document = records_per_document
+        self.record_template = record_template
+        self.record_separator = record_separator
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+
+    def iter_records(self, file_path: Path | str) -> Iterator[Any]:
+        """
+        Stream the records from a JSON or JSON Lines file.
+
+        Args:
+            file_path (Path | str): Path to the file
+
+        Returns:
+            Iterator[Any]: Decoded records, one by one
+        """
+        is_json_lines = Path(file_path).suffix in JSON_LINES_SUFFIXES
+
+        with open(file_path, "r", encoding=self.encoding) as f:
+            stream = JSONStream(f, file_path, self.chunk_size)
+
+            first = stream.peek()
+            if first is None:
+                return
+
+            if first == "[":
+                stream.position += 1
+                yield from stream.iter_array()
+                return
+
+            if first == "{" and not is_json_lines:
+                stream.position += 1
+                yield from stream.iter_object_records()
+
+            while stream.peek() is not None:
+                yield stream.decode()
+
+    def render_record(self, record: Any) -> str:
+        """
+        Render one record to text.
+
+        Args:
+            record (Any): Decoded JSON record
+
+        Returns:
+            str: Text of the record
+        """
+        if self.record_template and isinstance(record, dict):
+            return self.record_template.format_map(defaultdict(str, record))
+
+        if isinstance(record, str):
+            return record
+
+        return json.dumps(record, ensure_ascii=False)
+
+    def lazy_load_data(
+        self, file_path: Path | str, extra_info: Optional[dict] = None, **kwargs
+    ) -> Iterator[Document]:
+        """Stream documents, each one holding `records_per_document` records
+
+        Args:
+            file_path: path to JSON or JSON Lines file
+            extra_info: extra information passed to this reader during extracting data
+
+        Returns:
+            Iterator[Document]: documents extracted from the file
+        """
+        extra_info = extra_info or {}
+
+        texts: list[str] = []
+        first_record = 0
+
+        for index, record in enumerate(self.iter_records(file_path)):
+            texts.append(self.render_record(record))
+
+            if len(texts) == self.records_per_document:
+                yield Document(
+                    text=self.record_separator.join(texts),
+                    metadata={
+                        "first_record": first_record,
+                        "last_record": index,
+                        **extra_info,
+                    },
+                )
+                texts = []
+                first_record = index + 1
+
+        if texts:
+            yield Document(
+                text=self.record_separator.join(texts),
+                metadata={
+                    "first_record": first_record,
+                    "last_record": first_record + len(texts) - 1,
+                    **extra_info,
+                },
+            )
+
+    def load_data(
+        self, file_path: Path | str, extra_info: Optional[dict] = None, **kwargs
+    ) -> list[Document]:
+        """Load data using the streaming JSON reader
+
+        Args:
+            file_path: path to JSON or JSON Lines file
+            extra_info: extra information passed to this reader during extracting data
+
+        Returns:
+            list[Document]: list of documents extracted from the file
+        """
+        return list(self.lazy_load_data(file_path, extra_info=extra_info, **kwargs))
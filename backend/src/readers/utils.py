@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Dict, Type
 from dotenv import load_dotenv
 from llama_index.core.readers.base import BaseReader
-from llama_index.readers.json import JSONReader
+from llama_index.readers.json import JSONReader  # noqa
 from llama_index.readers.file import (
     PptxReader,  # noqa
     PandasExcelReader,
@@ -22,9 +22,14 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from .kotaemon import (
     DocxReader,
     TxtReader,
+    HtmlReader,
+    MhtmlReader,
+    FastHtmlReader,
+    FastMhtmlReader,
+    StreamingJSONReader,
     PandasCSVReaderCustomised,
 )  # noqa
-from src.constants import SUPPORTED_FILE_EXTENSIONS
+from src.constants import SUPPORTED_FILE_EXTENSIONS, HTMLReaderService
 from src.utils import get_formatted_logger
 from src.settings import GlobalSettings
 
@@ -78,7 +83,54 @@ def get_files_from_folder_or_file_paths(files_or_folders: list[str]) -> list[str
     return files
 
 
-def get_extractor() -> Dict[str, Type[BaseReader]]:
+def get_html_extractor(
+    html_reader: HTMLReaderService, strip_boilerplate: bool = True
+) -> Dict[str, Type[BaseReader]]:
+    """
+    Get the readers for .html and .mhtml files
+
+    Args:
+        html_reader (HTMLReaderService): HTML reader to use
+        strip_boilerplate (bool): Remove boilerplate from the pages, only used by the lxml reader. Default to `True`.
+
+    Returns:
+        Dict[str, Type[BaseReader]]: Readers for .html and .mhtml files
+    """
+    if html_reader == HTMLReaderService.LXML:
+        return {
+            ".html": FastHtmlReader(strip_boilerplate=strip_boilerplate),
+            ".mhtml": FastMhtmlReader(strip_boilerplate=strip_boilerplate),
+        }
+    elif html_reader == HTMLReaderService.HTML2TEXT:
+        return {
+            ".html": HtmlReader(),
+            ".mhtml": MhtmlReader(cache_dir=None),
+        }
+    elif html_reader == HTMLReaderService.UNSTRUCTURED:
+        return {
+            ".html": UnstructuredReader(),
+            ".mhtml": MhtmlReader(cache_dir=None),
+        }
+    else:
+        raise ValueError(
+            f"Unsupported html reader: {html_reader}. Please choose from: {[e.value for e in HTMLReaderService]}"
+        )
+
+
+def get_extractor(
+    html_reader: HTMLReaderService | None = None,
+) -> Dict[str, Type[BaseReader]]:
+    """
+    Get the readers for all supported file extensions
+
+    Args:
+        html_reader (HTMLReaderService | None): HTML reader to use. Default to `None` (use `reader_config.html_reader` from settings).
+
+    Returns:
+        Dict[str, Type[BaseReader]]: Mapping from file extension to its reader
+    """
+    html_reader = html_reader or setting.reader_config.html_reader
+
     return {
         # ".pdf": LlamaParse(
         #     result_type="markdown",
@@ -86,13 +138,23 @@ def get_extractor() -> Dict[str, Type[BaseReader]]:
         # ),
         ".pdf": PDFReader(),
         ".docx": DocxReader(),
-        ".html": UnstructuredReader(),
+        **get_html_extractor(
+            html_reader,
+            strip_boilerplate=setting.reader_config.strip_html_boilerplate,
+        ),
         # ".csv": PandasCSVReader(pandas_config=dict(on_bad_lines="skip")),
         ".csv": PandasCSVReaderCustomised(
             pandas_config=dict(on_bad_lines="skip"), concat_rows=True, top_k=100
         ),
         ".xlsx": PandasExcelReader(),
-        ".json": JSONReader(),
+        ".json": StreamingJSONReader(
+            records_per_document=setting.reader_config.json_records_per_document,
+            record_template=setting.reader_config.json_record_template,
+        ),
+        ".jsonl": StreamingJSONReader(
+            records_per_document=setting.reader_config.json_records_per_document,
+            record_template=setting.reader_config.json_record_template,
+        ),
         ".txt": TxtReader(),
         # ".pptx": PptxReader(),
         ".md": MarkdownReader(),
@@ -7,6 +7,9 @@ from pydantic import BaseModel, Field
 from src.constants import (
     RerankerService,
     VectorDatabaseService,
+    HTMLReaderService,
+    ContextOrdering,
+    QuantizationType,
     ASSISTANT_SYSTEM_PROMPT,
     StorageService,
     LLMCollection,
@@ -72,12 +75,132 @@ class SQLConfig(BaseModel):
     url: Optional[str] = None
 
 
+class QuantizationProfile(BaseModel):
+    """
+    Quantization of the vectors of a collection and how searches use it.
+
+    Attributes:
+        type (QuantizationType): Quantization type
+        always_ram (bool): Keep the quantized vectors in RAM, the original vectors stay on disk
+        oversampling (float): Number of candidates retrieved with the quantized vectors, as a multiple of the limit
+        rescore (bool): Rescore the candidates with the original vectors
+        quantile (Optional[float]): Quantile of the values used to compute the scalar quantization bounds
+        compression (Optional[str]): Product quantization compression ratio, one of `x4`, `x8`, `x16`, `x32`, `x64`
+    """
+
+    type: QuantizationType
+    always_ram: bool = True
+    oversampling: float = 2.0
+    rescore: bool = True
+    quantile: Optional[float] = None
+    compression: Optional[str] = None
+
+
+class QuantizationConfig(BaseModel):
+    """
+    Quantization profiles configuration.
+
+    Attributes:
+        default_profile (str): Profile of the collections without an explicit profile
+        collection_profiles (dict[str, str]): Profile name per collection name
+        profiles (dict[str, QuantizationProfile]): Quantization profiles by name
+    """
+
+    default_profile: str = "binary"
+    collection_profiles: dict[str, str] = {}
+    profiles: dict[str, QuantizationProfile] = {
+        "binary": QuantizationProfile(type=QuantizationType.BINARY)
+    }
+
+
 class QdrantConfig(BaseModel):
     """
     Qdrant configuration.
 
     Attributes:
         url (Optional[str]): Qdrant url
+        hnsw_m (int): Number of edges per node of the HNSW graph
+        hnsw_ef_construct (int): Number of neighbours considered while building the HNSW graph
+        full_scan_threshold (int): Size in kilobytes of the filtered points below which a search scans them instead of using HNSW
+        indexing_threshold (int): Size of a segment in kilobytes above which its HNSW index is built
+        search_hnsw_ef (Optional[int]): Size of the HNSW search beam, Qdrant picks it if `None`
+        tenant_partitioning (bool): Partition the points by knowledge base (tenant index and one HNSW graph per knowledge base)
+        quantization (QuantizationConfig): Quantization profiles of the collections
+        matryoshka_dim (Optional[int]): Dimension of the truncated embedding searched first by new collections, full vector search only if `None`
+        matryoshka_prefetch_factor (float): Size of the truncated embedding shortlist rescored with the full embedding, as a multiple of the limit
+    """
+
+    url: Optional[str] = None
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    full_scan_threshold: int = 10000
+    indexing_threshold: int = 20000
+    search_hnsw_ef: Optional[int] = None
+    tenant_partitioning: bool = False
+    quantization: QuantizationConfig = QuantizationConfig()
+    matryoshka_dim: Optional[int] = None
+    matryoshka_prefetch_factor: float = 4.0
+
+
+class NumpyVectorDatabaseConfig(BaseModel):
+    """
+    Embedded NumPy vector database configuration (`vector_database_service="numpy"`).
+
+    Attributes:
+        path (Optional[str]): Directory of the memory-mapped collections, collections are kept in memory if `None`
+        dtype (str): Storage type of the vectors, `float32` or `float16` (half the memory, slower scans)
+        ivf_threshold (Optional[int]): Number of points above which an IVF index is trained, exact search only if `None`
+        ivf_nprobe (int): Number of IVF lists searched per query
+    """
+
+    path: Optional[str] = None
+    dtype: str = "float32"
+    ivf_threshold: Optional[int] = None
+    ivf_nprobe: int = 16
+
+
+class KBHierarchyConfig(BaseModel):
+    """
+    Knowledge base inheritance configuration.
+
+    Attributes:
+        max_size (int): Maximum number of knowledge bases whose inherited knowledge bases are cached
+        ttl (int): Time to live of the cached inherited knowledge bases in seconds, bounds the staleness in the other processes
+    """
+
+    max_size: int = 10000
+    ttl: int = 60
+
+
+class ProductCatalogConfig(BaseModel):
+    """
+    Product catalog configuration.
+
+    Attributes:
+        path (str): Folder of the indexed product files
+        max_size (int): Maximum number of product catalogs kept in memory
+        query_cache_size (int): Maximum number of cached product searches per catalog
+        embed_products (bool): Embed the products when a product file is processed, for semantic product search
+        embedding_dim (Optional[int]): Number of leading dimensions kept from the product embeddings, all of them if `None`
+        fuzzy_weight (float): Weight of the fuzzy name ranking in the product search fusion
+        semantic_weight (float): Weight of the embedding ranking in the product search fusion
+    """
+
+    path: str = "data/product_catalog"
+    max_size: int = 64
+    query_cache_size: int = 1024
+    embed_products: bool = True
+    embedding_dim: Optional[int] = 512
+    fuzzy_weight: float = 0.5
+    semantic_weight: float = 0.5
+
+
+class ElasticSearchConfig(BaseModel):
+    """
+    ElasticSearch configuration.
+
+    Attributes:
+        url (Optional[str]): ElasticSearch url
     """
 
     url: Optional[str] = None
@@ -98,6 +221,61 @@ class EmbeddingConfig(BaseModel):
     name: str
 
 
+class EmbeddingCacheConfig(BaseModel):
+    """
+    Query embedding cache configuration.
+
+    Attributes:
+        enabled (bool): Cache query embeddings or not
+        max_size (int): Maximum number of query embeddings cached in each process
+        ttl (int): Time to live of a cached query embedding in seconds
+        redis_url (Optional[str]): Redis url to share the cache across workers, only cache in process if `None`
+    """
+
+    enabled: bool = True
+    max_size: int = 10000
+    ttl: int = 24 * 60 * 60
+    redis_url: Optional[str] = None
+
+
+class AnswerCacheConfig(BaseModel):
+    """
+    Semantic answer cache configuration.
+
+    Attributes:
+        enabled (bool): Serve cached answers to similar queries or not
+        max_size (int): Maximum number of answers cached in each process
+        ttl (int): Time to live of a cached answer in seconds
+        similarity_threshold (float): Minimum cosine similarity between queries to serve a cached answer
+        redis_url (Optional[str]): Redis url of the knowledge base versions, shared with the Celery workers. Only invalidated in process if `None`
+    """
+
+    enabled: bool = False
+    max_size: int = 5000
+    ttl: int = 60 * 60
+    similarity_threshold: float = 0.95
+    redis_url: Optional[str] = None
+
+
+class ReaderConfig(BaseModel):
+    """
+    File reader configuration.
+
+    Attributes:
+        html_reader (HTMLReaderService): Reader used for .html and .mhtml files
+        strip_html_boilerplate (bool): Remove navigation, header, footer, ... from HTML pages (lxml reader only)
+        json_records_per_document (int): Number of JSON records grouped into one document
+        json_record_template (Optional[str]): `str.format` template to render one JSON record, dump the record as JSON if `None`
+        ingest_batch_size (int): Number of documents of a file chunked and indexed at once, files are read lazily when their reader supports it
+    """
+
+    html_reader: HTMLReaderService = HTMLReaderService.LXML
+    strip_html_boilerplate: bool = True
+    json_records_per_document: int = 20
+    json_record_template: Optional[str] = None
+    ingest_batch_size: int = 50
+
+
 class LLMConfig(BaseModel):
     """
     LLM configuration.
@@ -121,6 +299,10 @@ class ContextualRAGConfig(BaseModel):
         bm25_weight (float): BM25 weight for rank fusion
         top_k (int): Top K documents for reranking
         top_n (int): Top N documents after reranking
+        hybrid_search (bool): Query ElasticSearch (BM25) alongside the vector database and fuse the results
+        fusion_top_n (int): Number of documents kept after rank fusion
+        rrf_k (int): Smoothing constant of reciprocal rank fusion
+        rerank (bool): Rerank the retrieved documents with `reranker_service` before building the prompt
     """
 
     semantic_weight: float
@@ -129,6 +311,65 @@ class ContextualRAGConfig(BaseModel):
     reranker_service: RerankerService
     top_k: int
     top_n: int
+    hybrid_search: bool = False
+    fusion_top_n: int = 20
+    rrf_k: int = 60
+    rerank: bool = False
+
+
+class LLMRerankConfig(BaseModel):
+    """
+    LLM based rerankers (`llm_reranker`, `rankgpt_reranker`) configuration.
+
+    Attributes:
+        choice_batch_size (int): Number of nodes scored per LLM call by `llm_reranker`
+        window_size (int): Number of nodes ranked per LLM call by `rankgpt_reranker`
+        max_concurrency (int): Maximum number of concurrent LLM calls
+        timeout (float): Time budget of one reranking in seconds, the dense order is kept when exceeded
+    """
+
+    choice_batch_size: int = 5
+    window_size: int = 20
+    max_concurrency: int = 8
+    timeout: float = 10.0
+
+
+class CrossEncoderConfig(BaseModel):
+    """
+    Local ONNX cross-encoder reranker configuration.
+
+    Attributes:
+        path (str): Folder with `model.onnx` and the tokenizer files
+        batch_size (int): Number of (query, chunk) pairs scored in one inference
+        num_threads (int): Number of CPU threads used by onnxruntime
+        max_length (int): Maximum number of tokens of a (query, chunk) pair
+        cache_size (int): Number of cached (query, chunk) scores
+    """
+
+    path: str
+    batch_size: int = 32
+    num_threads: int = 4
+    max_length: int = 512
+    cache_size: int = 10000
+
+
+class ContextConfig(BaseModel):
+    """
+    Context assembly configuration, select the retrieved chunks sent to the LLM.
+
+    Attributes:
+        enabled (bool): Assemble the contexts or send every retrieved chunk
+        token_budgets (dict[str, int]): Token budget of the contexts per LLM model, `default` is used for unknown models
+        dedup_threshold (float): Cosine similarity above which two chunks are near duplicates
+        mmr_lambda (float): Maximal marginal relevance trade-off between relevance (1.0) and diversity (0.0)
+        ordering (ContextOrdering): Order of the selected chunks in the prompt
+    """
+
+    enabled: bool = True
+    token_budgets: dict[str, int] = {"default": 4000}
+    dedup_threshold: float = 0.95
+    mmr_lambda: float = 0.7
+    ordering: ContextOrdering = ContextOrdering.LOST_IN_THE_MIDDLE
 
 
 class AgentConfig(BaseModel):
@@ -138,10 +379,88 @@ class AgentConfig(BaseModel):
     Attributes:
         type (LLMCollection): LLM collection type
         use_agent_memory (bool): Use agent memory or not
+        runtime_cache_size (int): Maximum number of assistants whose LLM clients, tools and agents are kept prepared
     """
 
     type: LLMCollection
     use_agent_memory: bool = False
+    runtime_cache_size: int = 128
+
+
+class AgentMemoryConfig(BaseModel):
+    """
+    Agent memory storage configuration.
+
+    Attributes:
+        collection_prefix (str): Prefix of the Qdrant collection shared by the conversations, one per memory type
+        ttl (Optional[int]): Seconds a memory is kept, forever if `None`
+        prune_interval (int): Seconds between two deletions of the expired memories
+        batch_size (int): Maximum number of memories embedded and upserted at once
+        flush_interval (float): Seconds a saved memory waits for a batch before being embedded
+    """
+
+    collection_prefix: str = "agent_"
+    ttl: Optional[int] = 7 * 24 * 3600
+    prune_interval: int = 3600
+    batch_size: int = 32
+    flush_interval: float = 1.0
+
+
+class TelemetryConfig(BaseModel):
+    """
+    Telemetry export configuration.
+
+    Attributes:
+        enabled (bool): Export the telemetry to Langfuse
+        sample_rates (dict[str, float]): Fraction of the requests exported per route, `default` is used for the other routes
+        max_queue_size (int): Maximum number of events queued per Langfuse client, the next ones are dropped
+        flush_at (int): Number of queued events exported in one batch
+        flush_interval (float): Seconds between two exports of the queued events
+        flush_timeout (float): Maximum seconds a request waits for a flush, `0` to never wait
+        threads (int): Number of export threads per Langfuse client
+    """
+
+    enabled: bool = True
+    sample_rates: dict[str, float] = {"default": 1.0}
+    max_queue_size: int = 10000
+    flush_at: int = 50
+    flush_interval: float = 1.0
+    flush_timeout: float = 0.0
+    threads: int = 1
+
+
+class HistoryConfig(BaseModel):
+    """
+    Chat history configuration.
+
+    Attributes:
+        max_turns (int): Maximum number of recent turns (user message and answer) sent to the agent
+        token_budget (int): Maximum number of tokens of the recent messages sent to the agent
+        summary_model (str): LLM folding the older messages into the summary of the conversation
+        summary_max_words (int): Maximum number of words of the summary
+        fold_batch_size (int): Maximum number of messages folded into the summary at once
+        cache_size (int): Maximum number of conversation histories kept in memory
+    """
+
+    max_turns: int = 10
+    token_budget: int = 3000
+    summary_model: str = "gpt-4o-mini"
+    summary_max_words: int = 300
+    fold_batch_size: int = 20
+    cache_size: int = 10000
+
+
+class CostConfig(BaseModel):
+    """
+    Message cost configuration. The cost is computed locally from the token usage of the calls.
+
+    Attributes:
+        langfuse_reconcile (bool): Replace the cost of the messages with their cost in Langfuse, in a background task
+        reconcile_delay (int): Seconds between a message and its reconciliation, for its traces to be flushed
+    """
+
+    langfuse_reconcile: bool = False
+    reconcile_delay: int = 300
 
 
 class StorageConfig(BaseModel):
@@ -165,9 +484,23 @@ class GlobalSettings(BaseModel):
         minio_config (MinioConfig): Minio configuration
         sql_config (SQLConfig): SQL configuration
         qdrant_config (QdrantConfig): Qdrant configuration
+        numpy_vector_database_config (NumpyVectorDatabaseConfig): Embedded NumPy vector database configuration
+        elastic_search_config (ElasticSearchConfig): ElasticSearch configuration
         upload_bucket_name (str): Upload bucket name
         embedding_config (EmbeddingConfig): Embedding configuration
+        embedding_cache_config (EmbeddingCacheConfig): Query embedding cache configuration
+        answer_cache_config (AnswerCacheConfig): Semantic answer cache configuration
+        kb_hierarchy_config (KBHierarchyConfig): Knowledge base inheritance configuration
+        product_catalog_config (ProductCatalogConfig): Product catalog configuration
+        reader_config (ReaderConfig): File reader configuration
         llm_config (LLMConfig): LLM configuration
+        llm_rerank_config (LLMRerankConfig): LLM based rerankers configuration
+        cross_encoder_config (CrossEncoderConfig): Local ONNX cross-encoder reranker configuration
+        context_config (ContextConfig): Context assembly configuration
+        agent_memory_config (AgentMemoryConfig): Agent memory storage configuration
+        history_config (HistoryConfig): Chat history configuration
+        cost_config (CostConfig): Message cost configuration
+        telemetry_config (TelemetryConfig): Telemetry export configuration
     """
 
     api_keys: APIKeys = Field(
@@ -199,10 +532,45 @@ class GlobalSettings(BaseModel):
     qdrant_config: QdrantConfig = Field(
         default=QdrantConfig(
             url=os.getenv("QDRANT_URL"),
+            hnsw_m=config.qdrant_config.hnsw_m,
+            hnsw_ef_construct=config.qdrant_config.hnsw_ef_construct,
+            full_scan_threshold=config.qdrant_config.full_scan_threshold,
+            indexing_threshold=config.qdrant_config.indexing_threshold,
+            search_hnsw_ef=config.qdrant_config.search_hnsw_ef,
+            tenant_partitioning=config.qdrant_config.tenant_partitioning,
+            quantization=QuantizationConfig(
+                default_profile=config.qdrant_config.quantization.default_profile,
+                collection_profiles=dict(
+                    config.qdrant_config.quantization.collection_profiles
+                ),
+                profiles={
+                    name: QuantizationProfile(**profile)
+                    for name, profile in config.qdrant_config.quantization.profiles.items()
+                },
+            ),
+            matryoshka_dim=config.qdrant_config.matryoshka_dim,
+            matryoshka_prefetch_factor=config.qdrant_config.matryoshka_prefetch_factor,
         ),
         description="Qdrant configuration",
     )
 
+    numpy_vector_database_config: NumpyVectorDatabaseConfig = Field(
+        default=NumpyVectorDatabaseConfig(
+            path=config.numpy_vector_database_config.path,
+            dtype=config.numpy_vector_database_config.dtype,
+            ivf_threshold=config.numpy_vector_database_config.ivf_threshold,
+            ivf_nprobe=config.numpy_vector_database_config.ivf_nprobe,
+        ),
+        description="Embedded NumPy vector database configuration",
+    )
+
+    elastic_search_config: ElasticSearchConfig = Field(
+        default=ElasticSearchConfig(
+            url=os.getenv("ELASTIC_SEARCH_URL"),
+        ),
+        description="ElasticSearch configuration, only used for hybrid search",
+    )
+
     upload_temp_folder: str = Field(
         default="uploads", description="Temporary upload folder before moving to Minio"
     )
@@ -216,6 +584,59 @@ class GlobalSettings(BaseModel):
         description="Embedding configuration",
     )
 
+    embedding_cache_config: EmbeddingCacheConfig = Field(
+        default=EmbeddingCacheConfig(
+            enabled=config.embedding_cache_config.enabled,
+            max_size=config.embedding_cache_config.max_size,
+            ttl=config.embedding_cache_config.ttl,
+            redis_url=os.getenv("EMBEDDING_CACHE_REDIS_URL"),
+        ),
+        description="Query embedding cache configuration",
+    )
+
+    answer_cache_config: AnswerCacheConfig = Field(
+        default=AnswerCacheConfig(
+            enabled=config.answer_cache_config.enabled,
+            max_size=config.answer_cache_config.max_size,
+            ttl=config.answer_cache_config.ttl,
+            similarity_threshold=config.answer_cache_config.similarity_threshold,
+            redis_url=os.getenv("ANSWER_CACHE_REDIS_URL"),
+        ),
+        description="Semantic answer cache configuration",
+    )
+
+    kb_hierarchy_config: KBHierarchyConfig = Field(
+        default=KBHierarchyConfig(
+            max_size=config.kb_hierarchy_config.max_size,
+            ttl=config.kb_hierarchy_config.ttl,
+        ),
+        description="Knowledge base inheritance configuration",
+    )
+
+    product_catalog_config: ProductCatalogConfig = Field(
+        default=ProductCatalogConfig(
+            path=config.product_catalog_config.path,
+            max_size=config.product_catalog_config.max_size,
+            query_cache_size=config.product_catalog_config.query_cache_size,
+            embed_products=config.product_catalog_config.embed_products,
+            embedding_dim=config.product_catalog_config.embedding_dim,
+            fuzzy_weight=config.product_catalog_config.fuzzy_weight,
+            semantic_weight=config.product_catalog_config.semantic_weight,
+        ),
+        description="Product catalog configuration",
+    )
+
+    reader_config: ReaderConfig = Field(
+        default=ReaderConfig(
+            html_reader=config.reader_config.html_reader,
+            strip_html_boilerplate=config.reader_config.strip_html_boilerplate,
+            json_records_per_document=config.reader_config.json_records_per_document,
+            json_record_template=config.reader_config.json_record_template,
+            ingest_batch_size=config.reader_config.ingest_batch_size,
+        ),
+        description="File reader configuration",
+    )
+
     llm_config: LLMConfig = Field(
         default=LLMConfig(
             service=config.llm_config.service,
@@ -233,18 +654,99 @@ class GlobalSettings(BaseModel):
             reranker_service=config.contextual_rag_config.reranker_service,
             top_k=config.contextual_rag_config.top_k,
             top_n=config.contextual_rag_config.top_n,
+            hybrid_search=config.contextual_rag_config.hybrid_search,
+            fusion_top_n=config.contextual_rag_config.fusion_top_n,
+            rrf_k=config.contextual_rag_config.rrf_k,
+            rerank=config.contextual_rag_config.rerank,
         ),
         description="Contextual RAG configuration",
     )
 
+    llm_rerank_config: LLMRerankConfig = Field(
+        default=LLMRerankConfig(
+            choice_batch_size=config.llm_rerank_config.choice_batch_size,
+            window_size=config.llm_rerank_config.window_size,
+            max_concurrency=config.llm_rerank_config.max_concurrency,
+            timeout=config.llm_rerank_config.timeout,
+        ),
+        description="LLM based rerankers configuration",
+    )
+
+    cross_encoder_config: CrossEncoderConfig = Field(
+        default=CrossEncoderConfig(
+            path=config.cross_encoder_config.path,
+            batch_size=config.cross_encoder_config.batch_size,
+            num_threads=config.cross_encoder_config.num_threads,
+            max_length=config.cross_encoder_config.max_length,
+            cache_size=config.cross_encoder_config.cache_size,
+        ),
+        description="Local ONNX cross-encoder reranker configuration",
+    )
+
+    context_config: ContextConfig = Field(
+        default=ContextConfig(
+            enabled=config.context_config.enabled,
+            token_budgets=dict(config.context_config.token_budgets),
+            dedup_threshold=config.context_config.dedup_threshold,
+            mmr_lambda=config.context_config.mmr_lambda,
+            ordering=config.context_config.ordering,
+        ),
+        description="Context assembly configuration",
+    )
+
     agent_config: AgentConfig = Field(
         default=AgentConfig(
             type=config.agent_config.type,
             use_agent_memory=config.agent_config.use_agent_memory,
+            runtime_cache_size=config.agent_config.runtime_cache_size,
         ),
         description="Agent configuration",
     )
 
+    agent_memory_config: AgentMemoryConfig = Field(
+        default=AgentMemoryConfig(
+            collection_prefix=config.agent_memory_config.collection_prefix,
+            ttl=config.agent_memory_config.ttl,
+            prune_interval=config.agent_memory_config.prune_interval,
+            batch_size=config.agent_memory_config.batch_size,
+            flush_interval=config.agent_memory_config.flush_interval,
+        ),
+        description="Agent memory storage configuration",
+    )
+
+    history_config: HistoryConfig = Field(
+        default=HistoryConfig(
+            max_turns=config.history_config.max_turns,
+            token_budget=config.history_config.token_budget,
+            summary_model=config.history_config.summary_model,
+            summary_max_words=config.history_config.summary_max_words,
+            fold_batch_size=config.history_config.fold_batch_size,
+            cache_size=config.history_config.cache_size,
+        ),
+        description="Chat history configuration",
+    )
+
+    cost_config: CostConfig = Field(
+        default=CostConfig(
+            langfuse_reconcile=config.cost_config.langfuse_reconcile,
+            reconcile_delay=config.cost_config.reconcile_delay,
+        ),
+        description="Message cost configuration",
+    )
+
+    telemetry_config: TelemetryConfig = Field(
+        default=TelemetryConfig(
+            enabled=config.telemetry_config.enabled,
+            sample_rates=dict(config.telemetry_config.sample_rates),
+            max_queue_size=config.telemetry_config.max_queue_size,
+            flush_at=config.telemetry_config.flush_at,
+            flush_interval=config.telemetry_config.flush_interval,
+            flush_timeout=config.telemetry_config.flush_timeout,
+            threads=config.telemetry_config.threads,
+        ),
+        description="Telemetry export configuration",
+    )
+
     global_vector_db_collection_name: str = Field(
         default=config.global_vector_db_collection_name,
         description="Global vector database collection name",
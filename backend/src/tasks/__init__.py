@@ -1,3 +1,5 @@
 from .document_parse import parse_document
+from .cost_reconcile import reconcile_message_cost
+from .product_catalog import index_product_catalog
 
-__all__ = ["parse_document"]
+__all__ = ["parse_document", "reconcile_message_cost", "index_product_catalog"]
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+from sqlmodel import select
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.celery import celery_app
+from src.database import Messages, get_instance_session
+from src.utils import get_formatted_logger, get_cost_from_session_id
+
+logger = get_formatted_logger(__file__)
+
+
+@celery_app.task(ignore_result=True)
+def reconcile_message_cost(session_id: str):
+    """
+    Replace the locally computed cost of an assistant message with its cost in Langfuse.
+
+    Scheduled after the message when `cost_config.langfuse_reconcile` is enabled, late enough for
+    the traces to be flushed. The local cost is kept if Langfuse has no cost for the message.
+
+    Args:
+        session_id (str): The session ID (messages.id)
+    """
+    cost = get_cost_from_session_id(session_id)
+
+    if cost <= 0:
+        logger.info(
+            f"No Langfuse cost for session ID: {session_id}, keeping the local cost"
+        )
+        return
+
+    with get_instance_session() as session:
+        message = session.exec(
+            select(Messages).where(Messages.id == session_id)
+        ).first()
+
+        if message is None:
+            logger.warning(f"Message not found for session ID: {session_id}")
+            return
+
+        logger.debug(
+            f"session ID: {session_id} - local cost: {message.cost}, Langfuse cost: {cost}"
+        )
+        message.cost = cost
+        session.add(message)
+        session.commit()
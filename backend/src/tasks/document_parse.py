@@ -1,6 +1,7 @@
 import sys
 import math
 import celery
+from celery.signals import worker_process_init
 from typing import Type
 from pathlib import Path
 from llama_index.core import Document
@@ -10,20 +11,29 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.celery import celery_app
 from src.settings import default_settings
+from src.constants import DocumentMetadata
 from src.utils import get_formatted_logger, is_product_file
-from src.readers import parse_multiple_files, get_extractor
+from src.readers import iter_document_batches, get_extractor
 from src.database import (
     DatabaseManager,
     DocumentChunks,
     init_db,
+    init_runtime,
     get_instance_session,
+    answer_cache,
 )
 
 logger = get_formatted_logger(__file__)
 
 init_db()
 
-db_manager: DatabaseManager = DatabaseManager.from_setting(setting=default_settings)
+
+@worker_process_init.connect
+def init_worker_runtime(**kwargs):
+    """
+    Create the shared clients once per worker process (after fork)
+    """
+    init_runtime(default_settings)
 
 
 class FileExtractor:
@@ -51,6 +61,86 @@ class FileExtractor:
 file_extractor = FileExtractor()
 
 
+def index_documents(
+    db_manager: DatabaseManager,
+    documents: list[Document],
+    document_id: str,
+    knowledge_base_id: str,
+    is_contextual_rag: bool = True,
+    first_chunk_index: int = 0,
+) -> int:
+    """
+    Chunk a batch of documents of a file, index the chunks in the vector database (and
+    ElasticSearch for hybrid search) and save them
+
+    Args:
+        db_manager (DatabaseManager): Database manager
+        documents (list[Document]): Batch of documents of the file
+        document_id (str): The document ID from Documents table.
+        knowledge_base_id (str): The knowledge base ID.
+        is_contextual_rag (bool): Whether to use contextual RAG or not. Default to `True`.
+        first_chunk_index (int): Index of the first chunk of the batch in the file. Default to `0`.
+
+    Returns:
+        int: Index of the first chunk of the next batch
+    """
+    chunks = db_manager.get_chunks(documents, document_id)
+
+    if is_contextual_rag:
+        contextual_documents, contextual_documents_metadata = (
+            db_manager.get_contextual_rag_chunks(
+                documents=documents,
+                chunks=chunks,
+            )
+        )
+
+    new_chunks: list[Document] = []
+    for chunk in chunks:
+        new_chunks.extend(chunk)
+
+    db_manager.index_to_vector_db(
+        kb_id=knowledge_base_id,
+        chunks_documents=contextual_documents if is_contextual_rag else new_chunks,
+        document_id=document_id,
+    )
+
+    if default_settings.contextual_rag_config.hybrid_search:
+        db_manager.index_to_elastic_search(
+            kb_id=knowledge_base_id,
+            document_id=document_id,
+            documents_metadata=contextual_documents_metadata
+            if is_contextual_rag
+            else [
+                DocumentMetadata(
+                    vector_id=chunk.metadata["vector_id"],
+                    original_content=chunk.text,
+                    contextualized_content="",
+                )
+                for chunk in new_chunks
+            ],
+        )
+
+    indexed_document = contextual_documents if is_contextual_rag else new_chunks
+
+    with get_instance_session() as session:
+        for idx, (chunk, original_chunk) in enumerate(
+            zip(indexed_document, new_chunks), start=first_chunk_index
+        ):
+            session.add(
+                DocumentChunks(
+                    chunk_index=idx,
+                    original_content=original_chunk.text,
+                    content=chunk.text,
+                    document_id=document_id,
+                    vector_id=chunk.metadata["vector_id"],
+                )
+            )
+
+        session.commit()
+
+    return first_chunk_index + len(new_chunks)
+
+
 @celery_app.task(bind=True)
 def parse_document(
     self: celery.Task,
@@ -76,6 +166,8 @@ def parse_document(
 
     self.update_state(state="PROGRESS", meta={"progress": 0})
 
+    db_manager = DatabaseManager.from_setting(setting=default_settings)
+
     db_manager.storage_client.download_file(
         bucket_name=db_manager.storage_client.get_upload_bucket_name(),
         object_name=file_path_in_storage_service,
@@ -83,7 +175,8 @@ def parse_document(
     )
 
     if is_product_file(file_path):
-        logger.info("product file detected, skipping parsing")
+        logger.info("product file detected, indexing the product catalog")
+        db_manager.index_product_file(file_path, file_path_in_storage_service)
         return {
             "task_id": self.request.id,
             "status": "SUCCESS",
@@ -91,60 +184,32 @@ def parse_document(
 
     self.update_state(state="PROGRESS", meta={"progress": 5})
 
-    document = parse_multiple_files(
-        str(file_path),
-        extractor=file_extractor.get_extractor_for_file(file_path),
-    )
-
-    self.update_state(state="PROGRESS", meta={"progress": 10})
-
-    chunks = db_manager.get_chunks(document, document_id)
-
-    self.update_state(state="PROGRESS", meta={"progress": 20})
-
-    if is_contextual_rag:
-        contextual_documents, _ = db_manager.get_contextual_rag_chunks(
-            documents=document,
-            chunks=chunks,
+    # Streamed files are chunked and indexed batch by batch, their size is unknown in advance:
+    # the progress gets closer to 95 with each batch
+    chunk_index = 0
+    for batch_index, documents in enumerate(
+        iter_document_batches(
+            str(file_path),
+            extractor=file_extractor.get_extractor_for_file(file_path),
+            batch_size=default_settings.reader_config.ingest_batch_size,
+        )
+    ):
+        chunk_index = index_documents(
+            db_manager,
+            documents=documents,
+            document_id=document_id,
+            knowledge_base_id=knowledge_base_id,
+            is_contextual_rag=is_contextual_rag,
+            first_chunk_index=chunk_index,
         )
 
-    self.update_state(state="PROGRESS", meta={"progress": 40})
-
-    new_chunks: list[Document] = []
-    for chunk in chunks:
-        new_chunks.extend(chunk)
-
-    db_manager.index_to_vector_db(
-        kb_id=knowledge_base_id,
-        chunks_documents=contextual_documents if is_contextual_rag else new_chunks,
-        document_id=document_id,
-    )
-
-    self.update_state(state="PROGRESS", meta={"progress": 80})
-
-    indexed_document = contextual_documents if is_contextual_rag else new_chunks
-
-    with get_instance_session() as session:
-        for idx, (chunk, original_chunk) in enumerate(
-            zip(indexed_document, new_chunks)
-        ):
-            document_chunk = DocumentChunks(
-                chunk_index=idx,
-                original_content=original_chunk.text,
-                content=chunk.text,
-                document_id=document_id,
-                vector_id=chunk.metadata["vector_id"],
-            )
-            session.add(document_chunk)
-
-            self.update_state(
-                state="PROGRESS",
-                meta={
-                    "progress": 80 + math.ceil(20 / len(indexed_document) * (idx + 1))
-                },
-            )
+        self.update_state(
+            state="PROGRESS",
+            meta={"progress": 95 - math.ceil(90 / (batch_index + 2))},
+        )
 
-        session.commit()
+    # Answers generated before this document was indexed are stale
+    answer_cache.invalidate(knowledge_base_id)
 
     try:
         file_path.unlink()
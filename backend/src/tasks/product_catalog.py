@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.celery import celery_app
+from src.settings import default_settings
+from src.constants import DOWNLOAD_FOLDER
+from src.database import DatabaseManager, product_catalog_cache
+from src.utils import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+
+@celery_app.task(ignore_result=True)
+def index_product_catalog(object_name: str):
+    """
+    Index a product file processed before the product catalogs and upload its catalog.
+
+    Scheduled by the first chat message of an assistant using the product file, so that
+    the chat handler never downloads nor embeds the products itself.
+
+    Args:
+        object_name (str): Object name of the product file in the storage service
+    """
+    db_manager = DatabaseManager.from_setting(setting=default_settings)
+    catalog_path = product_catalog_cache.get_catalog_path(object_name)
+
+    # Indexed by a task scheduled by another API worker
+    if db_manager.download_product_catalog(object_name, catalog_path):
+        logger.info(f"Product catalog of {object_name} already indexed")
+        return
+
+    file_path = DOWNLOAD_FOLDER / f"{catalog_path.stem}.xlsx"
+    db_manager.download_file(object_name, str(file_path))
+
+    try:
+        db_manager.index_product_file(file_path, object_name)
+    finally:
+        file_path.unlink(missing_ok=True)
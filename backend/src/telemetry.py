@@ -0,0 +1,271 @@
+import random
+import threading
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from langfuse import Langfuse
+from langfuse.task_manager import TaskManager
+from langfuse.decorators import langfuse_context
+from langfuse.llama_index import LlamaIndexCallbackHandler
+
+from src.settings import GlobalSettings, default_settings
+from src.utils import get_formatted_logger
+
+logger = get_formatted_logger(__file__)
+
+current_trace_sampled: ContextVar[Optional[bool]] = ContextVar(
+    "current_trace_sampled", default=None
+)
+
+
+def is_trace_sampled() -> bool:
+    """
+    Whether the telemetry of the current request is exported, the requests without sampling
+    decision are exported
+
+    Returns:
+        bool: Export the telemetry events
+    """
+    return current_trace_sampled.get() is not False
+
+
+class SampledLlamaIndexCallbackHandler(LlamaIndexCallbackHandler):
+    """
+    Langfuse llama-index callback handler skipping the requests sampled out, before building
+    their events.
+    """
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        if is_trace_sampled():
+            super().start_trace(trace_id)
+
+    def end_trace(
+        self,
+        trace_id: Optional[str] = None,
+        trace_map: Optional[dict[str, list[str]]] = None,
+    ) -> None:
+        if is_trace_sampled():
+            super().end_trace(trace_id, trace_map)
+
+    def on_event_start(
+        self, event_type, payload=None, event_id="", parent_id="", **kwargs
+    ):
+        if not is_trace_sampled():
+            return event_id
+        return super().on_event_start(
+            event_type, payload, event_id, parent_id, **kwargs
+        )
+
+    def on_event_end(self, event_type, payload=None, event_id="", **kwargs) -> None:
+        if is_trace_sampled():
+            super().on_event_end(event_type, payload, event_id, **kwargs)
+
+
+class Telemetry:
+    """
+    Telemetry export to Langfuse, kept off the latency of the requests.
+
+    The Langfuse clients (the `@observe` decorators one and the llama-index callback handler one)
+    queue their events in bounded queues exported in batches by their background threads: an event
+    is dropped when its queue is full instead of blocking the request. Each route exports the
+    telemetry of a sample of its requests, decided once per request so that traces stay whole.
+    `flush` asks a background thread to export the queued events and waits at most `flush_timeout`.
+
+    Args:
+        enabled (bool): Export the telemetry
+        sample_rates (Optional[dict[str, float]]): Fraction of the requests exported per route, `default` is used for the other routes. Export all requests if `None`.
+        max_queue_size (int): Maximum number of events queued per Langfuse client
+        flush_at (int): Number of queued events exported in one batch
+        flush_interval (float): Seconds between two exports of the queued events
+        flush_timeout (float): Maximum seconds a request waits for a flush, `0` to never wait
+        threads (int): Number of export threads per Langfuse client
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        sample_rates: Optional[dict[str, float]] = None,
+        max_queue_size: int = 10000,
+        flush_at: int = 50,
+        flush_interval: float = 1.0,
+        flush_timeout: float = 0.0,
+        threads: int = 1,
+    ):
+        self.enabled = enabled
+        self.sample_rates = sample_rates or {"default": 1.0}
+        self.max_queue_size = max_queue_size
+        self.flush_timeout = flush_timeout
+
+        self.dropped_events = 0
+        self.sampled_out_events = 0
+        self.flush_timeouts = 0
+        self._lock = threading.Lock()
+
+        langfuse_context.configure(
+            enabled=enabled,
+            threads=threads,
+            flush_at=flush_at,
+            flush_interval=flush_interval,
+        )
+        self.llama_index_callback_handler = SampledLlamaIndexCallbackHandler(
+            enabled=enabled,
+            threads=threads,
+            flush_at=flush_at,
+            flush_interval=flush_interval,
+        )
+        self.clients: list[Langfuse] = [
+            langfuse_context.client_instance,
+            self.llama_index_callback_handler.langfuse,
+        ]
+        for client in self.clients:
+            self._bound_task_manager(client.task_manager)
+
+        self._flush_condition = threading.Condition()
+        self._flush_requests = 0
+        self._flushed = 0
+        threading.Thread(target=self._flush_worker, daemon=True).start()
+
+    @classmethod
+    def from_setting(cls, setting: GlobalSettings) -> "Telemetry":
+        return cls(
+            enabled=setting.telemetry_config.enabled,
+            sample_rates=setting.telemetry_config.sample_rates,
+            max_queue_size=setting.telemetry_config.max_queue_size,
+            flush_at=setting.telemetry_config.flush_at,
+            flush_interval=setting.telemetry_config.flush_interval,
+            flush_timeout=setting.telemetry_config.flush_timeout,
+            threads=setting.telemetry_config.threads,
+        )
+
+    @property
+    def langfuse(self) -> Langfuse:
+        """
+        Langfuse client of the `@observe` decorators
+        """
+        return self.clients[0]
+
+    def _bound_task_manager(self, task_manager: TaskManager):
+        # The Langfuse client does not expose the size of its queue, `Queue.put` reads `maxsize`
+        task_manager._queue.maxsize = self.max_queue_size
+        add_task = task_manager.add_task
+
+        def add_sampled_task(event: dict) -> Any:
+            if not is_trace_sampled():
+                with self._lock:
+                    self.sampled_out_events += 1
+                return None
+
+            # `False` when the queue is full or the event invalid
+            result = add_task(event)
+            if result is False:
+                with self._lock:
+                    self.dropped_events += 1
+
+            return result
+
+        task_manager.add_task = add_sampled_task
+
+    def sample(self, route: str) -> bool:
+        """
+        Draw the sampling decision of a request
+
+        Args:
+            route (str): Route of the request, e.g. `chat`
+
+        Returns:
+            bool: Export the telemetry of the request
+        """
+        if not self.enabled:
+            return False
+
+        sample_rate = self.sample_rates.get(
+            route, self.sample_rates.get("default", 1.0)
+        )
+        return random.random() < sample_rate
+
+    @contextmanager
+    def trace_sampling(self, route: str) -> Iterator[bool]:
+        """
+        Sample the telemetry of the code running in the context, a request already sampled keeps
+        its decision
+
+        Args:
+            route (str): Route of the request, e.g. `chat`
+
+        Yields:
+            bool: Export the telemetry of the request
+        """
+        sampled = current_trace_sampled.get()
+        if sampled is not None:
+            yield sampled
+            return
+
+        sampled = self.sample(route)
+        token = current_trace_sampled.set(sampled)
+        try:
+            yield sampled
+        finally:
+            current_trace_sampled.reset(token)
+
+    def _flush_worker(self):
+        while True:
+            with self._flush_condition:
+                self._flush_condition.wait_for(
+                    lambda: self._flush_requests > self._flushed
+                )
+                target = self._flush_requests
+
+            for client in self.clients:
+                try:
+                    client.flush()
+                except Exception as e:
+                    logger.warning(f"Failed to flush the telemetry: {e}")
+
+            with self._flush_condition:
+                self._flushed = target
+                self._flush_condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        Export the queued events in the background
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait for the export, `flush_timeout` if `None`
+        """
+        if not self.enabled:
+            return
+
+        timeout = self.flush_timeout if timeout is None else timeout
+
+        with self._flush_condition:
+            self._flush_requests += 1
+            target = self._flush_requests
+            self._flush_condition.notify_all()
+
+            if timeout > 0 and not self._flush_condition.wait_for(
+                lambda: self._flushed >= target, timeout
+            ):
+                self.flush_timeouts += 1
+
+    def stats(self) -> dict:
+        """
+        Get the telemetry statistics
+
+        Returns:
+            dict: Queue depth and dropped, sampled out events
+        """
+        return {
+            "enabled": self.enabled,
+            "queue_depth": sum(
+                client.task_manager._queue.qsize() for client in self.clients
+            ),
+            "max_queue_size": self.max_queue_size * len(self.clients),
+            "dropped_events": self.dropped_events,
+            "sampled_out_events": self.sampled_out_events,
+            "flush_timeouts": self.flush_timeouts,
+            "sample_rates": self.sample_rates,
+        }
+
+
+telemetry = Telemetry.from_setting(default_settings)
@@ -76,7 +76,7 @@ search_task = Task(
     tools=[
         KBSearchTool(
             setting=get_default_setting(),
-            contextual_rag=ContextualRAG.from_setting(get_default_setting()),
+            contextual_rag=get_contextual_rag(get_default_setting()),
             kb_ids=[
                 "3e6a1373-cb33-4115-a9db-ed7e0018fc9e",
                 "8ad56aec-f187-4bf1-bae5-f59e9f6f969d",
@@ -1,12 +1,16 @@
 import sys
-import polars as pl
 
 from pathlib import Path
-from thefuzz import process
+from typing import Optional
 from llama_index.core.tools import FunctionTool
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from src.utils import get_formatted_logger
+from src.database import (
+    product_catalog_cache,
+    get_query_embedding,
+    aget_query_embedding,
+)
+from src.utils import get_formatted_logger, add_product_rows
 
 logger = get_formatted_logger(
     __file__, file_path="logs/llama_index_tools/product_search_tool.log"
@@ -16,45 +20,107 @@ logger = get_formatted_logger(
 def load_product_search_tool(
     file_product_path: str | Path, description: str = "", return_direct: bool = True
 ) -> FunctionTool:
-    assert Path(file_product_path).suffix == ".xlsx", "Only support xlsx file"
-
-    # Only read sheet "product"
-    df_product = pl.read_excel(file_product_path, sheet_name="product")
+    assert Path(file_product_path).suffix in (
+        ".xlsx",
+        ".parquet",
+    ), "Only support xlsx file or product catalog"
 
-    product_list = df_product["name"].to_list()
+    # Indexed once per product file version
+    product_catalog = product_catalog_cache.get_catalog(file_product_path)
 
-    def product_search(product_name: str) -> str:
-        logger.debug(f"Searching for product: {product_name}")
-
-        list_product_name_by_fuzzy = process.extract(
-            product_name, product_list, limit=3
-        )
+    def format_products(product_name: str, products: list[dict]) -> str:
+        # The structured answers reuse the rows instead of parsing them back from the text
+        add_product_rows(products)
 
         result_str = f"Một số sản phẩm liên quan đến {product_name} gồm: \n"
 
-        for index, product_name_by_fuzzy in enumerate(list_product_name_by_fuzzy):
-            product_name_by_fuzzy = product_name_by_fuzzy[0]
-            product_info = df_product.filter(
-                df_product["name"] == product_name_by_fuzzy
-            )
+        for index, product_info in enumerate(products):
+            name = product_info["name"]
+            price = product_info["price"]
+            description = product_info["description"]
+            url = product_info["url"]
+            image_urls = product_info["image_urls"]
+            code = product_info["code"]
 
-            if product_info.height > 0:
-                name = product_info["name"].to_list()[0]
-                price = product_info["price"].to_list()[0]
-                description = product_info["description"].to_list()[0]
-                url = product_info["url"].to_list()[0]
-                image_urls = product_info["image_urls"].to_list()[0]
-                code = product_info["code"].to_list()[0]
-
-                result_str += f"{index+1}- Sản phẩm: {name}, Giá: {price}, Mô tả: {description}, Link sản phẩm: {url}, Mã sản phẩm: {code}, Hình ảnh: {image_urls}\n"
+            result_str += f"{index+1}- Sản phẩm: {name}, Giá: {price}, Mô tả: {description}, Link sản phẩm: {url}, Mã sản phẩm: {code}, Hình ảnh: {image_urls}\n"
 
         logger.debug(f"Result: {result_str}")
         logger.debug(f"\n {'=' * 100} \n")
 
         return result_str
 
+    def product_search(
+        product_name: str,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> str:
+        """
+        Search products by name or description, optionally within a price range
+
+        Args:
+            product_name (str): Product name or description of the wanted product
+            min_price (Optional[float]): Minimum price, only if the user gives one
+            max_price (Optional[float]): Maximum price, only if the user gives one
+
+        Returns:
+            str: Matching products with their price, description, link, code and images
+        """
+        logger.debug(
+            f"Searching for product: {product_name}, price: {min_price} - {max_price}"
+        )
+
+        query_embedding = (
+            get_query_embedding(product_name)
+            if product_catalog.embeddings is not None
+            else None
+        )
+        products = product_catalog.search(
+            product_name,
+            query_embedding=query_embedding,
+            min_price=min_price,
+            max_price=max_price,
+        )
+
+        return format_products(product_name, products)
+
+    async def aproduct_search(
+        product_name: str,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> str:
+        """
+        Search products by name or description, optionally within a price range
+
+        Args:
+            product_name (str): Product name or description of the wanted product
+            min_price (Optional[float]): Minimum price, only if the user gives one
+            max_price (Optional[float]): Maximum price, only if the user gives one
+
+        Returns:
+            str: Matching products with their price, description, link, code and images
+        """
+        logger.debug(
+            f"Searching for product: {product_name}, price: {min_price} - {max_price}"
+        )
+
+        query_embedding = (
+            await aget_query_embedding(product_name)
+            if product_catalog.embeddings is not None
+            else None
+        )
+        products = product_catalog.search(
+            product_name,
+            query_embedding=query_embedding,
+            min_price=min_price,
+            max_price=max_price,
+        )
+
+        return format_products(product_name, products)
+
     return FunctionTool.from_defaults(
         fn=product_search,
+        async_fn=aproduct_search,
         return_direct=return_direct,
-        description=description or "Useful tool for searching product",
+        description=description
+        or "Useful tool for searching product by name or description, with an optional price range",
     )
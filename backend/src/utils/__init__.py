@@ -3,3 +3,6 @@ from .compute_cost import *  # noqa: F401, F403
 from .compute_token import *  # noqa: F401, F403
 from .excel_tools import *  # noqa: F401, F403
 from .utils import *  # noqa: F401, F403
+from .cache import *  # noqa: F401, F403
+from .streaming import *  # noqa: F401, F403
+from .message_context import *  # noqa: F401, F403
@@ -0,0 +1,186 @@
+import time
+import threading
+from typing import Any, Callable, Hashable, Optional
+from collections import OrderedDict
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after `ttl` seconds.
+
+    Args:
+        max_size (int): Maximum number of entries, the least recently used entry is evicted first
+        ttl (float | None): Time to live of an entry in seconds, `None` means entries never expire
+        on_evict (Callable[[Hashable, Any], None] | None): Called with the key and value of the entries
+            evicted or found expired, outside of the cache lock. Defaults to `None`.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        assert max_size > 0, "max_size must be positive"
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key, counting the lookup as a hit or a miss
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned on miss. Defaults to `None`.
+
+        Returns:
+            Any: Cached value or `default`
+        """
+        with self._lock:
+            item = self._data.get(key)
+
+            if item is not None and (
+                self.ttl is None or time.monotonic() - item[0] < self.ttl
+            ):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+
+            if item is not None:
+                del self._data[key]
+
+            self.misses += 1
+
+        if item is not None and self.on_evict is not None:
+            self.on_evict(key, item[1])
+
+        return default
+
+    def touch(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get the value of a key and refresh its recency, without counting the lookup
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned if the key is not cached. Defaults to `None`.
+
+        Returns:
+            Any: Cached value or `default`
+        """
+        with self._lock:
+            item = self._data.get(key)
+
+            if item is not None and (
+                self.ttl is None or time.monotonic() - item[0] < self.ttl
+            ):
+                self._data.move_to_end(key)
+                return item[1]
+
+            if item is not None:
+                del self._data[key]
+
+        if item is not None and self.on_evict is not None:
+            self.on_evict(key, item[1])
+
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Set the value of a key
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to cache
+        """
+        evicted = []
+
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                evicted_key, (_, evicted_value) = self._data.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+                self.evictions += 1
+
+        if self.on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Remove a key from the cache
+
+        Args:
+            key (Hashable): Cache key
+            default (Any): Value returned if the key is not cached. Defaults to `None`.
+
+        Returns:
+            Any: Removed value or `default`
+        """
+        with self._lock:
+            item = self._data.pop(key, None)
+
+        return default if item is None else item[1]
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """
+        Get a snapshot of the live entries without refreshing their recency nor counting lookups
+
+        Returns:
+            list[tuple[Hashable, Any]]: (key, value) pairs, least recently used first
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [
+                (key, value)
+                for key, (timestamp, value) in self._data.items()
+                if self.ttl is None or now - timestamp < self.ttl
+            ]
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+
+        return item is not None and (
+            self.ttl is None or time.monotonic() - item[0] < self.ttl
+        )
+
+    def stats(self) -> dict:
+        """
+        Get the cache statistics
+
+        Returns:
+            dict: Size, hits, misses, evictions and hit rate of the cache
+        """
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
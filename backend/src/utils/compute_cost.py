@@ -1,8 +1,27 @@
 import os
+import threading
 import requests
 from uuid import UUID
+from contextvars import ContextVar
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from typing import Any, Iterator, Optional
+from llama_index.core.instrumentation.events import BaseEvent
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.embedding import (
+    EmbeddingStartEvent,
+    EmbeddingEndEvent,
+)
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatStartEvent,
+    LLMChatEndEvent,
+    LLMCompletionStartEvent,
+    LLMCompletionEndEvent,
+)
+
+from .cache import LRUTTLCache
 from .logger import get_formatted_logger
+from .compute_token import openai_compute_token
 
 load_dotenv()
 
@@ -10,10 +29,228 @@ LANGFUSE_HOST = os.getenv("LANGFUSE_HOST")
 LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
 LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
 
+# USD per 1M tokens: (input, output). Dated snapshots use the price of their model,
+# e.g. "gpt-4o-mini-2024-07-18" is priced as "gpt-4o-mini".
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4.1-nano": (0.1, 0.4),
+    "gpt-4.1-mini": (0.4, 1.6),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "o1-mini": (1.1, 4.4),
+    "o1": (15.0, 60.0),
+    "o3-mini": (1.1, 4.4),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.1, 0.0),
+}
+
 
 logger = get_formatted_logger(__file__)
 
 
+def get_model_price(model: str) -> Optional[tuple[float, float]]:
+    """
+    Get the price of a model from `MODEL_PRICES`
+
+    Args:
+        model (str): Model name, with or without provider prefix and snapshot date
+
+    Returns:
+        Optional[tuple[float, float]]: USD per 1M input and output tokens, `None` for unknown models
+    """
+    # "openai/gpt-4o-mini" from litellm
+    model = model.split("/")[-1]
+
+    # Longest prefix, "gpt-4o-mini-2024-07-18" is not "gpt-4o"
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return None
+
+    return MODEL_PRICES[max(matches, key=len)]
+
+
+def get_model_cost(model: str, input_tokens: int, output_tokens: int = 0) -> float:
+    """
+    Compute the cost of a LLM or embedding call from its token usage
+
+    Args:
+        model (str): Model name
+        input_tokens (int): Number of input tokens
+        output_tokens (int): Number of output tokens. Default to `0`.
+
+    Returns:
+        float: Cost in USD, 0.0 for unknown models
+    """
+    price = get_model_price(model)
+
+    if price is None:
+        logger.warning(f"No price for model: {model}. So returning 0.0")
+        return 0.0
+
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+
+class UsageTracker:
+    """
+    Token usage of the LLM and embedding calls made while answering one chat message.
+
+    The calls may run in the event loop or in worker threads (CrewAI), they find the tracker of
+    the current message with `get_usage_tracker`.
+    """
+
+    def __init__(self):
+        self.usage: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str, input_tokens: int, output_tokens: int = 0):
+        """
+        Record the token usage of a call
+
+        Args:
+            model (str): Model name
+            input_tokens (int): Number of input tokens
+            output_tokens (int): Number of output tokens. Default to `0`.
+        """
+        with self._lock:
+            usage = self.usage.setdefault(
+                model, {"input_tokens": 0, "output_tokens": 0, "calls": 0}
+            )
+            usage["input_tokens"] += input_tokens
+            usage["output_tokens"] += output_tokens
+            usage["calls"] += 1
+
+    @property
+    def cost(self) -> float:
+        """
+        Total cost in USD of the recorded calls
+        """
+        with self._lock:
+            return sum(
+                get_model_cost(model, usage["input_tokens"], usage["output_tokens"])
+                for model, usage in self.usage.items()
+            )
+
+
+current_usage_tracker: ContextVar[Optional[UsageTracker]] = ContextVar(
+    "current_usage_tracker", default=None
+)
+
+
+def get_usage_tracker() -> Optional[UsageTracker]:
+    """
+    Get the usage tracker of the chat message being answered
+
+    Returns:
+        Optional[UsageTracker]: Usage tracker, `None` outside of a tracked chat message
+    """
+    return current_usage_tracker.get()
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageTracker]:
+    """
+    Track the token usage of the code running in the context
+
+    Yields:
+        UsageTracker: Usage tracker, filled as the calls end
+    """
+    usage_tracker = UsageTracker()
+    token = current_usage_tracker.set(usage_tracker)
+    try:
+        yield usage_tracker
+    finally:
+        current_usage_tracker.reset(token)
+
+
+def record_usage(model: str, input_tokens: int, output_tokens: int = 0):
+    """
+    Record the token usage of a call, no-op outside of a tracked chat message
+
+    Args:
+        model (str): Model name
+        input_tokens (int): Number of input tokens
+        output_tokens (int): Number of output tokens. Default to `0`.
+    """
+    usage_tracker = get_usage_tracker()
+    if usage_tracker is not None:
+        usage_tracker.add(model, input_tokens, output_tokens)
+
+
+def _count_tokens(text: str, model: str) -> int:
+    try:
+        return openai_compute_token(text, model)
+    except KeyError:
+        # Model unknown to tiktoken
+        return openai_compute_token(text, "gpt-4o")
+
+
+class UsageEventHandler(BaseEventHandler):
+    """
+    llama-index instrumentation handler recording the token usage of the LLM and embedding calls
+    in the usage tracker of the current message.
+
+    The LLM usage is the one reported by the response (streamed responses report it in their last
+    chunk with `stream_options={"include_usage": True}`), else estimated with tiktoken. Embedding
+    responses do not expose their usage through llama-index: it is estimated.
+    """
+
+    models: Any = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        # Model of the running calls, by span
+        self.models = LRUTTLCache(max_size=10000, ttl=600)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "UsageEventHandler"
+
+    def handle(self, event: BaseEvent, **kwargs: Any) -> Any:
+        if get_usage_tracker() is None:
+            return
+
+        if isinstance(event, (LLMChatStartEvent, LLMCompletionStartEvent)):
+            self.models.set(event.span_id, event.model_dict.get("model"))
+        elif isinstance(event, EmbeddingStartEvent):
+            self.models.set(event.span_id, event.model_dict.get("model_name"))
+        elif isinstance(event, (LLMChatEndEvent, LLMCompletionEndEvent)):
+            self._record_llm_usage(event)
+        elif isinstance(event, EmbeddingEndEvent):
+            model = self.models.pop(event.span_id, None)
+            if model:
+                record_usage(
+                    model, sum(_count_tokens(chunk, model) for chunk in event.chunks)
+                )
+
+    def _record_llm_usage(self, event: LLMChatEndEvent | LLMCompletionEndEvent):
+        model = self.models.pop(event.span_id, None)
+        if not model or event.response is None:
+            return
+
+        token_counts = event.response.additional_kwargs
+        if "prompt_tokens" in token_counts:
+            record_usage(
+                model, token_counts["prompt_tokens"], token_counts["completion_tokens"]
+            )
+            return
+
+        prompt = (
+            event.prompt
+            if isinstance(event, LLMCompletionEndEvent)
+            else "\n".join(str(message.content or "") for message in event.messages)
+        )
+        output = (
+            event.response.text
+            if isinstance(event, LLMCompletionEndEvent)
+            else str(event.response.message.content or "")
+        )
+        record_usage(model, _count_tokens(prompt, model), _count_tokens(output, model))
+
+
 def get_cost_from_trace_id(trace_id: str | UUID) -> float:
     """
     Get cost from trace ID from Langfuse
@@ -48,10 +285,11 @@ def get_cost_from_trace_id(trace_id: str | UUID) -> float:
 
 def get_cost_from_session_id(session_id: str | UUID) -> float:
     """
-    Get cost from session ID from Langfuse
+    Get cost from session ID from Langfuse, the traces of the session are listed with their cost
+    by page instead of fetched one by one
 
     Args:
-        session_id (str | UUID): The session ID (conversations.id)
+        session_id (str | UUID): The session ID (messages.id)
 
     Returns:
         float: The total cost of all traces in the session
@@ -60,19 +298,29 @@ def get_cost_from_session_id(session_id: str | UUID) -> float:
 
     logger.debug(f"Getting cost for session ID: {session_id}")
 
-    url = f"{LANGFUSE_HOST}/api/public/sessions/{session_id}"
-    response = requests.get(url, auth=(LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY))
+    url = f"{LANGFUSE_HOST}/api/public/traces"
+    total_cost = 0.0
+    page = 1
 
-    if response.status_code != 200:
-        logger.warning(
-            f"Failed to get cost for session ID: {session_id}, status code: {response.status_code}, response: {response.text}. So returning 0.0"
+    while True:
+        response = requests.get(
+            url,
+            params={"sessionId": session_id, "page": page, "limit": 100},
+            auth=(LANGFUSE_PUBLIC_KEY, LANGFUSE_SECRET_KEY),
+            timeout=10,
         )
-        return 0.0
 
-    data = response.json()
+        if response.status_code != 200:
+            logger.warning(
+                f"Failed to get cost for session ID: {session_id}, status code: {response.status_code}, response: {response.text}. So returning 0.0"
+            )
+            return 0.0
 
-    if len(data["traces"]) == 0:
-        logger.debug(f"No traces found for session ID: {session_id}. So returning 0.0")
-        return 0.0
+        data = response.json()
+        total_cost += sum(trace.get("totalCost") or 0.0 for trace in data["data"])
+
+        if page >= data["meta"]["totalPages"]:
+            break
+        page += 1
 
-    return sum([get_cost_from_trace_id(item["id"]) for item in data["traces"]])
+    return total_cost
@@ -1,5 +1,20 @@
+import re
+import math
 import openpyxl as xl
 from pathlib import Path
+from typing import Any, Optional
+
+# "1.200.000" or "1,200": the separators group thousands
+GROUPED_THOUSANDS_PATTERN = re.compile(r"\d{1,3}([.,])\d{3}(?:\1\d{3})*")
+# "1,200.50" or "1.200,50": grouped thousands then a decimal part
+GROUPED_DECIMAL_PATTERNS = (
+    (re.compile(r"\d{1,3}(?:,\d{3})+\.\d+"), ",", "."),
+    (re.compile(r"\d{1,3}(?:\.\d{3})+,\d+"), ".", ","),
+)
+# "12.99" or "12,5"
+DECIMAL_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+# One number, e.g. "1.200.000 đ" or "$12.99"
+PRICE_PATTERN = re.compile(r"[^\d]*?(\d[\d.,]*?)[.,]?\s*[^\d]*")
 
 
 def get_sheetnames_xlsx(filepath: str):
@@ -29,3 +44,43 @@ def is_product_file(filepath: str):
     if Path(filepath).suffix != ".xlsx":
         return False
     return "product" in get_sheetnames_xlsx(filepath)
+
+
+def parse_price(price: Any) -> Optional[float]:
+    """
+    Parse the price of a product. Separators are thousands separators only when they group
+    thousands (e.g. "1.200.000 đ"), otherwise the price is a decimal number (e.g. "12.99").
+
+    Args:
+        price (Any): Price, a number or a text
+
+    Returns:
+        Optional[float]: The price, an `int` when it has no decimal part, `None` when missing or ambiguous
+    """
+    if isinstance(price, bool) or price is None:
+        return None
+
+    if isinstance(price, (int, float)):
+        return None if isinstance(price, float) and math.isnan(price) else price
+
+    match = PRICE_PATTERN.fullmatch(str(price).strip())
+    if match is None:
+        return None
+
+    number = match.group(1)
+    if GROUPED_THOUSANDS_PATTERN.fullmatch(number):
+        return int(re.sub(r"[.,]", "", number))
+
+    for pattern, thousands_separator, decimal_separator in GROUPED_DECIMAL_PATTERNS:
+        if pattern.fullmatch(number):
+            number = number.replace(thousands_separator, "").replace(
+                decimal_separator, "."
+            )
+            break
+    else:
+        if not DECIMAL_PATTERN.fullmatch(number):
+            return None
+        number = number.replace(",", ".")
+
+    value = float(number)
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,69 @@
+import uuid
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+current_session_id: ContextVar[Optional[str]] = ContextVar(
+    "current_session_id", default=None
+)
+
+
+def get_session_id() -> Optional[str]:
+    """
+    Get the session ID (messages.id) of the chat message being answered, used by the tools of
+    the cached assistants to trace their calls in langfuse
+
+    Returns:
+        Optional[str]: Session ID, `None` outside of a chat message
+    """
+    return current_session_id.get()
+
+
+@contextmanager
+def session_id_context(session_id: str | uuid.UUID) -> Iterator[None]:
+    """
+    Set the session ID of the chat message being answered, for the code running in the context
+
+    Args:
+        session_id (str | uuid.UUID): Session ID (messages.id)
+    """
+    token = current_session_id.set(str(session_id))
+    try:
+        yield
+    finally:
+        current_session_id.reset(token)
+
+
+current_product_rows: ContextVar[Optional[list[dict]]] = ContextVar(
+    "current_product_rows", default=None
+)
+
+
+@contextmanager
+def collect_product_rows() -> Iterator[list[dict]]:
+    """
+    Collect the product rows returned by the product search tool while answering a message,
+    e.g. for the structured answers of the production API
+
+    Yields:
+        list[dict]: Product rows, filled as the tool returns them
+    """
+    product_rows: list[dict] = []
+    token = current_product_rows.set(product_rows)
+    try:
+        yield product_rows
+    finally:
+        current_product_rows.reset(token)
+
+
+def add_product_rows(product_rows: list[dict]):
+    """
+    Record the product rows returned to the agent, no-op outside of `collect_product_rows`
+
+    Args:
+        product_rows (list[dict]): Product rows
+    """
+    collected = current_product_rows.get()
+    if collected is not None:
+        collected.extend(product_rows)
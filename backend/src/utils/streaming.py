@@ -0,0 +1,82 @@
+import time
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+
+class TokenStream:
+    """
+    Sink of the answer deltas of one chat message, read by the websocket handler while the agent runs.
+
+    Producers (agents, tools, the RAG answer generation) may run in the event loop or in worker
+    threads, e.g. CrewAI runs the crew with `asyncio.to_thread`. They find the stream of the current
+    message with `get_token_stream`.
+
+    Args:
+        loop (asyncio.AbstractEventLoop, optional): Loop of the consumer, the running loop if `None`
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self.text = ""
+        self.start_time = time.time()
+        self.first_token_time: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def has_tokens(self) -> bool:
+        return self.first_token_time is not None
+
+    def _put(self, item: Optional[str]):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.loop:
+            self.queue.put_nowait(item)
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    def push(self, delta: str):
+        """
+        Send a delta of the answer
+
+        Args:
+            delta (str): Text delta
+        """
+        if not delta:
+            return
+
+        with self._lock:
+            if self.first_token_time is None:
+                self.first_token_time = time.time()
+            self.text += delta
+            self._put(delta)
+
+    def close(self):
+        """
+        End the stream, the consumer stops after the pending deltas
+        """
+        self._put(None)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        while (delta := await self.queue.get()) is not None:
+            yield delta
+
+
+current_token_stream: ContextVar[Optional[TokenStream]] = ContextVar(
+    "current_token_stream", default=None
+)
+
+
+def get_token_stream() -> Optional[TokenStream]:
+    """
+    Get the token stream of the chat message being answered
+
+    Returns:
+        Optional[TokenStream]: Token stream, `None` outside of a streamed chat message
+    """
+    return current_token_stream.get()
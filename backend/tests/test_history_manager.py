@@ -0,0 +1,92 @@
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+
+import src.database.history_manager  # noqa: F401
+from src.constants import SenderType
+from src.database.core import Messages
+
+# The package exports the `history_manager` instance under the name of its module
+history_module = sys.modules["src.database.history_manager"]
+
+
+@pytest.fixture(autouse=True)
+def count_words(monkeypatch):
+    # One token per word, tiktoken downloads its encodings
+    monkeypatch.setattr(
+        history_module, "openai_compute_token", lambda text, model: len(text.split())
+    )
+
+
+def make_messages(*word_counts: int) -> list[Messages]:
+    return [
+        Messages(
+            id=uuid.uuid4(),
+            content=" ".join(["word"] * word_count),
+            sender_type=SenderType.USER if i % 2 == 0 else SenderType.ASSISTANT,
+        )
+        for i, word_count in enumerate(word_counts)
+    ]
+
+
+def test_window_size():
+    manager = history_module.HistoryManager(max_turns=3, token_budget=100)
+
+    # The turn budget closes the window of short messages
+    history = history_module.ConversationHistory(None, None, make_messages(*[5] * 8))
+    assert manager._get_window_size(history.tokens) == 6
+
+    # A token-heavy message closes the window, even if older messages fit in the budget
+    history = history_module.ConversationHistory(
+        None, None, make_messages(5, 5, 90, 10, 10)
+    )
+    assert history.tokens == [5, 5, 90, 10, 10]
+    assert manager._get_window_size(history.tokens) == 2
+
+    # The latest message alone is over the budget
+    assert manager._get_window_size([150]) == 0
+
+
+def test_add_messages_schedules_fold(monkeypatch):
+    manager = history_module.HistoryManager(max_turns=3, token_budget=100)
+    scheduled = []
+    monkeypatch.setattr(manager, "schedule_fold", scheduled.append)
+
+    conversation_id = uuid.uuid4()
+    manager.histories.set(
+        conversation_id,
+        history_module.ConversationHistory(None, None, make_messages(10, 10)),
+    )
+
+    # Within the budget
+    manager.add_messages(conversation_id, make_messages(10, 10))
+    assert scheduled == []
+
+    # The heavy answer pushes the older messages out of the window
+    manager.add_messages(conversation_id, make_messages(10, 80))
+    assert scheduled == [conversation_id]
+
+    history = manager.histories.get(conversation_id)
+    assert len(history.tokens) == 6
+    assert manager._get_window_size(history.tokens) == 3
+
+    # Uncached conversations are loaded with their next message instead
+    manager.add_messages(uuid.uuid4(), make_messages(200))
+    assert scheduled == [conversation_id]
+
+
+def test_schedule_fold_once_per_conversation(monkeypatch):
+    manager = history_module.HistoryManager()
+    submitted = []
+    monkeypatch.setattr(
+        manager.executor, "submit", lambda fn, *args: submitted.append(args)
+    )
+
+    conversation_id = uuid.uuid4()
+    manager.schedule_fold(conversation_id)
+    manager.schedule_fold(conversation_id)
+    assert submitted == [(conversation_id,)]
@@ -0,0 +1,109 @@
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from src.database.core import KnowledgeBaseClosure
+from src.database.kb_hierarchy import KnowledgeBaseHierarchy
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+
+    # The upsert of the closure keeps the shortest path with the Postgres `least`
+    @event.listens_for(engine, "connect")
+    def add_least(dbapi_connection, connection_record):
+        dbapi_connection.create_function("least", 2, min)
+
+    SQLModel.metadata.create_all(engine, tables=[KnowledgeBaseClosure.__table__])
+
+    with Session(engine) as session:
+        yield session
+
+
+def get_ancestor_depths(session: Session, kb_id: uuid.UUID) -> dict[uuid.UUID, int]:
+    return dict(
+        session.exec(
+            select(KnowledgeBaseClosure.ancestor_id, KnowledgeBaseClosure.depth).where(
+                KnowledgeBaseClosure.descendant_id == kb_id
+            )
+        ).all()
+    )
+
+
+def test_chain_remove_middle(session):
+    hierarchy = KnowledgeBaseHierarchy()
+    a, b, c, d = (uuid.uuid4() for _ in range(4))
+
+    # d inherits c, which inherits b, which inherits a
+    hierarchy.add_inheritance(session, a, b)
+    hierarchy.add_inheritance(session, c, d)
+    hierarchy.add_inheritance(session, b, c)
+
+    assert get_ancestor_depths(session, d) == {c: 1, b: 2, a: 3}
+    assert hierarchy.get_ancestor_ids(session, d) == [c, b, a]
+    assert hierarchy.get_kb_ids(session, d) == [c, b, a, d]
+
+    hierarchy.remove_knowledge_base(session, b)
+
+    assert get_ancestor_depths(session, b) == {}
+    assert hierarchy.get_descendant_ids(session, b) == []
+    assert get_ancestor_depths(session, c) == {}
+    assert get_ancestor_depths(session, d) == {c: 1}
+    assert hierarchy.get_descendant_ids(session, a) == []
+    # The cached knowledge bases of the descendants are invalidated
+    assert hierarchy.get_kb_ids(session, d) == [c, d]
+
+
+def test_diamond_remove_middle(session):
+    hierarchy = KnowledgeBaseHierarchy()
+    a, b, c, d, e = (uuid.uuid4() for _ in range(5))
+
+    # d inherits b and c, which both inherit a, e inherits d
+    hierarchy.add_inheritance(session, d, e)
+    hierarchy.add_inheritance(session, b, d)
+    hierarchy.add_inheritance(session, c, d)
+    hierarchy.add_inheritance(session, a, b)
+    hierarchy.add_inheritance(session, a, c)
+
+    assert get_ancestor_depths(session, d) == {b: 1, c: 1, a: 2}
+    assert get_ancestor_depths(session, e) == {d: 1, b: 2, c: 2, a: 3}
+    assert set(hierarchy.get_children_ids(session, a)) == {b, c}
+
+    hierarchy.remove_knowledge_base(session, b)
+
+    # a is still reached through c
+    assert get_ancestor_depths(session, d) == {c: 1, a: 2}
+    assert get_ancestor_depths(session, e) == {d: 1, c: 2, a: 3}
+    assert set(hierarchy.get_descendant_ids(session, a)) == {c, d, e}
+
+    hierarchy.remove_knowledge_base(session, c)
+
+    assert get_ancestor_depths(session, d) == {}
+    assert get_ancestor_depths(session, e) == {d: 1}
+    assert not hierarchy.has_relatives(session, a)
+
+
+def test_shortest_path_and_cycle(session):
+    hierarchy = KnowledgeBaseHierarchy()
+    a, b, c = (uuid.uuid4() for _ in range(3))
+
+    # c inherits a directly and through b
+    hierarchy.add_inheritance(session, a, b)
+    hierarchy.add_inheritance(session, b, c)
+    assert get_ancestor_depths(session, c) == {b: 1, a: 2}
+    hierarchy.add_inheritance(session, a, c)
+    assert get_ancestor_depths(session, c) == {b: 1, a: 1}
+
+    with pytest.raises(AssertionError, match="Inheritance cycle"):
+        hierarchy.add_inheritance(session, c, a)
+
+    # The direct inheritance of c is kept when the path through b is removed
+    hierarchy.remove_knowledge_base(session, b)
+    assert get_ancestor_depths(session, c) == {a: 1}
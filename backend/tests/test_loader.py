@@ -1,4 +1,6 @@
 import sys
+import json
+import math
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -8,10 +10,13 @@ from llama_index.readers.llama_parse import LlamaParse  # noqa
 
 from src.readers import (
     DocxReader,
+    FastHtmlReader,
     JSONReader,
     PandasCSVReaderCustomised,
     PandasExcelReader,
+    StreamingJSONReader,
     TxtReader,
+    iter_document_batches,
 )
 
 
@@ -29,6 +34,24 @@ def test_load_json():
     assert True
 
 
+def test_load_json_streaming(tmp_path):
+    path = Path("sample/test.json")
+    documents = StreamingJSONReader(
+        records_per_document=30, record_template="{title}\n{body}"
+    ).load_data(path)
+    records = json.loads(path.read_text())
+
+    assert len(documents) == math.ceil(len(records) / 30)
+    assert documents[0].text.startswith(records[0]["title"])
+    assert documents[-1].metadata["last_record"] == len(records) - 1
+
+    jsonl_path = tmp_path / "test.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(record) for record in records))
+    streamed = list(StreamingJSONReader(chunk_size=64).iter_records(jsonl_path))
+
+    assert streamed == records
+
+
 def test_load_csv():
     path = Path("sample/dummy.csv")
     _ = PandasCSVReaderCustomised(pandas_config=dict(on_bad_lines="skip")).load_data(
@@ -47,3 +70,67 @@ def test_load_txt():
     path = Path("sample/test.txt")
     _ = TxtReader().load_data(path)
     assert True
+
+
+def test_load_html_fast():
+    path = Path("sample/test.html")
+    documents = FastHtmlReader(page_break_pattern="---PAGE BREAK---").load_data(path)
+
+    assert len(documents) == 2
+    assert documents[0].metadata["title"] == "Hướng dẫn cài đặt camera"
+    assert "Bước 1" in documents[0].text
+    assert "C200 | 1080p" in documents[0].text
+    assert "IP66" in documents[1].text
+
+    all_text = "\n".join(doc.text for doc in documents)
+    for boilerplate in ["Trang chủ", "Trợ giúp / Camera", "liên quan", "dataLayer"]:
+        assert boilerplate not in all_text
+
+
+def test_load_html_fast_keeps_article_header(tmp_path):
+    path = tmp_path / "article.html"
+    path.write_text(
+        """<html><head><meta charset="utf-8"></head><body>
+        <header class="site-header">Trang chủ</header>
+        <main><article>
+            <header class="entry-header"><h1>Camera C200</h1><p>Tác giả: An</p></header>
+            <p>Camera quay 1080p.</p>
+            <div class="related-products">Camera C210 cùng dòng</div>
+            <header><span>Cập nhật 2024</span></header>
+        </article></main>
+        </body></html>""",
+        encoding="utf-8",
+    )
+    text = FastHtmlReader().load_data(path)[0].text
+
+    for content in ["Camera C200", "Tác giả: An", "Camera C210", "Cập nhật 2024"]:
+        assert content in text
+    assert "Trang chủ" not in text
+
+
+def test_load_json_streaming_wrapper(tmp_path):
+    records = json.loads(Path("sample/test.json").read_text())
+    path = tmp_path / "wrapped.json"
+    path.write_text(json.dumps({"total": len(records), "data": records}))
+
+    streamed = list(StreamingJSONReader(chunk_size=64).iter_records(path))
+
+    assert streamed == [*records, {"total": len(records)}]
+
+    reader = StreamingJSONReader(records_per_document=30)
+    batches = list(iter_document_batches(str(path), {".json": reader}, batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert batches[0][0].metadata["file_name"] == "wrapped.json"
+
+    # A wrapper array starting with null is a member, the parser keeps its place
+    path.write_text(
+        json.dumps(
+            {"tags": [None, "a", "b"], "empty": [], "data": [{"x": 1}, {"x": 2}]}
+        )
+    )
+
+    streamed = list(StreamingJSONReader(chunk_size=8).iter_records(path))
+
+    assert streamed == [{"x": 1}, {"x": 2}, {"tags": [None, "a", "b"], "empty": []}]
+    assert len(StreamingJSONReader().load_data(path)) == 1
@@ -0,0 +1,112 @@
+import sys
+import importlib.util
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# The services package imports the whole API, the parser module is loaded alone
+spec = importlib.util.spec_from_file_location(
+    "output_parser",
+    Path(__file__).parent.parent / "api" / "services" / "output_parser.py",
+)
+output_parser = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(output_parser)
+
+parser = output_parser.OutputParser()
+
+PRODUCT_ROWS = [
+    {
+        "name": "Áo thun trắng",
+        "url": "https://shop.vn/ao-thun-trang",
+        "code": "AT01",
+        "price": "150.000 đ",
+        "image_urls": "https://shop.vn/1.jpg, https://shop.vn/2.jpg",
+        "description": "Áo cotton",
+    },
+    {
+        "name": "Quần jean",
+        "url": "https://shop.vn/quan-jean",
+        "code": "QJ02",
+        "price": 450000,
+        "image_urls": ["https://shop.vn/3.jpg"],
+        "description": "Quần jean xanh",
+    },
+]
+
+
+def test_parse_fenced_json():
+    answer = """```json
+{
+    "text": "Đây là sản phẩm phù hợp",
+    "products": [{"name": "Áo thun trắng", "price": "150.000 đ", "image_urls": ["https://shop.vn/1.jpg"]}]
+}
+```"""
+
+    result = parser.parse(answer)
+
+    assert result["text"] == "Đây là sản phẩm phù hợp"
+    assert result["products"] == [
+        {
+            "url": "",
+            "name": "Áo thun trắng",
+            "code": "",
+            "price": 150000,
+            "image_urls": ["https://shop.vn/1.jpg"],
+            "description": "",
+        }
+    ]
+
+
+def test_parse_malformed_json():
+    # Trailing comma and unclosed brackets are repaired
+    answer = '{"text": "Xin chào", "products": [{"name": "Quần jean", "price": 450000,}'
+
+    result = parser.parse(answer)
+
+    assert result["text"] == "Xin chào"
+    assert [product["name"] for product in result["products"]] == ["Quần jean"]
+    assert result["products"][0]["price"] == 450000
+
+    # Json without text is not an answer of the structured prompt
+    result = parser.parse('{"result": "ok"}')
+    assert result == {"text": '{"result": "ok"}', "products": []}
+
+
+def test_parse_tool_answer_with_product_rows():
+    answer = (
+        "Một số sản phẩm liên quan đến áo gồm: \n"
+        f"1- Sản phẩm: {PRODUCT_ROWS[1]['name']}, Giá: 450000\n"
+        f"2- Sản phẩm: {PRODUCT_ROWS[0]['name']}, Link sản phẩm: {PRODUCT_ROWS[0]['url']}\n"
+        f"Xem thêm tại {PRODUCT_ROWS[1]['url']}"
+    )
+
+    result = parser.parse(answer, product_rows=PRODUCT_ROWS + PRODUCT_ROWS[:1])
+
+    # Product lines are removed from the text, products are listed once in the order of the tool
+    assert result["text"] == "Một số sản phẩm liên quan đến áo gồm:"
+    assert [product["code"] for product in result["products"]] == ["AT01", "QJ02"]
+
+    # Without matching products the answer is kept whole
+    result = parser.parse(
+        "Xin lỗi, không tìm thấy sản phẩm.", product_rows=PRODUCT_ROWS
+    )
+    assert result == {"text": "Xin lỗi, không tìm thấy sản phẩm.", "products": []}
+
+
+def test_format_product_normalization():
+    product = parser._format_product(PRODUCT_ROWS[0])
+    assert product["price"] == 150000
+    assert product["image_urls"] == ["https://shop.vn/1.jpg", "https://shop.vn/2.jpg"]
+    assert product["code"] == "AT01"
+
+    product = parser._format_product({"name": "A", "price": 99.5, "image_urls": None})
+    assert product["price"] == 99.5
+    assert product["image_urls"] == []
+    assert product["url"] == ""
+
+    # Decimal prices are not scaled, the parser is shared with the product catalog
+    product = parser._format_product({"name": "B", "price": "12.99 $"})
+    assert product["price"] == 12.99
+    assert parser._format_product({"price": "Liên hệ"})["price"] is None
+    assert parser._format_product({"price": None})["price"] is None
+    assert parser._parse_image_urls("a.jpg b.jpg;c.jpg") == ["a.jpg", "b.jpg", "c.jpg"]
@@ -0,0 +1,125 @@
+import sys
+import math
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import polars as pl
+
+from src.database.product_catalog import ProductCatalog, parse_prices
+
+
+def test_parse_prices():
+    prices = parse_prices(
+        pl.Series(
+            [
+                "1.200.000 đ",
+                "12.99",
+                "$1,200.50",
+                "12,5",
+                "100 - 200",
+                "Liên hệ",
+                None,
+            ]
+        )
+    )
+
+    assert prices[:4].tolist() == [1200000, 12.99, 1200.5, 12.5]
+    # Missing or ambiguous prices are not filtered on
+    assert all(math.isnan(price) for price in prices[4:])
+
+    assert parse_prices(pl.Series([150000, None])).tolist()[0] == 150000
+
+
+def make_products(*names_and_prices: tuple[str, str | int]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "name": [name for name, _ in names_and_prices],
+            "price": [str(price) for _, price in names_and_prices],
+            "description": [f"Mô tả {name}" for name, _ in names_and_prices],
+        }
+    )
+
+
+def test_search_large_catalog():
+    df_product = make_products(
+        *[(f"Áo thun mẫu {i}", 100000 + i) for i in range(100)],
+        ("Quần jean xanh", 450000),
+    )
+    catalog = ProductCatalog(df_product, candidate_count=8)
+    assert len(catalog) == 101
+    assert catalog.trigram_postings
+
+    # Only the names sharing the most trigrams with the query are scored
+    choices = catalog._get_choices("quần jean", None)
+    assert len(choices) == 8
+    assert 100 in choices
+
+    assert catalog.search("quan jean xanh")[0]["name"] == "Quần jean xanh"
+    assert catalog.search("Quần jean", limit=1)[0]["price"] == "450000"
+
+
+def test_search_price_range():
+    df_product = make_products(
+        ("Áo thun trắng", "150.000 đ"),
+        ("Áo thun trắng dài tay", "250.000 đ"),
+        ("Áo thun trắng cổ tim", "300.000 đ"),
+        ("Áo thun đen", "200.000 đ"),
+        ("Quần jean", "Liên hệ"),
+    )
+    catalog = ProductCatalog(df_product, candidate_count=2)
+
+    # An exact name is always the best match
+    products = catalog.search("áo thun trắng")
+    assert products[0]["name"] == "Áo thun trắng"
+
+    # The masked exact match is neither promoted nor a candidate of the prefilter
+    mask = catalog.get_price_mask(min_price=200000)
+    assert mask.tolist() == [False, True, True, True, False]
+    assert set(catalog._get_choices("áo thun trắng", mask)) <= {1, 2, 3}
+
+    products = catalog.search("áo thun trắng", min_price=200000)
+    assert [product["name"] for product in products] == [
+        "Áo thun trắng dài tay",
+        "Áo thun trắng cổ tim",
+    ]
+
+    # Products without price are excluded by a filter
+    products = catalog.search("Quần jean", max_price=500000)
+    assert "Quần jean" not in [product["name"] for product in products]
+
+
+def test_search_embedded_catalog():
+    df_product = make_products(
+        ("Áo thun trắng", 150000),
+        ("Áo thun đen", 200000),
+        ("Áo khoác gió", 300000),
+    )
+    embeddings = {
+        "Áo thun trắng": [1.0, 0.0, 0.0],
+        "Áo thun đen": [0.0, 2.0, 0.0],
+        "Áo khoác gió": [0.0, 0.8, 0.6],
+    }
+    catalog = ProductCatalog(df_product)
+    catalog.embed(
+        embed_fn=lambda texts: [embeddings[text.split(".")[0]] for text in texts]
+    )
+    assert np.allclose(np.linalg.norm(catalog.embeddings, axis=1), 1)
+
+    # Fuzzy ranking alone, without query embedding
+    assert catalog.search("thun trắng")[0]["name"] == "Áo thun trắng"
+
+    # The semantic ranking moves the second fuzzy match to the top of the fusion
+    products = catalog.search("thun trắng", query_embedding=[0.0, 1.0, 0.0])
+    assert [product["name"] for product in products] == [
+        "Áo thun đen",
+        "Áo thun trắng",
+        "Áo khoác gió",
+    ]
+
+    # The embeddings are loaded back from the embedding column
+    loaded = ProductCatalog(catalog.df_product)
+    assert np.allclose(loaded.embeddings, catalog.embeddings)
+    products = loaded.search("thun trắng", query_embedding=[0.0, 1.0, 0.0])
+    assert products[0]["name"] == "Áo thun đen"
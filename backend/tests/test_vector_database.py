@@ -0,0 +1,175 @@
+import sys
+import uuid
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from qdrant_client.http import models
+
+from src.constants import QdrantPayload
+from src.database.core import NumpyVectorDatabase
+
+
+def kb_filter(kb_ids: list[str]) -> models.Filter:
+    return models.Filter(
+        should=[models.FieldCondition(key="kb_id", match=models.MatchAny(any=kb_ids))]
+    )
+
+
+def test_numpy_vector_database(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 32), dtype=np.float32)
+    vector_ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+    payloads = [
+        QdrantPayload(
+            document_id=f"doc_{i % 10}",
+            text=str(i),
+            vector_id=vector_id,
+            kb_id=f"kb_{i % 2}",
+        )
+        for i, vector_id in enumerate(vector_ids)
+    ]
+
+    db = NumpyVectorDatabase(path=str(tmp_path))
+    db.add_vectors("collection", vector_ids, vectors.tolist(), payloads)
+    params = db.get_search_params("collection")
+
+    response = db.search_vector(
+        "collection",
+        vectors[4].tolist(),
+        params,
+        query_filter=kb_filter(["kb_0"]),
+        limit=5,
+        with_vectors=True,
+    )
+    assert response.points[0].id == vector_ids[4]
+    assert response.points[0].score > 0.999
+    assert len(response.points[0].vector) == 32
+    assert all(point.payload["kb_id"] == "kb_0" for point in response.points)
+
+    fetched = db.get_vectors("collection", [vector_ids[4], "missing"])
+    assert list(fetched) == [vector_ids[4]]
+    assert np.allclose(fetched[vector_ids[4]], response.points[0].vector)
+
+    db.delete_vector("collection", "doc_4")
+    response = db.search_vector(
+        "collection", vectors[4].tolist(), params, query_filter=kb_filter(["kb_0"])
+    )
+    assert all(point.payload["document_id"] != "doc_4" for point in response.points)
+
+    # Points are reloaded from the memory-mapped collection
+    db = NumpyVectorDatabase(path=str(tmp_path))
+    assert db.get_collection("collection").count == 450
+    reloaded = db.search_vector(
+        "collection", vectors[4].tolist(), params, query_filter=kb_filter(["kb_0"])
+    )
+    assert [point.id for point in reloaded.points] == [
+        point.id for point in response.points
+    ]
+
+    # IVF search returns the query point, exact search is unchanged
+    db.build_index("collection", n_lists=8)
+    ivf = db.search_vector("collection", vectors[6].tolist(), params, limit=1)
+    assert ivf.points[0].id == vector_ids[6]
+    exact = db.search_vector(
+        "collection",
+        vectors[4].tolist(),
+        db.get_search_params("collection", exact=True),
+        query_filter=kb_filter(["kb_0"]),
+    )
+    assert [point.id for point in exact.points] == [
+        point.id for point in response.points
+    ]
+
+    db.migrate_collection("collection", "migrated")
+    assert not db.check_collection_exists("collection")
+    assert db.get_collection("migrated").count == 450
+
+
+def test_numpy_vector_database_search_while_adding():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((4000, 16), dtype=np.float32)
+    payloads = [
+        QdrantPayload(
+            document_id=f"doc_{i % 10}", text=str(i), vector_id=str(i), kb_id="kb_0"
+        )
+        for i in range(len(vectors))
+    ]
+
+    db = NumpyVectorDatabase()
+    db.add_vectors("collection", ["0"], vectors[:1].tolist(), payloads[:1])
+    params = db.get_search_params("collection")
+    query_filter = models.Filter(
+        must=[
+            models.FieldCondition(key="kb_id", match=models.MatchValue(value="kb_0")),
+            models.HasIdCondition(has_id=["0", "1"]),
+        ],
+        must_not=[
+            models.FieldCondition(
+                key="document_id", match=models.MatchValue(value="doc_9")
+            )
+        ],
+    )
+
+    def add():
+        # Small batches grow the collection many times while searching
+        for start in range(1, len(vectors), 10):
+            end = min(start + 10, len(vectors))
+            db.add_vectors(
+                "collection",
+                [str(i) for i in range(start, end)],
+                vectors[start:end].tolist(),
+                payloads[start:end],
+            )
+
+    writer = threading.Thread(target=add)
+    writer.start()
+    while writer.is_alive():
+        response = db.search_vector(
+            "collection", vectors[0].tolist(), params, query_filter=query_filter
+        )
+        assert response.points[0].id == "0"
+    writer.join()
+
+    assert db.get_collection("collection").count == len(vectors)
+
+
+def test_numpy_vector_database_shared_directory(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 16), dtype=np.float32)
+    vector_ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+    payloads = [
+        QdrantPayload(document_id=f"doc_{i}", text=str(i), vector_id=id_, kb_id="kb")
+        for i, id_ in enumerate(vector_ids)
+    ]
+
+    # Two clients of the same directory, e.g. the API and a Celery worker
+    api = NumpyVectorDatabase(path=str(tmp_path))
+    worker = NumpyVectorDatabase(path=str(tmp_path))
+
+    # Collection created by the worker after the API started
+    worker.add_vectors("collection", vector_ids[:100], vectors[:100], payloads[:100])
+    params = api.get_search_params("collection")
+    response = api.search_vector("collection", vectors[50].tolist(), params, limit=1)
+    assert response.points[0].id == vector_ids[50]
+
+    # Both append, each one after the rows of the other
+    api.add_vectors(
+        "collection", vector_ids[100:200], vectors[100:200], payloads[100:200]
+    )
+    worker.add_vectors("collection", vector_ids[200:], vectors[200:], payloads[200:])
+    worker.delete_vector("collection", "doc_150")
+
+    for db in [api, worker, NumpyVectorDatabase(path=str(tmp_path))]:
+        for i in [10, 120, 250]:
+            response = db.search_vector(
+                "collection", vectors[i].tolist(), params, limit=1
+            )
+            assert response.points[0].id == vector_ids[i]
+            assert response.points[0].score > 0.999
+
+        response = db.search_vector("collection", vectors[150].tolist(), params)
+        assert vector_ids[150] not in [point.id for point in response.points]
+        assert db.get_collection("collection").count == 299